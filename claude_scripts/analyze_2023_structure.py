@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
-import json
 from collections import defaultdict, Counter
 from typing import Any, Dict, List, Tuple, Set
 
+from snapshot_cache import load_json_cached
+
 def explore_json_structure(data: Dict[str, Any], prefix: str = "", path: List[str] = None) -> List[Tuple[int, str, str, Any, int]]:
     """
     Recursively explore JSON structure and return field information.
@@ -53,8 +54,7 @@ def main():
 
     # Load the 2023 JSON file
     try:
-        with open('extracted_data/contracts_2023.json', 'r') as f:
-            data = json.load(f)
+        data = load_json_cached('extracted_data/contracts_2023.json')
         print(f"✓ Loaded 2023 contracts: {len(data)} contracts")
     except Exception as e:
         print(f"✗ Error loading 2023 contracts: {e}")
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
-import json
+from snapshot_cache import load_json_cached
 
 def analyze_coordinates():
     """Analyze latitude and longitude data completeness in 2023 contracts."""
 
-    with open('extracted_data/contracts_2023.json', 'r') as f:
-        data = json.load(f)
+    data = load_json_cached('extracted_data/contracts_2023.json')
 
     coord_stats = {
         'has_both_coords': 0,
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-import json
 import pandas as pd
 from collections import defaultdict, Counter
 from typing import Any, Dict, List, Tuple, Set
 
+from snapshot_cache import load_json_cached
+
 def explore_json_structure(data: Dict[str, Any], prefix: str = "", path: List[str] = None) -> List[Tuple[int, str, str, Any, int]]:
     """
     Recursively explore JSON structure and return field information.
@@ -96,8 +97,7 @@ def main():
 
     # Load the JSON file
     try:
-        with open('data/out.json', 'r') as f:
-            data = json.load(f)
+        data = load_json_cached('data/out.json')
         print(f"✓ Loaded JSON file with {len(data)} top-level contracts")
     except Exception as e:
         print(f"✗ Error loading JSON: {e}")
@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
-import json
 from datetime import datetime
 
+from chain_maintenance import load_chains
+
 def analyze_length4_chains():
     """Analyze the 4 chains of length 4 in detail."""
 
-    with open('extracted_data/2023_vms_victoria_with_chains.json', 'r') as f:
-        data = json.load(f)
+    data = load_chains()
 
     # The 4 chains of length 4 from previous analysis
     length4_chains = [
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
-import json
 from collections import Counter
 import re
 
+from snapshot_cache import load_json_cached
+
 def analyze_postcodes():
     """Analyze postcode field in siteAddress from 2023 contracts."""
 
-    with open('extracted_data/contracts_2023.json', 'r') as f:
-        data = json.load(f)
+    data = load_json_cached('extracted_data/contracts_2023.json')
 
     postcode_stats = {
         'has_postcode': 0,
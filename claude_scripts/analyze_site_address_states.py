@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
-import json
 from collections import Counter
 import re
 
+from snapshot_cache import load_json_cached
+
 def extract_states_from_site_addresses():
     """Extract and analyze states from siteAddress fields in 2023 contracts."""
 
-    with open('extracted_data/contracts_2023.json', 'r') as f:
-        data = json.load(f)
+    data = load_json_cached('extracted_data/contracts_2023.json')
 
     states = []
     locations = []
@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
-import json
+from snapshot_cache import load_json_cached
 
 def analyze_vms_coordinates():
     """Analyze latitude and longitude data completeness in 2023 VMS contracts."""
 
-    with open('extracted_data/2023_vms.json', 'r') as f:
-        data = json.load(f)
+    data = load_json_cached('extracted_data/2023_vms.json')
 
     coord_stats = {
         'has_both_coords': 0,
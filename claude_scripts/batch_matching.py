@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from equipment_matching import DEMO_INVENTORY, EquipmentInventory, job_economics, match_hire_lines
+from job_request_table import JobRequestTable, load_job_request_table
+
+# Rate for sample assets whose type has no demo rate
+DEFAULT_DAILY_RATE = 45
+
+def prepare_job_requests(table: JobRequestTable) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, str]]]:
+    """
+    Order the usable requests by start time (file order breaks ties).
+    Returns ([(start, end, row)], [(row, skip_reason)]).
+    """
+
+    ready = []
+    skipped = []
+
+    for row in range(len(table)):
+        if not table.has_location(row):
+            skipped.append((row, 'no_location'))
+        elif table.missing_dates(row):
+            skipped.append((row, 'no_dates'))
+        elif not table.hire_lines(row):
+            skipped.append((row, 'no_hire_equipment'))
+        elif not table.has_dates(row):
+            skipped.append((row, 'bad_dates'))
+        else:
+            ready.append((table.start_times[row], table.end_times[row], row))
+
+    ready.sort(key=lambda entry: (entry[0], entry[2]))
+    return ready, skipped
+
+def allocate_job_requests(
+    table: JobRequestTable,
+    inventory: EquipmentInventory,
+    output_path: str = 'reports/job_allocations.jsonl'
+) -> Dict:
+    """
+    Assign equipment to every request in start-time order, booking each
+    assigned asset so later requests see it as taken. Every hire line gets
+    its quantity of the closest free assets of its type.
+
+    One JSON line per request is streamed to output_path as it is decided
+    (status allocated, partial or unavailable), followed by the skipped
+    requests. Returns summary counts and totals.
+    """
+
+    ready, skipped = prepare_job_requests(table)
+
+    summary = {
+        'requests': len(table),
+        'allocated': 0,
+        'partial': 0,
+        'unavailable': 0,
+        'skipped': {},
+        'assets_booked': 0,
+        'units_missing': 0,
+        'transport_km': 0.0,
+        'hire_revenue': 0.0,
+        'profit': 0.0
+    }
+
+    with open(output_path, 'w') as f:
+        for start, end, row in ready:
+            job_id = table.job_ids[row]
+            lines = table.hire_lines(row)
+
+            inventory.advance_to(start)
+            matches = match_hire_lines(lines, inventory, table.location(row), start, end)
+
+            record = {
+                'job_id': job_id,
+                'start_time': table.start_strings[row],
+                'end_time_projected': table.end_strings[row],
+                'lines': []
+            }
+            totals = {'distance': 0.0, 'transportCost': 0.0, 'hireRevenue': 0.0, 'profit': 0.0}
+            booked = missing = 0
+
+            for line, line_matches in zip(lines, matches):
+                for distance, position in line_matches:
+                    inventory.book(position, start, end, job_id)
+                    totals['distance'] += distance
+                    for key, value in job_economics(distance, start, end, inventory.equipment[position]['daily_rate']).items():
+                        totals[key] += value
+
+                record['lines'].append({
+                    'code': line['code'],
+                    'equipment_type': line['equipment_type'],
+                    'quantity': line['quantity'],
+                    'equipment_ids': [inventory.equipment[position]['equipment_id'] for _, position in line_matches],
+                    'distances': [round(distance, 3) for distance, _ in line_matches]
+                })
+                booked += len(line_matches)
+                missing += line['quantity'] - len(line_matches)
+
+            if not booked:
+                record['status'] = 'unavailable'
+            elif missing:
+                record['status'] = 'partial'
+            else:
+                record['status'] = 'allocated'
+            record.update({key: round(value, 2) for key, value in totals.items()})
+
+            summary[record['status']] += 1
+            summary['assets_booked'] += booked
+            summary['units_missing'] += missing
+            summary['transport_km'] += totals['distance']
+            summary['hire_revenue'] += totals['hireRevenue']
+            summary['profit'] += totals['profit']
+
+            f.write(json.dumps(record) + '\n')
+
+        for row, reason in skipped:
+            f.write(json.dumps({'job_id': table.job_ids[row], 'status': 'skipped', 'reason': reason}) + '\n')
+            summary['skipped'][reason] = summary['skipped'].get(reason, 0) + 1
+
+    return summary
+
+def sample_fleet(table: JobRequestTable, assets_per_type: int = 20, seed: int = 0) -> List[Dict]:
+    """
+    A reproducible stand-in fleet for when no inventory export is given:
+    assets_per_type assets of every hired type, parked near the sites of
+    requests that ask for that type.
+    """
+
+    rng = random.Random(seed)
+    rates = {asset['equipment_type']: asset['daily_rate'] for asset in DEMO_INVENTORY}
+
+    sites_by_type: Dict[str, List] = {}
+    for row in range(len(table)):
+        if not table.has_location(row):
+            continue
+        for line in table.hire_lines(row):
+            sites_by_type.setdefault(line['equipment_type'], []).append(table.location(row))
+
+    fleet = []
+    for type_number, equipment_type in enumerate(sorted(sites_by_type), 1):
+        sites = sites_by_type[equipment_type]
+        for asset_number in range(1, assets_per_type + 1):
+            lat, lon = rng.choice(sites)
+            fleet.append({
+                'equipment_id': f'SAMPLE-{type_number:02d}-{asset_number:03d}',
+                'equipment_type': equipment_type,
+                'current_location_gps': [round(lat + rng.uniform(-0.2, 0.2), 4), round(lon + rng.uniform(-0.2, 0.2), 4)],
+                'daily_rate': rates.get(equipment_type, DEFAULT_DAILY_RATE),
+                'bookings': []
+            })
+
+    return fleet
+
+def main():
+    print("=== BATCH EQUIPMENT ALLOCATION ===\n")
+
+    table = load_job_request_table('transformed_data.json')
+
+    # Optional inventory export (a JSON list of RentalEquipment records)
+    inventory_path: Optional[str] = sys.argv[1] if len(sys.argv) > 1 else None
+    if inventory_path:
+        with open(inventory_path, 'r') as f:
+            equipment = json.load(f)
+        print(f"Inventory: {len(equipment)} assets from {inventory_path}")
+    else:
+        equipment = sample_fleet(table)
+        print(f"Inventory: {len(equipment)} sample assets (pass an inventory JSON to use a real fleet)")
+
+    inventory = EquipmentInventory(equipment)
+
+    started = time.perf_counter()
+    summary = allocate_job_requests(table, inventory)
+    elapsed = time.perf_counter() - started
+
+    print(f"Job requests: {summary['requests']}")
+    print(f"Fully allocated: {summary['allocated']}")
+    print(f"Partially allocated: {summary['partial']}")
+    print(f"No equipment available: {summary['unavailable']}")
+    for reason, count in sorted(summary['skipped'].items()):
+        print(f"Skipped ({reason}): {count}")
+
+    print(f"\nAssets booked: {summary['assets_booked']} ({summary['units_missing']} units short)")
+    print(f"Transport distance: {summary['transport_km']:.1f} km")
+    print(f"Hire revenue: ${summary['hire_revenue']:,.2f}")
+    print(f"Estimated profit: ${summary['profit']:,.2f}")
+    print(f"\nProcessed in {elapsed:.2f}s ({summary['requests'] / max(elapsed, 1e-9):,.0f} requests/s)")
+    print("Allocations written to reports/job_allocations.jsonl")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+import math
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from contract_table import MICROSECONDS_PER_DAY, ContractTable
+from distance_engine import ROAD_MATRIX_PATH, DistanceEngine, DistanceProvider, below_threshold, get_provider
+from spatial_index import SiteGrid
+
+# Rows per start-date block handed to a worker; smaller tables are searched in-process
+MIN_SHARD_ROWS = 2000
+
+# Blocks per worker, so a worker that draws a busy stretch of the year does not hold up the rest
+SHARDS_PER_WORKER = 4
+
+# Columns workers read from shared memory: (name, array typecode)
+SHARED_COLUMNS = (
+    ('latitudes', 'd'),
+    ('longitudes', 'd'),
+    ('start_times', 'q'),
+    ('end_times', 'q'),
+    ('distance_to_depot', 'd'),
+    ('end_order', 'q'),
+    ('sorted_ends', 'q')
+)
+
+class _CandidateSearch:
+    """
+    Predecessor candidates for single rows, over a grid of the rows (members,
+    ascending) that may precede them. Without members every row is indexed.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, Sequence],
+        provider: DistanceProvider,
+        window: int,
+        max_abs_lat: float,
+        members: Optional[Sequence[int]] = None,
+        site_ids: Optional[Sequence[int]] = None
+    ):
+        self.columns = columns
+        self.provider = provider
+        self.window = window
+        self.max_abs_lat = max_abs_lat
+
+        latitudes, longitudes, end_times = columns['latitudes'], columns['longitudes'], columns['end_times']
+        if members is None:
+            self.members = range(len(latitudes))
+            self.grid = SiteGrid(latitudes, longitudes, end_times)
+        else:
+            self.members = members
+            self.grid = SiteGrid(
+                [latitudes[j] for j in members],
+                [longitudes[j] for j in members],
+                [end_times[j] for j in members]
+            )
+        self.engine = DistanceEngine(latitudes, longitudes, provider, site_ids)
+
+    def candidates(self, i: int) -> List[Tuple[int, int, float]]:
+        columns = self.columns
+        current_start = columns['start_times'][i]
+        current_depot_distance = columns['distance_to_depot'][i]
+        end_times = columns['end_times']
+
+        # Only sites within the depot radius that ended inside the date window
+        # (the grid is on the flat plane, so its radius covers the provider's)
+        nearby = [
+            j for j in (self.members[k] for k in self.grid.query(
+                columns['latitudes'][i], columns['longitudes'][i],
+                self.provider.grid_radius(current_depot_distance, self.max_abs_lat),
+                current_start - self.window, current_start
+            ))
+            if j != i
+        ]
+
+        # One batched distance call per contract, then keep sites closer than the depot
+        distances = self.engine.distances_from(i, nearby)
+
+        return [
+            (j, (current_start - end_times[j]) // MICROSECONDS_PER_DAY, site_to_site_distance)
+            for j, site_to_site_distance in below_threshold(distances, nearby, current_depot_distance)
+        ]
+
+def iter_predecessor_candidates(
+    table: ContractTable,
+    date_range_allowance: int = 10,
+    workers: int = 1
+) -> Iterator[Tuple[int, List[Tuple[int, int, float]]]]:
+    """
+    Yield (i, candidates) for every row of the contract table, where
+    candidates is a list of (j, days_gap, site_to_site_km) for each previous
+    contract j that:
+    - ended 0..date_range_allowance whole days before contract i started
+    - is closer to contract i's site than the depot is
+
+    Distances come from the table's provider. Candidates are listed in
+    table (start date) order.
+
+    With workers > 1 and a large enough table, rows are searched in
+    start-date blocks across a process pool (see _iter_sharded); the
+    output is the same, row for row.
+    """
+
+    window = (date_range_allowance + 1) * MICROSECONDS_PER_DAY
+    max_abs_lat = max((abs(lat) for lat in table.latitudes), default=0.0)
+
+    shard_rows = max(MIN_SHARD_ROWS, math.ceil(len(table) / max(workers * SHARDS_PER_WORKER, 1)))
+    if workers > 1 and len(table) > shard_rows:
+        yield from _iter_sharded(table, window, max_abs_lat, workers, shard_rows)
+        return
+
+    columns = {name: getattr(table, name) for name in ('latitudes', 'longitudes', 'start_times', 'end_times', 'distance_to_depot')}
+    search = _CandidateSearch(columns, table.provider, window, max_abs_lat, site_ids=table.site_ids)
+    for i in range(len(table)):
+        yield i, search.candidates(i)
+
+def _iter_sharded(
+    table: ContractTable,
+    window: int,
+    max_abs_lat: float,
+    workers: int,
+    shard_rows: int
+) -> Iterator[Tuple[int, List[Tuple[int, int, float]]]]:
+    """
+    Search blocks of shard_rows consecutive rows (by start date) in worker
+    processes. Each worker indexes only the rows that ended inside its
+    block's start range widened by the date window, found by bisecting an
+    end-date order of the whole table.
+
+    The contract columns go to the workers once, through one shared memory
+    block, and each block comes back as flat arrays. Blocks are merged in
+    submission order, so results match the in-process search exactly.
+
+    Workers compute distances without the parent's pair cache (site ids
+    are per process), so pairs they compute are not added to it.
+    """
+
+    end_times = table.end_times
+    end_order = array('q', sorted(range(len(table)), key=end_times.__getitem__))
+    columns = {
+        'latitudes': table.latitudes,
+        'longitudes': table.longitudes,
+        'start_times': table.start_times,
+        'end_times': end_times,
+        'distance_to_depot': table.distance_to_depot,
+        'end_order': end_order,
+        'sorted_ends': array('q', (end_times[j] for j in end_order))
+    }
+
+    # (name, typecode, byte offset) of each column in the shared block
+    layout = []
+    size = 0
+    for name, typecode in SHARED_COLUMNS:
+        layout.append((name, typecode, size))
+        size += len(table) * array(typecode).itemsize
+
+    provider = table.provider
+    provider_spec = (provider.name, getattr(provider, 'path', ROAD_MATRIX_PATH))
+    blocks = [(first, min(first + shard_rows, len(table))) for first in range(0, len(table), shard_rows)]
+
+    shared = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for name, typecode, offset in layout:
+            data = array(typecode, columns[name]).tobytes()
+            shared.buf[offset:offset + len(data)] = data
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_worker,
+            initargs=(shared.name, len(table), layout, provider_spec, window, max_abs_lat)
+        ) as pool:
+            for (first, last), (offsets, rows, gaps, distances) in zip(blocks, pool.map(_search_block, blocks)):
+                for k, i in enumerate(range(first, last)):
+                    yield i, [
+                        (rows[m], gaps[m], distances[m])
+                        for m in range(offsets[k], offsets[k + 1])
+                    ]
+    finally:
+        shared.close()
+        shared.unlink()
+
+# Per worker process: the attached shared block, its column views and the search settings
+_worker: Dict = {}
+
+def _attach_worker(
+    name: str,
+    count: int,
+    layout: List[Tuple[str, str, int]],
+    provider_spec: Tuple[str, str],
+    window: int,
+    max_abs_lat: float
+) -> None:
+    shared = shared_memory.SharedMemory(name=name)
+    columns = {}
+    for column, typecode, offset in layout:
+        nbytes = count * array(typecode).itemsize
+        columns[column] = shared.buf[offset:offset + nbytes].cast(typecode)
+
+    _worker.update(
+        shared=shared,
+        columns=columns,
+        provider=get_provider(*provider_spec),
+        window=window,
+        max_abs_lat=max_abs_lat
+    )
+
+def _search_block(block: Tuple[int, int]) -> Tuple[array, array, array, array]:
+    """Candidates of rows first..last-1 as (offsets, rows, days_gaps, distances) arrays."""
+
+    first, last = block
+    columns = _worker['columns']
+    start_times = columns['start_times']
+    sorted_ends = columns['sorted_ends']
+
+    # Rows that ended inside the block's date window, in row order
+    lo = bisect_right(sorted_ends, start_times[first] - _worker['window'])
+    hi = bisect_right(sorted_ends, start_times[last - 1])
+    members = sorted(columns['end_order'][lo:hi])
+
+    search = _CandidateSearch(columns, _worker['provider'], _worker['window'], _worker['max_abs_lat'], members)
+
+    offsets = array('q', [0])
+    rows = array('q')
+    gaps = array('q')
+    distances = array('d')
+    for i in range(first, last):
+        for j, days_gap, site_to_site_distance in search.candidates(i):
+            rows.append(j)
+            gaps.append(days_gap)
+            distances.append(site_to_site_distance)
+        offsets.append(len(rows))
+
+    return offsets, rows, gaps, distances
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+class ChainGraph:
+    """
+    Contract-to-contract equipment transfer links.
+
+    Contracts are addressed by position, with a key -> position map for
+    O(1) lookup. Each contract has at most one predecessor and one
+    successor, so chains are simple paths: they are walked iteratively and
+    summarized (length, total savings, start date span) in time linear in the
+    number of contracts.
+    """
+
+    def __init__(self, keys: Iterable[str], start_dates: Optional[Iterable[str]] = None):
+        self.keys: List[str] = list(keys)
+        self.index: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.start_dates: Optional[List[str]] = list(start_dates) if start_dates is not None else None
+
+        count = len(self.keys)
+        self.next = [-1] * count
+        self.prev = [-1] * count
+        # Savings of the transfer *into* each contract from its predecessor
+        self.link_savings = [0.0] * count
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_contracts_list(cls, contracts_list: List[Dict]) -> 'ChainGraph':
+        """Build from build_contract_chains output, following next_contract links."""
+
+        graph = cls(
+            [contract['contract_key'] for contract in contracts_list],
+            [contract['start_date'] for contract in contracts_list]
+        )
+
+        for contract in contracts_list:
+            next_contract = contract.get('next_contract')
+            if next_contract:
+                graph.link(
+                    graph.index[contract['contract_key']],
+                    graph.index[next_contract['contract_key']],
+                    next_contract['savings_km']
+                )
+
+        return graph
+
+    def link(self, prev: int, successor: int, savings_km: float) -> bool:
+        """Add prev -> successor unless either end is already linked."""
+        if self.next[prev] != -1 or self.prev[successor] != -1:
+            return False
+
+        self.next[prev] = successor
+        self.prev[successor] = prev
+        self.link_savings[successor] = savings_km
+        return True
+
+    def heads(self) -> List[int]:
+        """Contracts that start a chain: nothing flows in, something flows out."""
+        return [i for i in range(len(self.keys)) if self.prev[i] == -1 and self.next[i] != -1]
+
+    def walk(self, head: int) -> List[int]:
+        """Positions along the chain starting at head."""
+        chain = [head]
+        node = self.next[head]
+
+        # Bounded by the contract count so malformed (cyclic) links cannot spin forever
+        while node != -1 and len(chain) <= len(self.keys):
+            chain.append(node)
+            node = self.next[node]
+
+        return chain
+
+    def chains(self, heads: Optional[Iterable[int]] = None) -> List[Dict]:
+        """
+        Walk every chain from its head (by default, all heads()) and return
+        one summary per chain, longest first. Each summary has:
+        positions, contracts (keys), length, total_savings_km and, when start
+        dates are known, start_date, last_start_date (the last contract's
+        start) and start_span_days between the two.
+        """
+
+        summaries = []
+        for head in (self.heads() if heads is None else heads):
+            positions = self.walk(head)
+            summary = {
+                'positions': positions,
+                'contracts': [self.keys[i] for i in positions],
+                'length': len(positions),
+                'total_savings_km': sum(self.link_savings[i] for i in positions[1:])
+            }
+
+            if self.start_dates is not None:
+                first, last = self.start_dates[positions[0]], self.start_dates[positions[-1]]
+                summary['start_date'] = first
+                summary['last_start_date'] = last
+                summary['start_span_days'] = (date.fromisoformat(last[:10]) - date.fromisoformat(first[:10])).days
+
+            summaries.append(summary)
+
+        summaries.sort(key=lambda summary: summary['length'], reverse=True)
+        return summaries
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import logging
+import os
+import time
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+from contract_chains import CHAIN_LOG_PATH, CHAINS_PATH, next_contract_record, prev_contract_record
+from contract_index import EndDateIndex
+from contract_table import MICROSECONDS_PER_DAY, ContractTable, contract_row, format_timestamp
+from distance_engine import PROVIDERS, ROAD_MATRIX_PATH, DistanceProvider, below_threshold, get_provider
+from snapshot_cache import load_json_cached
+from spatial_index import SiteGrid, euclidean_distance
+
+# Fields build_contract_chains adds to each contract in the chains file
+CHAIN_FIELDS = ('prev_contract', 'next_contract')
+
+logger = logging.getLogger(__name__)
+
+def load_chains(path: str = CHAINS_PATH, log_path: str = CHAIN_LOG_PATH) -> Dict:
+    """
+    The chains file with its delta log replayed over it, as a
+    {contract_key: contract} dict. Without a log this is the (shared,
+    cached) file itself. Replay stops, with a warning, at a line that does
+    not parse: normally a last line half-written by a crash, which the next
+    change cuts off (see repair_log_tail).
+    """
+
+    data = load_json_cached(path)
+    if not os.path.exists(log_path):
+        return data
+
+    data = dict(data)
+    with open(log_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            try:
+                delta = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Stopped replaying %s at unreadable line %d; later deltas were not applied", log_path, line_number)
+                break
+
+            contract_key = delta['contract_key']
+            if delta.get('removed'):
+                data.pop(contract_key, None)
+                continue
+
+            contract = dict(delta['contract'] if 'contract' in delta else data[contract_key])
+            contract['prev_contract'] = delta['prev_contract']
+            contract['next_contract'] = delta['next_contract']
+            data[contract_key] = contract
+
+    return data
+
+def repair_log_tail(log_path: str) -> None:
+    """
+    Make the delta log end with a complete line before more is appended.
+    A last line without its newline is kept (newline added) if it parses,
+    as load_chains has already applied it; otherwise it is the torn write
+    of a crash, which load_chains skipped, and is cut off.
+    """
+
+    try:
+        f = open(log_path, 'rb+')
+    except FileNotFoundError:
+        return
+
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+
+        # Start of the last line, searching back a block at a time
+        line_start = 0
+        block_end = size
+        while block_end > 0:
+            block_start = max(block_end - (1 << 16), 0)
+            f.seek(block_start)
+            newline = f.read(block_end - block_start).rfind(b'\n')
+            if newline != -1:
+                line_start = block_start + newline + 1
+                break
+            block_end = block_start
+
+        f.seek(line_start)
+        tail = f.read()
+        try:
+            json.loads(tail)
+        except ValueError:
+            logger.warning("Dropping a half-written last line (%d bytes) from %s", len(tail), log_path)
+            f.truncate(line_start)
+        else:
+            f.write(b'\n')
+
+class ChainMaintainer:
+    """
+    Keeps build_contract_chains' prev_contract/next_contract links current
+    as contracts are added, amended or closed, without a full rebuild.
+
+    A change only revisits contracts whose best predecessor it can move.
+    The contract itself and those that had its old version as predecessor
+    re-choose from scratch. Those starting inside the date window after its
+    new end date, within reach of its site, are offered the new version,
+    which replaces their predecessor only if it saves more (or as much and
+    comes first, since ties resolve as in the full build: by start date,
+    then export order). next_contract is then re-derived for just the
+    predecessors that gained or lost a claimant.
+
+    Rows are append-only columns indexed by a SiteGrid over end dates
+    (predecessor lookups) and an EndDateIndex over start dates (successor
+    lookups). An amended contract gets a fresh row; its old row is dropped
+    from both indexes.
+
+    Every change appends the chain records it altered to an append-only
+    JSONL delta log, which load_chains() replays over the chains file and
+    compact() folds back into it.
+
+    Depots first seen in a change serve that contract (and later ones);
+    contracts already loaded keep the depot they were measured from until
+    the next full build.
+    """
+
+    def __init__(
+        self,
+        contracts: Dict[str, Dict],
+        date_range_allowance: int = 10,
+        provider: Optional[DistanceProvider] = None,
+        log_path: Optional[str] = CHAIN_LOG_PATH
+    ):
+        self.contracts = {key: _without_chain_fields(contract) for key, contract in contracts.items()}
+        self.window = (date_range_allowance + 1) * MICROSECONDS_PER_DAY
+        self.log_path = log_path
+
+        table = ContractTable.from_contracts(self.contracts, provider=provider)
+        self.provider = table.provider
+        self.depots = table.depots
+
+        # Export order breaks start date ties; changed contracts keep theirs
+        self.export_order = {key: position for position, key in enumerate(self.contracts)}
+
+        self.keys: List[str] = list(table.keys)
+        self.site_names: List[str] = list(table.site_names)
+        self.latitudes = array('d', table.latitudes)
+        self.longitudes = array('d', table.longitudes)
+        self.start_times = array('q', table.start_times)
+        self.end_times = array('q', table.end_times)
+        self.distance_to_depot = array('d', table.distance_to_depot)
+        self.site_ids = array('i', table.site_ids)
+        self.orders = array('q', (self.export_order[key] for key in table.keys))
+        self.row_of: Dict[str, int] = {key: i for i, key in enumerate(self.keys)}
+        self.max_abs_lat = max((abs(lat) for lat in self.latitudes), default=0.0)
+
+        self.grid = SiteGrid(self.latitudes, self.longitudes, self.end_times)
+        self.starts = EndDateIndex(self.start_times)
+
+        # prev_rows[i] is the row contract i takes equipment from (-1 for none)
+        # and best_savings[i] the unrounded km that saves; claimants[j] are
+        # the rows that chose j
+        self.prev_rows = array('i', [-1] * len(self.keys))
+        self.best_savings = array('d', [0.0] * len(self.keys))
+        self.claimants: Dict[int, Set[int]] = {}
+
+        # One record per row, shaped like build_contract_chains' contracts_list
+        self.records: Dict[str, Dict] = {}
+        for i, key in enumerate(self.keys):
+            self.records[key] = {
+                'contract_key': key,
+                'site_name': self.site_names[i],
+                'start_date': self.start_date(i),
+                'prev_contract': None,
+                'next_contract': None
+            }
+
+        # Links already in the chains file are kept; contracts without them are chained now
+        for i, key in enumerate(self.keys):
+            prev_contract = contracts[key].get('prev_contract')
+            if 'prev_contract' in contracts[key] and (prev_contract is None or prev_contract['contract_key'] in self.row_of):
+                j = self.row_of[prev_contract['contract_key']] if prev_contract else -1
+                savings = self.distance_to_depot[i] - self._distance(i, j) if j != -1 else 0.0
+            else:
+                j, savings, prev_contract = self._best_predecessor(i)
+            self._set_prev(i, j, savings, set())
+            self.records[key]['prev_contract'] = prev_contract
+
+        for j in self.claimants:
+            self.records[self.keys[j]]['next_contract'] = self._next_contract(j)
+
+    @classmethod
+    def load(
+        cls,
+        path: str = CHAINS_PATH,
+        log_path: str = CHAIN_LOG_PATH,
+        date_range_allowance: int = 10,
+        provider: Optional[DistanceProvider] = None
+    ) -> 'ChainMaintainer':
+        """Pick up the chains file and its delta log; further changes append to that log."""
+        return cls(load_chains(path, log_path), date_range_allowance, provider, log_path)
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    def start_date(self, i: int, fmt: str = '%Y-%m-%d') -> str:
+        return format_timestamp(self.start_times[i], fmt)
+
+    def end_date(self, i: int, fmt: str = '%Y-%m-%d') -> str:
+        return format_timestamp(self.end_times[i], fmt)
+
+    def add_contract(self, contract_key: str, contract: Dict) -> List[Dict]:
+        """Chain a new contract. Returns the deltas written to the log."""
+        if contract_key in self.contracts:
+            raise ValueError(f"Contract '{contract_key}' already exists; amend it instead")
+        self.export_order[contract_key] = len(self.export_order)
+        return self._apply(contract_key, _without_chain_fields(contract))
+
+    def amend_contract(self, contract_key: str, contract: Dict) -> List[Dict]:
+        """Replace a contract's data (dates, site, depot) and re-chain around it."""
+        if contract_key not in self.contracts:
+            raise KeyError(f"Unknown contract '{contract_key}'")
+        return self._apply(contract_key, _without_chain_fields(contract))
+
+    def close_contract(self, contract_key: str, end_date: str) -> List[Dict]:
+        """Record a contract's actualEndDate (an ISO date string, as in the export)."""
+        if contract_key not in self.contracts:
+            raise KeyError(f"Unknown contract '{contract_key}'")
+        return self._apply(contract_key, dict(self.contracts[contract_key], actualEndDate=end_date))
+
+    def _apply(self, contract_key: str, contract: Dict) -> List[Dict]:
+        """Swap in a contract's new version and re-chain only what it can affect."""
+
+        # Records as they were before this change, taken when first touched
+        before: Dict[str, Optional[Dict]] = {}
+        dirty: Set[int] = set()
+        rechoose: Set[int] = set()
+        offered: Set[int] = set()
+
+        old = self.row_of.pop(contract_key, None)
+        if old is not None:
+            rechoose |= self.claimants.get(old, set())
+            self.grid.remove(old, self.latitudes[old], self.longitudes[old], self.end_times[old])
+            self.starts.remove(old, self.start_times[old])
+            self._set_prev(old, -1, 0.0, dirty)
+            before[contract_key] = self.records.pop(contract_key)
+
+        if contract_key not in self.contracts or self.depots.position_of(contract) < 0:
+            self.depots.include(contract)
+        self.contracts[contract_key] = contract
+
+        row = contract_row(contract_key, contract, self.depots)
+        if row is not None:
+            new = self._add_row(row)
+            before.setdefault(contract_key, None)
+            self.records[contract_key] = {
+                'contract_key': contract_key,
+                'site_name': self.site_names[new],
+                'start_date': self.start_date(new),
+                'prev_contract': None,
+                'next_contract': None
+            }
+            rechoose.add(new)
+            offered = self._successor_rows(new) - rechoose
+
+        for i in sorted(rechoose):
+            j, savings, prev_contract = self._best_predecessor(i)
+            self._set_prev(i, j, savings, dirty)
+            self._update(self.keys[i], 'prev_contract', prev_contract, before)
+
+        for i in sorted(offered):
+            self._offer(i, new, dirty, before)
+
+        for j in dirty:
+            if self.row_of.get(self.keys[j]) == j:
+                self._update(self.keys[j], 'next_contract', self._next_contract(j), before)
+
+        deltas = []
+        for key, record in before.items():
+            current = self.records.get(key)
+            if key == contract_key:
+                if current is not None:
+                    deltas.append({
+                        'contract_key': key,
+                        'contract': contract,
+                        'prev_contract': current['prev_contract'],
+                        'next_contract': current['next_contract']
+                    })
+                elif record is not None:
+                    deltas.append({'contract_key': key, 'removed': True})
+            elif current != record:
+                deltas.append({'contract_key': key, 'prev_contract': current['prev_contract'], 'next_contract': current['next_contract']})
+
+        if deltas and self.log_path:
+            repair_log_tail(self.log_path)
+            with open(self.log_path, 'a') as f:
+                f.write(''.join(json.dumps(delta) + '\n' for delta in deltas))
+
+        return deltas
+
+    def _add_row(self, row: Tuple[str, str, float, float, int, int, int]) -> int:
+        contract_key, site_name, lat, lon, start_time, end_time, own_depot = row
+
+        i = len(self.keys)
+        site_id = self.provider.sites.intern(site_name, lat, lon)
+        _, distances = self.depots.assign([lat], [lon], [own_depot], self.provider, [site_id])
+
+        self.keys.append(contract_key)
+        self.site_names.append(site_name)
+        self.latitudes.append(lat)
+        self.longitudes.append(lon)
+        self.start_times.append(start_time)
+        self.end_times.append(end_time)
+        self.distance_to_depot.append(distances[0])
+        self.site_ids.append(site_id)
+        self.orders.append(self.export_order[contract_key])
+        self.prev_rows.append(-1)
+        self.best_savings.append(0.0)
+        self.row_of[contract_key] = i
+        self.max_abs_lat = max(self.max_abs_lat, abs(lat))
+
+        self.grid.add(i, lat, lon, end_time)
+        self.starts.insert(i, start_time)
+        return i
+
+    def _sort_key(self, i: int) -> Tuple[int, int]:
+        return self.start_times[i], self.orders[i]
+
+    def _distance(self, i: int, j: int) -> float:
+        """Site-to-site km from row i to row j."""
+        return float(self.provider.distances(
+            self.latitudes[i], self.longitudes[i],
+            [self.latitudes[j]], [self.longitudes[j]],
+            self.site_ids[i], [self.site_ids[j]]
+        )[0])
+
+    def _best_predecessor(self, i: int) -> Tuple[int, float, Optional[Dict]]:
+        """
+        Row, savings and prev_contract record of contract i's best
+        predecessor, as build_contract_chains picks it.
+        """
+
+        lat, lon = self.latitudes[i], self.longitudes[i]
+        start = self.start_times[i]
+        depot_distance = self.distance_to_depot[i]
+
+        # Flat-plane grid, so its radius is widened to cover the provider's
+        nearby = [
+            j for j in self.grid.query(lat, lon, self.provider.grid_radius(depot_distance, self.max_abs_lat), start - self.window, start)
+            if j != i
+        ]
+        if not nearby:
+            return -1, 0.0, None
+
+        distances = self.provider.distances(
+            lat, lon,
+            [self.latitudes[j] for j in nearby],
+            [self.longitudes[j] for j in nearby],
+            self.site_ids[i],
+            [self.site_ids[j] for j in nearby]
+        )
+        candidates = sorted(below_threshold(distances, nearby, depot_distance), key=lambda candidate: self._sort_key(candidate[0]))
+
+        best, best_savings, best_distance = -1, 0, 0.0
+        for j, site_to_site_distance in candidates:
+            if depot_distance - site_to_site_distance > best_savings:
+                best, best_savings, best_distance = j, depot_distance - site_to_site_distance, site_to_site_distance
+
+        # Only the winner is formatted
+        if best == -1:
+            return best, best_savings, None
+        return best, best_savings, prev_contract_record(
+            self.keys[best], self.site_names[best], self.end_date(best),
+            (start - self.end_times[best]) // MICROSECONDS_PER_DAY, best_distance, depot_distance
+        )
+
+    def _offer(self, i: int, j: int, dirty: Set[int], before: Dict[str, Optional[Dict]]) -> None:
+        """Make row j contract i's predecessor if it beats the current one (j ends inside i's window)."""
+
+        depot_distance = self.distance_to_depot[i]
+        site_to_site_distance = self._distance(i, j)
+        if site_to_site_distance >= depot_distance:
+            return
+
+        savings = depot_distance - site_to_site_distance
+        current = self.prev_rows[i]
+        if savings > self.best_savings[i] or (
+            current != -1 and savings == self.best_savings[i] and self._sort_key(j) < self._sort_key(current)
+        ):
+            self._set_prev(i, j, savings, dirty)
+            self._update(self.keys[i], 'prev_contract', prev_contract_record(
+                self.keys[j], self.site_names[j], self.end_date(j),
+                (self.start_times[i] - self.end_times[j]) // MICROSECONDS_PER_DAY, site_to_site_distance, depot_distance
+            ), before)
+
+    def _successor_rows(self, j: int) -> Set[int]:
+        """
+        Rows that may take row j as predecessor: those starting within the
+        window after j ended whose (widened) depot radius reaches j's site.
+        """
+
+        end = self.end_times[j]
+        lat, lon = self.latitudes[j], self.longitudes[j]
+        grid_radius = self.provider.grid_radius
+
+        return {
+            i for i in self.starts.ended_between(end - 1, end + self.window - 1)
+            if i != j and euclidean_distance(lat, lon, self.latitudes[i], self.longitudes[i])
+            <= grid_radius(self.distance_to_depot[i], self.max_abs_lat) + 1e-6
+        }
+
+    def _set_prev(self, i: int, j: int, savings: float, dirty: Set[int]) -> None:
+        """Point row i at predecessor j, marking both old and new predecessors for a next_contract refresh."""
+        previous = self.prev_rows[i]
+        if previous != -1:
+            self.claimants[previous].discard(i)
+            if not self.claimants[previous]:
+                del self.claimants[previous]
+            dirty.add(previous)
+
+        self.prev_rows[i] = j
+        self.best_savings[i] = savings
+        if j != -1:
+            self.claimants.setdefault(j, set()).add(i)
+            dirty.add(j)
+
+    def _next_contract(self, j: int) -> Optional[Dict]:
+        """The first contract (by start date, then export order) to claim row j keeps it."""
+        claimants = self.claimants.get(j)
+        if not claimants:
+            return None
+        return next_contract_record(self.records[self.keys[min(claimants, key=self._sort_key)]])
+
+    def _update(self, contract_key: str, field: str, value: Optional[Dict], before: Dict[str, Optional[Dict]]) -> None:
+        record = self.records[contract_key]
+        if contract_key not in before:
+            before[contract_key] = dict(record)
+        record[field] = value
+
+    def contracts_list(self) -> List[Dict]:
+        """Current chain records in start date order, as build_contract_chains returns them."""
+        rows = sorted(self.row_of.values(), key=self._sort_key)
+        return [self.records[self.keys[i]] for i in rows]
+
+    def compact(self, path: str = CHAINS_PATH) -> int:
+        """Rewrite the chains file in full and clear the delta log; returns the contract count."""
+
+        modified_data = {}
+        for record in self.contracts_list():
+            contract = dict(self.contracts[record['contract_key']])
+            contract['prev_contract'] = record['prev_contract']
+            contract['next_contract'] = record['next_contract']
+            modified_data[record['contract_key']] = contract
+
+        with open(path, 'w') as f:
+            json.dump(modified_data, f, indent=2)
+        if self.log_path and os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+        return len(modified_data)
+
+def _without_chain_fields(contract: Dict) -> Dict:
+    return {field: value for field, value in contract.items() if field not in CHAIN_FIELDS}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Keep contract chain links current as contracts change, logging only the links that move.'
+    )
+    parser.add_argument('changes', nargs='?',
+                        help='JSON {contract_key: contract} of new or amended contracts')
+    parser.add_argument('--close', nargs=2, action='append', default=[], metavar=('CONTRACT', 'END_DATE'),
+                        help='record an actualEndDate for a contract (repeatable)')
+    parser.add_argument('--compact', action='store_true',
+                        help=f'rewrite {CHAINS_PATH} in full and clear the delta log')
+    parser.add_argument('--distance', choices=list(PROVIDERS), default='flat',
+                        help='distance provider the chains were built with (default: flat)')
+    parser.add_argument('--road-matrix', default=ROAD_MATRIX_PATH,
+                        help=f'road distance matrix for --distance road (default: {ROAD_MATRIX_PATH})')
+    args = parser.parse_args()
+
+    print("=== CHAIN MAINTENANCE ===\n")
+
+    started = time.perf_counter()
+    maintainer = ChainMaintainer.load(provider=get_provider(args.distance, args.road_matrix))
+    print(f"Loaded {len(maintainer)} chained contracts in {time.perf_counter() - started:.2f}s")
+
+    changes = []
+    if args.changes:
+        with open(args.changes, 'r') as f:
+            changes.extend(json.load(f).items())
+
+    applied = deltas = 0
+    started = time.perf_counter()
+    for contract_key, contract in changes:
+        if contract_key in maintainer.contracts:
+            deltas += len(maintainer.amend_contract(contract_key, contract))
+        else:
+            deltas += len(maintainer.add_contract(contract_key, contract))
+        applied += 1
+    for contract_key, end_date in args.close:
+        if contract_key not in maintainer.contracts:
+            print(f"Skipping --close {contract_key}: not in {CHAINS_PATH}")
+            continue
+        deltas += len(maintainer.close_contract(contract_key, end_date))
+        applied += 1
+    elapsed = time.perf_counter() - started
+
+    if applied:
+        print(f"Applied {applied} changes in {elapsed * 1000:.1f} ms ({elapsed * 1000 / applied:.2f} ms per contract)")
+        print(f"Chain records changed: {deltas} (appended to {CHAIN_LOG_PATH})")
+
+    if args.compact:
+        count = maintainer.compact()
+        print(f"Rewrote {CHAINS_PATH} with {count} contracts and cleared the delta log")
+
+if __name__ == "__main__":
+    main()
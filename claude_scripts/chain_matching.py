@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+from collections import deque
+from itertools import chain
+from typing import Dict, List, Tuple
+
+from candidate_search import iter_predecessor_candidates
+from contract_table import ContractTable, load_contract_table
+
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix, hstack, identity
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+except ImportError:  # The pure-Python auction below solves the same problem, only slower
+    min_weight_full_bipartite_matching = None
+
+# Savings are matched as whole metres so the auction terminates exactly optimal
+METRES_PER_KM = 1000
+
+def auction_assignment(edges: List[List[Tuple[int, int]]], num_objects: int, scaling: int = 5) -> List[int]:
+    """
+    Maximum-weight bipartite matching by the forward auction algorithm with
+    epsilon scaling.
+
+    edges[i] lists (object, integer_weight) pairs person i may take; leaving
+    a person or an object unmatched is always allowed. To keep the auction
+    exact the problem is made square and always perfectly matchable:
+    - person i may also take a private "unmatched" object worth 0
+    - each real object k gets a placeholder person who may take k itself
+      (object unused) or the unmatched object of anyone who could take k
+
+    Returns, per person, the object it won or -1. With integer weights the
+    final epsilon is below 1/n, which makes the result an exact optimum.
+
+    Used when SciPy is missing; sparse_assignment is much faster at scale.
+    """
+
+    num_people = len(edges)
+    if not any(weight > 0 for options in edges for _, weight in options):
+        return [-1] * num_people
+
+    # Objects num_objects + i are person i's "unmatched" option
+    options: List[List[Tuple[int, int]]] = [
+        list(person_edges) + [(num_objects + i, 0)]
+        for i, person_edges in enumerate(edges)
+    ]
+    placeholder_options: List[List[Tuple[int, int]]] = [[(k, 0)] for k in range(num_objects)]
+    for i, person_edges in enumerate(edges):
+        for k, _ in person_edges:
+            placeholder_options[k].append((num_objects + i, 0))
+    options.extend(placeholder_options)
+
+    total = len(options)
+    prices = [0.0] * total
+    max_weight = max(weight for person_edges in edges for _, weight in person_edges)
+    final_epsilon = 1.0 / (total + 1)
+    epsilon = max(max_weight / scaling, final_epsilon)
+
+    while True:
+        owner = [-1] * total
+        assigned = [-1] * total
+        queue = deque(range(total))
+
+        while queue:
+            i = queue.popleft()
+
+            # Best and second-best net value over this person's options
+            best_value = second_value = float('-inf')
+            best_object = -1
+
+            for k, weight in options[i]:
+                value = weight - prices[k]
+                if value > best_value:
+                    second_value = best_value
+                    best_value = value
+                    best_object = k
+                elif value > second_value:
+                    second_value = value
+
+            # A person with a single option only needs to outbid by epsilon
+            if second_value == float('-inf'):
+                second_value = best_value
+
+            prices[best_object] += best_value - second_value + epsilon
+
+            evicted = owner[best_object]
+            if evicted != -1:
+                assigned[evicted] = -1
+                queue.append(evicted)
+
+            owner[best_object] = i
+            assigned[i] = best_object
+
+        if epsilon <= final_epsilon:
+            return [k if k < num_objects else -1 for k in assigned[:num_people]]
+
+        epsilon = max(epsilon / scaling, final_epsilon)
+
+def sparse_assignment(edges: List[List[Tuple[int, int]]], num_objects: int) -> List[int]:
+    """
+    The same maximum-weight matching as auction_assignment, solved as a
+    sparse minimum-cost matching of every person (SciPy's LAPJVsp).
+
+    Each person may also take a private zero-saving "depot" column, so
+    every person is always matchable and objects may go unused. A matching
+    of every person has exactly one edge per person, so costs are weights
+    subtracted from one constant above the largest weight: all stay
+    positive (no explicit zeros) and the minimum is the maximum-savings
+    matching.
+    """
+
+    num_people = len(edges)
+    if not any(weight > 0 for options in edges for _, weight in options):
+        return [-1] * num_people
+
+    counts = np.fromiter(map(len, edges), dtype=np.int64, count=num_people)
+    indptr = np.zeros(num_people + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    flat = np.fromiter(chain.from_iterable(chain.from_iterable(edges)), dtype=np.int64, count=2 * int(indptr[-1]))
+    indices, weights = flat[0::2], flat[1::2]
+    ceiling = float(weights.max() + 1)
+
+    # Columns: the objects, then person i's depot column num_objects + i (weight 0)
+    biadjacency = hstack([
+        csr_matrix((ceiling - weights, indices, indptr), shape=(num_people, num_objects)),
+        identity(num_people, format='csr') * ceiling
+    ], format='csr')
+    _, matched = min_weight_full_bipartite_matching(biadjacency)
+
+    return [int(k) if k < num_objects else -1 for k in matched]
+
+def greedy_assignment(candidate_lists: List[List[Tuple[int, float]]]) -> Tuple[Dict[int, Tuple[int, float]], Dict[int, Tuple[int, float]]]:
+    """
+    What build_contract_chains does: each contract claims its single
+    highest-saving predecessor, then the first claimant in start order keeps
+    it. Returns (claimed, kept) as {successor: (predecessor, savings_km)}.
+    """
+
+    claimed = {}
+    for i, options in enumerate(candidate_lists):
+        best_prev, best_savings = None, 0
+        for j, savings in options:
+            if savings > best_savings:
+                best_prev, best_savings = j, savings
+        if best_prev is not None:
+            claimed[i] = (best_prev, best_savings)
+
+    taken = set()
+    kept = {}
+    for i, (j, savings) in claimed.items():
+        if j not in taken:
+            taken.add(j)
+            kept[i] = (j, savings)
+
+    return claimed, kept
+
+def global_assignment(table: ContractTable, date_range_allowance: int = 10) -> Dict:
+    """
+    Conflict-free, maximum-savings predecessor -> successor assignment.
+
+    Every contract is a successor (needing equipment) and a predecessor
+    (freeing equipment); each can give and receive at most one transfer.
+    Returns the optimal links alongside the greedy ones for comparison:
+    {'optimal': {...}, 'greedy_claimed': {...}, 'greedy_kept': {...}} with
+    values {successor: (predecessor, savings_km)}.
+    """
+
+    candidate_lists: List[List[Tuple[int, float]]] = [[] for _ in range(len(table))]
+    for i, candidates in iter_predecessor_candidates(table, date_range_allowance):
+        depot_distance = table.distance_to_depot[i]
+        candidate_lists[i] = [
+            (j, depot_distance - site_to_site_distance)
+            for j, _, site_to_site_distance in candidates
+        ]
+
+    edges = [
+        [(j, int(round(savings * METRES_PER_KM))) for j, savings in options]
+        for options in candidate_lists
+    ]
+    if min_weight_full_bipartite_matching is not None:
+        assigned = sparse_assignment(edges, len(table))
+    else:
+        assigned = auction_assignment(edges, len(table))
+
+    optimal = {}
+    for i, j in enumerate(assigned):
+        if j != -1:
+            optimal[i] = (j, dict(candidate_lists[i])[j])
+
+    greedy_claimed, greedy_kept = greedy_assignment(candidate_lists)
+
+    return {
+        'optimal': optimal,
+        'greedy_claimed': greedy_claimed,
+        'greedy_kept': greedy_kept
+    }
+
+def chains_from_links(links: Dict[int, Tuple[int, float]]) -> List[List[int]]:
+    """Follow predecessor -> successor links from each chain head, longest first."""
+
+    next_of = {j: i for i, (j, _) in links.items()}
+    chains = []
+
+    for head in sorted(next_of):
+        if head in links:
+            continue
+
+        chain = [head]
+        while chain[-1] in next_of:
+            chain.append(next_of[chain[-1]])
+        chains.append(chain)
+
+    chains.sort(key=len, reverse=True)
+    return chains
+
+def main():
+    print("=== GLOBAL EQUIPMENT TRANSFER ASSIGNMENT ===\n")
+
+    table = load_contract_table()
+    result = global_assignment(table)
+
+    rows = [
+        ('Greedy (claimed)', result['greedy_claimed']),
+        ('Greedy (conflict-free)', result['greedy_kept']),
+        ('Global optimum', result['optimal'])
+    ]
+
+    print(f"{'Assignment':<24} {'Transfers':<10} {'Savings (km)'}")
+    print("-" * 50)
+    for label, links in rows:
+        total = sum(savings for _, savings in links.values())
+        print(f"{label:<24} {len(links):<10} {total:.1f}")
+
+    greedy_total = sum(savings for _, savings in result['greedy_kept'].values())
+    optimal_total = sum(savings for _, savings in result['optimal'].values())
+    claimed_total = sum(savings for _, savings in result['greedy_claimed'].values())
+    dropped = len(result['greedy_claimed']) - len(result['greedy_kept'])
+
+    print(f"\nGreedy conflicts silently dropped: {dropped} transfers "
+          f"({claimed_total - greedy_total:.1f} km claimed but not realisable)")
+    if greedy_total > 0:
+        improvement = optimal_total - greedy_total
+        print(f"Global improvement over conflict-free greedy: {improvement:.1f} km "
+              f"({improvement / greedy_total * 100:.1f}%)")
+
+    chains = chains_from_links(result['optimal'])
+    print(f"\n=== OPTIMAL CHAINS ===")
+    print(f"Total chains found: {len(chains)}")
+    if chains:
+        print(f"Longest chain: {len(chains[0])} contracts")
+        print(" → ".join(table.keys[i] for i in chains[0]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+import pytest
+
+import contract_table
+import snapshot_cache
+
+VICTORIA_PATH = 'extracted_data/2023_vms_victoria.json'
+
+DEPOTS = (
+    {'id': 1, 'name': 'VIC ELECTRONICS', 'shortCode': 'VICE', 'address': {'latitude': '-37.6805', 'longitude': '145.0064'}},
+    {'id': 2, 'name': 'GEELONG', 'shortCode': 'GEEL', 'address': {'latitude': '-38.1499', 'longitude': '144.3617'}}
+)
+
+def synthetic_contracts(seed: int, count: int = 300, sites: int = 80) -> Dict[str, Dict]:
+    """A {contract_key: contract} export shaped like 2023_vms_victoria.json, reproducible per seed."""
+
+    rng = random.Random(seed)
+    locations = [(-37.8 + rng.uniform(-1.2, 1.2), 145.0 + rng.uniform(-1.5, 1.5)) for _ in range(sites)]
+    year_start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+    contracts = {}
+    for k in range(count):
+        site = rng.randrange(sites)
+        start = year_start + timedelta(days=rng.uniform(0, 120))
+        end = start + timedelta(days=rng.uniform(1, 20))
+        lat, lon = locations[site]
+
+        contracts[f"C{k:04d}"] = {
+            'id': k,
+            'startDate': start.isoformat().replace('+00:00', 'Z'),
+            'plannedEndDate': end.isoformat().replace('+00:00', 'Z'),
+            'siteAddress': {'name': f"Site {site}", 'latitude': str(lat), 'longitude': str(lon)},
+            'depot': DEPOTS[rng.randrange(len(DEPOTS))],
+            'hireContractLines': []
+        }
+
+    return contracts
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    A fresh working directory (extracted_data/ and reports/ created) with
+    the per-process dataset caches emptied, so relative paths the scripts
+    hard-code resolve to this test's files.
+    """
+    (tmp_path / 'extracted_data').mkdir()
+    (tmp_path / 'reports').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(contract_table, '_loaded_tables', {})
+    monkeypatch.setattr(snapshot_cache, '_loaded_json', {})
+    return tmp_path
+
+def write_export(path: str, contracts: Dict[str, Dict]) -> None:
+    with open(path, 'w') as f:
+        json.dump(contracts, f, indent=2)
@@ -1,190 +1,147 @@
 #!/usr/bin/env python3
 import json
-import math
-from datetime import datetime
+import os
 from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
 
-def euclidean_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate Euclidean distance between two points in kilometers."""
-    lat_diff = (lat2 - lat1) * 111
-    lon_diff = (lon2 - lon1) * 85
-    return math.sqrt(lat_diff**2 + lon_diff**2)
-
-def build_contract_chains(date_range_allowance: int = 10):
+from candidate_search import iter_predecessor_candidates
+from chain_graph import ChainGraph
+from contract_table import load_contract_table
+from distance_engine import DistanceProvider, parse_distance_arguments
+from snapshot_cache import load_json_cached
+
+CHAINS_PATH = 'extracted_data/2023_vms_victoria_with_chains.json'
+
+# Chain links changed since CHAINS_PATH was last written in full (see chain_maintenance)
+CHAIN_LOG_PATH = 'extracted_data/2023_vms_victoria_with_chains.deltas.jsonl'
+
+def prev_contract_record(
+    contract_key: str,
+    site_name: str,
+    end_date: str,
+    days_gap: int,
+    site_to_site_distance: float,
+    depot_distance: float
+) -> Dict:
+    """prev_contract entry for a predecessor candidate, as build_contract_chains records it."""
+    savings = depot_distance - site_to_site_distance
+    return {
+        'contract_key': contract_key,
+        'site_name': site_name,
+        'end_date': end_date,
+        'days_gap': days_gap,
+        'site_to_site_km': round(site_to_site_distance, 1),
+        'savings_km': round(savings, 1),
+        'savings_percentage': round((savings / depot_distance) * 100, 1)
+    }
+
+def next_contract_record(contract: Dict) -> Dict:
+    """next_contract entry pointing at a chain record, from that record's prev_contract."""
+    return {
+        'contract_key': contract['contract_key'],
+        'site_name': contract['site_name'],
+        'start_date': contract['start_date'],
+        'days_gap': contract['prev_contract']['days_gap'],
+        'site_to_site_km': contract['prev_contract']['site_to_site_km'],
+        'savings_km': contract['prev_contract']['savings_km']
+    }
+
+def build_contract_chains(
+    date_range_allowance: int = 10,
+    provider: Optional[DistanceProvider] = None,
+    workers: int = 1,
+    max_distance_from_depot: Optional[float] = None
+):
     """
     Build contract chains showing optimal equipment flow from contract to contract.
     Add prev_contract and next_contract fields to each contract.
+    Distances come from provider (the flat 111/85 plane by default); with
+    workers > 1 the candidate search is shared across that many processes.
+    Contracts further than max_distance_from_depot (km, if given) from
+    their depot get no prev_contract.
     """
 
-    with open('extracted_data/2023_vms_victoria.json', 'r') as f:
-        data = json.load(f)
-
-    depot_lat, depot_lon = -37.6805, 145.0064
-
-    contracts_list = []
-
-    # Prepare contract data
-    for contract_key, contract in data.items():
-        site_address = contract.get('siteAddress', {})
-        lat = site_address.get('latitude')
-        lon = site_address.get('longitude')
-
-        start_date_str = contract.get('startDate')
-        end_date_str = contract.get('actualEndDate') or contract.get('plannedEndDate')
-
-        if not all([lat, lon, start_date_str, end_date_str]):
-            continue
-
-        try:
-            site_lat = float(lat)
-            site_lon = float(lon)
-            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
+    # Columnar contract data, parsed once per dataset and shared between analyses;
+    # each contract's baseline is its own depot (or the nearest one)
+    table = load_contract_table('extracted_data/2023_vms_victoria.json', provider=provider)
 
-            distance_to_depot = euclidean_distance(site_lat, site_lon, depot_lat, depot_lon)
-
-            contracts_list.append({
-                'contract_key': contract_key,
-                'site_name': site_address.get('name', ''),
-                'latitude': site_lat,
-                'longitude': site_lon,
-                'start_date': start_date,
-                'end_date': end_date,
-                'distance_to_depot': distance_to_depot,
-                'original_data': contract
-            })
-
-        except (ValueError, TypeError):
-            continue
-
-    # Sort contracts by start date
-    contracts_list.sort(key=lambda x: x['start_date'])
+    # One chain record per contract, in start date order
+    contracts_list = [
+        {
+            'contract_key': table.keys[i],
+            'site_name': table.site_names[i],
+            'start_date': table.start_date(i)
+        }
+        for i in range(len(table))
+    ]
 
     # Find optimal prev_contract for each contract
-    for i, current_contract in enumerate(contracts_list):
-        current_start = current_contract['start_date']
-        current_lat = current_contract['latitude']
-        current_lon = current_contract['longitude']
-        current_depot_distance = current_contract['distance_to_depot']
+    for i, candidates in iter_predecessor_candidates(table, date_range_allowance, workers):
+        current_depot_distance = table.distance_to_depot[i]
+        if max_distance_from_depot is not None and current_depot_distance > max_distance_from_depot:
+            candidates = []
 
-        best_prev_contract = None
+        best_candidate = None
         best_savings = 0
 
-        # Look for best previous contract
-        for j, previous_contract in enumerate(contracts_list):
-            if i == j:
-                continue
-
-            prev_end = previous_contract['end_date']
-            days_difference = (current_start - prev_end).days
-
-            # Check if previous contract ended within allowable range
-            if 0 <= days_difference <= date_range_allowance:
-                prev_lat = previous_contract['latitude']
-                prev_lon = previous_contract['longitude']
-
-                site_to_site_distance = euclidean_distance(
-                    prev_lat, prev_lon, current_lat, current_lon
-                )
-
-                # Check if site-to-site is closer than depot-to-site
-                if site_to_site_distance < current_depot_distance:
-                    potential_savings = current_depot_distance - site_to_site_distance
-
-                    if potential_savings > best_savings:
-                        best_savings = potential_savings
-                        best_prev_contract = {
-                            'contract_key': previous_contract['contract_key'],
-                            'site_name': previous_contract['site_name'],
-                            'end_date': prev_end.strftime('%Y-%m-%d'),
-                            'days_gap': days_difference,
-                            'site_to_site_km': round(site_to_site_distance, 1),
-                            'savings_km': round(potential_savings, 1),
-                            'savings_percentage': round((potential_savings / current_depot_distance) * 100, 1)
-                        }
-
-        current_contract['prev_contract'] = best_prev_contract
+        # Look for best previous contract, kept raw until the search is done
+        for candidate in candidates:
+            potential_savings = current_depot_distance - candidate[2]
+
+            if potential_savings > best_savings:
+                best_savings = potential_savings
+                best_candidate = candidate
+
+        # Only the winner is formatted
+        if best_candidate is None:
+            contracts_list[i]['prev_contract'] = None
+        else:
+            j, days_difference, site_to_site_distance = best_candidate
+            contracts_list[i]['prev_contract'] = prev_contract_record(
+                table.keys[j], table.site_names[j], table.end_date(j),
+                days_difference, site_to_site_distance, current_depot_distance
+            )
 
     # Now find next_contract for each (reverse lookup)
     for contract in contracts_list:
         contract['next_contract'] = None
 
+    position = {contract['contract_key']: i for i, contract in enumerate(contracts_list)}
+
     for contract in contracts_list:
         if contract['prev_contract']:
-            prev_key = contract['prev_contract']['contract_key']
-            # Find the previous contract and set its next_contract
-            for prev_contract in contracts_list:
-                if prev_contract['contract_key'] == prev_key:
-                    if prev_contract['next_contract'] is None:
-                        prev_contract['next_contract'] = {
-                            'contract_key': contract['contract_key'],
-                            'site_name': contract['site_name'],
-                            'start_date': contract['start_date'].strftime('%Y-%m-%d'),
-                            'days_gap': contract['prev_contract']['days_gap'],
-                            'site_to_site_km': contract['prev_contract']['site_to_site_km'],
-                            'savings_km': contract['prev_contract']['savings_km']
-                        }
-                    break
+            # The first contract (in start order) to claim a predecessor keeps it
+            prev_contract = contracts_list[position[contract['prev_contract']['contract_key']]]
+            if prev_contract['next_contract'] is None:
+                prev_contract['next_contract'] = next_contract_record(contract)
 
     return contracts_list
 
 def find_chain_lengths(contracts_list):
     """Find the longest chains of contract-to-contract equipment transfers."""
 
-    # Build adjacency list
-    graph = {}
-    for contract in contracts_list:
-        contract_key = contract['contract_key']
-        graph[contract_key] = []
-
-        if contract['next_contract']:
-            next_key = contract['next_contract']['contract_key']
-            graph[contract_key].append(next_key)
-
-    # Find all chains
-    visited = set()
-    chains = []
+    graph = ChainGraph.from_contracts_list(contracts_list)
 
-    def dfs(node, current_chain):
-        if node in visited:
-            return
+    # Chains start at contracts that are not destinations (no prev_contract)
+    start_nodes = [
+        graph.index[contract['contract_key']]
+        for contract in contracts_list
+        if contract['prev_contract'] is None and contract['next_contract'] is not None
+    ]
 
-        visited.add(node)
-        current_chain.append(node)
-
-        if node in graph:
-            for neighbor in graph[node]:
-                if neighbor not in visited:
-                    dfs(neighbor, current_chain.copy())
-
-        # If this is a leaf node, save the chain
-        if node not in graph or not graph[node]:
-            chains.append(current_chain)
-
-    # Start DFS from nodes that are not destinations (no prev_contract)
-    start_nodes = []
-    for contract in contracts_list:
-        if contract['prev_contract'] is None and contract['next_contract'] is not None:
-            start_nodes.append(contract['contract_key'])
-
-    for start_node in start_nodes:
-        if start_node not in visited:
-            dfs(start_node, [])
-
-    # Sort chains by length
-    chains.sort(key=len, reverse=True)
-
-    return chains
+    # Sorted by length, longest first
+    return [chain['contracts'] for chain in graph.chains(start_nodes)]
 
 def create_modified_json(contracts_list):
     """Create modified JSON with prev_contract and next_contract fields."""
 
+    data = load_json_cached('extracted_data/2023_vms_victoria.json')
+
     modified_data = {}
 
     for contract in contracts_list:
         contract_key = contract['contract_key']
-        original_data = contract['original_data'].copy()
+        original_data = data[contract_key].copy()
 
         # Add chain information
         original_data['prev_contract'] = contract['prev_contract']
@@ -192,17 +149,24 @@ def create_modified_json(contracts_list):
 
         modified_data[contract_key] = original_data
 
-    # Save modified JSON
-    with open('extracted_data/2023_vms_victoria_with_chains.json', 'w') as f:
+    # Save modified JSON; it holds every link, so earlier deltas no longer apply
+    with open(CHAINS_PATH, 'w') as f:
         json.dump(modified_data, f, indent=2)
+    if os.path.exists(CHAIN_LOG_PATH):
+        os.remove(CHAIN_LOG_PATH)
 
     return len(modified_data)
 
-def main():
+def main(provider: Optional[DistanceProvider] = None, workers: int = 1):
+    if provider is None:
+        # Command line: --distance, --road-matrix, --pair-cache and --workers
+        provider, workers = parse_distance_arguments('Link 2023 Victorian VMS contracts into equipment transfer chains.')
+
     print("=== CONTRACT CHAIN ANALYSIS ===\n")
 
     print("1. Building contract chains...")
-    contracts_list = build_contract_chains()
+    contracts_list = build_contract_chains(provider=provider, workers=workers)
+    provider.save_cache()
 
     print("2. Creating modified JSON with chain data...")
     modified_count = create_modified_json(contracts_list)
@@ -229,18 +193,14 @@ def main():
         if chains[0]:
             print(f"\n=== DETAILED VIEW: LONGEST CHAIN (Length {len(chains[0])}) ===")
             longest_chain = chains[0]
+            contracts_by_key = {contract['contract_key']: contract for contract in contracts_list}
 
             for i, contract_key in enumerate(longest_chain):
-                # Find contract details
-                contract_details = None
-                for contract in contracts_list:
-                    if contract['contract_key'] == contract_key:
-                        contract_details = contract
-                        break
+                contract_details = contracts_by_key.get(contract_key)
 
                 if contract_details:
                     site_name = contract_details['site_name'][:30]
-                    start_date = contract_details['start_date'].strftime('%Y-%m-%d')
+                    start_date = contract_details['start_date']
 
                     if i < len(longest_chain) - 1:
                         # Show connection to next
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+from bisect import bisect_left, bisect_right
+from typing import Any, List, Sequence
+
+class EndDateIndex:
+    """
+    Sorted index over contract end dates.
+
+    Answers "which contracts ended inside this window?" with two bisections
+    instead of a scan over every contract, so predecessor lookups cost
+    O(log n + k) where k is the number of contracts in the window.
+    Entries can be inserted and removed in place as contracts change.
+    """
+
+    def __init__(self, end_dates: Sequence[Any]):
+        # Positions into the caller's sequence, ordered by end date
+        self.order = sorted(range(len(end_dates)), key=lambda i: end_dates[i])
+        self.sorted_ends = [end_dates[i] for i in self.order]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def ended_between(self, after: Any, until: Any) -> List[int]:
+        """
+        Return positions of contracts with after < end_date <= until.
+        Positions are returned in ascending order so callers see candidates
+        in the same order as the sequence the index was built from.
+        """
+        lo = bisect_right(self.sorted_ends, after)
+        hi = bisect_right(self.sorted_ends, until)
+
+        return sorted(self.order[lo:hi])
+
+    def insert(self, position: int, end_date: Any) -> None:
+        """Add a position, after any existing entries with the same end date."""
+        k = bisect_right(self.sorted_ends, end_date)
+        self.sorted_ends.insert(k, end_date)
+        self.order.insert(k, position)
+
+    def remove(self, position: int, end_date: Any) -> bool:
+        """Drop a position indexed under end_date; False if it is not there."""
+        lo = bisect_left(self.sorted_ends, end_date)
+        hi = bisect_right(self.sorted_ends, end_date)
+        for k in range(lo, hi):
+            if self.order[k] == position:
+                del self.sorted_ends[k]
+                del self.order[k]
+                return True
+        return False
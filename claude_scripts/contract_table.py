@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from depot_table import DepotTable
+from distance_engine import DistanceProvider, get_provider
+from site_table import shared_site_table
+from snapshot_cache import load_json_cached, read_snapshot, source_fingerprint, write_snapshot
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECONDS_PER_DAY = 86_400_000_000
+
+# Bump when the table's columns or normalization change so old snapshots are rebuilt
+TABLE_FORMAT = 3
+
+NUMERIC_COLUMNS = ('latitudes', 'longitudes', 'start_times', 'end_times', 'distance_to_depot', 'depot_positions')
+STRING_COLUMNS = ('keys', 'site_names')
+
+# Tables already built from files in this process:
+# (path, depot_lat, depot_lon, provider key) -> ((size, mtime_ns) of the file, table)
+_loaded_tables: Dict[Tuple[str, Optional[float], Optional[float], str], Tuple[Tuple[int, int], 'ContractTable']] = {}
+
+def parse_timestamp(date_str: str) -> int:
+    """Parse an ISO date string from the export into integer epoch microseconds."""
+    date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+def format_timestamp(timestamp: int, fmt: str = '%Y-%m-%d') -> str:
+    """Format epoch microseconds back into a date string."""
+    return (EPOCH + timedelta(microseconds=timestamp)).strftime(fmt)
+
+def contract_row(contract_key: str, contract: Dict, depots: DepotTable) -> Optional[Tuple[str, str, float, float, int, int, int]]:
+    """
+    (key, site name, lat, lon, start, end, own depot row) for a contract
+    with usable site coordinates and dates, else None. The end is the
+    actual end date, else the planned one; the depot row is -1 when the
+    contract's depot is not in depots.
+    """
+
+    site_address = contract.get('siteAddress') or {}
+    lat = site_address.get('latitude')
+    lon = site_address.get('longitude')
+
+    start_date_str = contract.get('startDate')
+    end_date_str = contract.get('actualEndDate') or contract.get('plannedEndDate')
+
+    if not all([lat, lon, start_date_str, end_date_str]):
+        return None
+
+    try:
+        return (
+            contract_key,
+            site_address.get('name', ''),
+            float(lat),
+            float(lon),
+            parse_timestamp(start_date_str),
+            parse_timestamp(end_date_str),
+            depots.position_of(contract)
+        )
+    except (ValueError, TypeError):
+        return None
+
+class ContractTable:
+    """
+    Column-oriented contract store shared by the site-to-site analyses.
+
+    One row per contract with usable site coordinates and dates, sorted by
+    start date. Numeric columns are contiguous arrays:
+    - latitudes, longitudes: float64 site coordinates
+    - start_times, end_times: int64 epoch microseconds (end is actual, else planned)
+    - distance_to_depot: float64 km from the site to its baseline depot
+    - depot_positions: int32 row of that depot in depots
+    - site_ids: int32 id of the site (name and coordinates) in the
+      process-wide site table, so contracts at one site share distances
+
+    The baseline depot is the contract's own depot.address when it has
+    coordinates, else the nearest depot in the table; passing an explicit
+    depot location instead measures every site from that one point.
+    Distances come from the table's provider, which the site-to-site
+    searches over the table also use.
+
+    Times are kept at full precision rather than as epoch days so whole-day
+    gaps floor exactly like the datetime arithmetic they replace.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.site_names: List[Optional[str]] = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.start_times = array('q')
+        self.end_times = array('q')
+        self.distance_to_depot = array('d')
+        self.depot_positions = array('i')
+        self.depots = DepotTable()
+        self.provider = get_provider()
+        self.sites = shared_site_table()
+        self.site_ids = array('i')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_contracts(
+        cls,
+        data: Dict,
+        depot_lat: Optional[float] = None,
+        depot_lon: Optional[float] = None,
+        provider: Optional[DistanceProvider] = None
+    ) -> 'ContractTable':
+        """Build the table from a {contract_key: contract} export."""
+
+        if depot_lat is None or depot_lon is None:
+            depots = DepotTable.from_contracts(data)
+        else:
+            depots = DepotTable.single(depot_lat, depot_lon)
+
+        rows = []
+
+        for contract_key, contract in data.items():
+            row = contract_row(contract_key, contract, depots)
+            if row is not None:
+                rows.append(row)
+
+        # Sort contracts by start date (stable, so ties keep export order)
+        rows.sort(key=lambda row: row[4])
+
+        table = cls()
+        table.depots = depots
+        if provider is not None:
+            table.provider = provider
+        own_depots = []
+        for contract_key, site_name, site_lat, site_lon, start_time, end_time, own_depot in rows:
+            table.keys.append(contract_key)
+            table.site_names.append(site_name)
+            table.latitudes.append(site_lat)
+            table.longitudes.append(site_lon)
+            table.start_times.append(start_time)
+            table.end_times.append(end_time)
+            own_depots.append(own_depot)
+        table.site_ids = table.sites.intern_columns(table.site_names, table.latitudes, table.longitudes)
+
+        # Every site against every depot in one pass
+        table.depot_positions, table.distance_to_depot = depots.assign(
+            table.latitudes, table.longitudes, own_depots, table.provider, table.site_ids
+        )
+
+        return table
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        path: str,
+        depot_lat: Optional[float] = None,
+        depot_lon: Optional[float] = None,
+        provider: Optional[DistanceProvider] = None
+    ) -> Optional['ContractTable']:
+        """Load the table from <path>.table.snapshot if it is fresh, else None."""
+
+        provider = provider if provider is not None else get_provider()
+        snapshot = read_snapshot(f"{path}.table.snapshot", path, _snapshot_params(depot_lat, depot_lon, provider))
+        if snapshot is None:
+            return None
+
+        table = cls()
+        table.provider = provider
+        for name in NUMERIC_COLUMNS:
+            setattr(table, name, snapshot['arrays'][name])
+        for name in STRING_COLUMNS:
+            setattr(table, name, snapshot['strings'][name])
+        for i in snapshot['arrays']['null_site_names']:
+            table.site_names[i] = None
+        table.depots = DepotTable.from_records(snapshot['payload'])
+        table.site_ids = table.sites.intern_columns(table.site_names, table.latitudes, table.longitudes)
+
+        return table
+
+    def save_snapshot(self, path: str, depot_lat: Optional[float] = None, depot_lon: Optional[float] = None, fingerprint: Dict = None) -> bool:
+        """
+        Write the table beside its source file as <path>.table.snapshot.
+        Null site names are written as '' and listed in null_site_names.
+        """
+        arrays = {name: getattr(self, name) for name in NUMERIC_COLUMNS}
+        arrays['null_site_names'] = array('q', (i for i, name in enumerate(self.site_names) if name is None))
+
+        strings = {name: getattr(self, name) for name in STRING_COLUMNS}
+        strings['site_names'] = [name if name is not None else '' for name in self.site_names]
+
+        return write_snapshot(
+            f"{path}.table.snapshot",
+            path,
+            _snapshot_params(depot_lat, depot_lon, self.provider),
+            arrays=arrays,
+            strings=strings,
+            payload=self.depots.to_records(),
+            fingerprint=fingerprint
+        )
+
+    def days_gap(self, current: int, previous: int) -> int:
+        """Whole days between previous contract's end and current contract's start."""
+        return (self.start_times[current] - self.end_times[previous]) // MICROSECONDS_PER_DAY
+
+    def start_date(self, i: int, fmt: str = '%Y-%m-%d') -> str:
+        return format_timestamp(self.start_times[i], fmt)
+
+    def end_date(self, i: int, fmt: str = '%Y-%m-%d') -> str:
+        return format_timestamp(self.end_times[i], fmt)
+
+    def depot_name(self, i: int) -> str:
+        """Name of contract i's baseline depot."""
+        return self.depots.names[self.depot_positions[i]]
+
+def _snapshot_params(depot_lat: Optional[float], depot_lon: Optional[float], provider: DistanceProvider) -> Dict:
+    depot = [depot_lat, depot_lon] if depot_lat is not None and depot_lon is not None else 'contracts'
+    return {'kind': 'contract_table', 'format': TABLE_FORMAT, 'depot': depot, 'distance': provider.key}
+
+def load_contract_table(
+    path: str = 'extracted_data/2023_vms_victoria.json',
+    depot_lat: Optional[float] = None,
+    depot_lon: Optional[float] = None,
+    data: Optional[Dict] = None,
+    provider: Optional[DistanceProvider] = None
+) -> ContractTable:
+    """
+    Return the contract table for a dataset file, building it at most once
+    per process (again if the file's size or mtime changes). Each contract
+    is measured from its own or nearest depot unless a single depot
+    location is given, with distances from provider (the flat 111/85 plane
+    by default).
+
+    A fresh <path>.table.snapshot is used when present; otherwise the
+    source is parsed and the snapshot (re)written. Passing data builds the
+    table from those contracts instead, every call, without touching the
+    file, its snapshot or the memo.
+    """
+
+    provider = provider if provider is not None else get_provider()
+
+    if data is not None:
+        return ContractTable.from_contracts(data, depot_lat, depot_lon, provider)
+
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    cache_key = (path, depot_lat, depot_lon, provider.key)
+    loaded = _loaded_tables.get(cache_key)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+
+    table = ContractTable.from_snapshot(path, depot_lat, depot_lon, provider)
+
+    if table is None:
+        fingerprint = source_fingerprint(path)
+        table = ContractTable.from_contracts(load_json_cached(path), depot_lat, depot_lon, provider)
+        table.save_snapshot(path, depot_lat, depot_lon, fingerprint)
+
+    _loaded_tables[cache_key] = (version, table)
+    return table
@@ -1,26 +1,14 @@
 #!/usr/bin/env python3
-import json
-from collections import Counter
-from datetime import datetime
+from partitioned_store import load_partitioned_store
 
 def count_contracts_per_year():
-    with open('data/out.json', 'r') as f:
-        data = json.load(f)
-
-    year_counts = Counter()
-
-    for contract_key, contract in data.items():
-        # Use raisedDate as the contract year
-        raised_date = contract.get('raisedDate')
-        if raised_date:
-            try:
-                # Parse ISO datetime format
-                year = datetime.fromisoformat(raised_date.replace('Z', '+00:00')).year
-                year_counts[year] += 1
-            except:
-                print(f"Could not parse date for contract {contract_key}: {raised_date}")
-
-    return year_counts
+    # Per-year counts (by raisedDate) come from the partition manifest
+    store = load_partitioned_store()
+
+    for contract_key, raised_date, _ in store.manifest['unparsed']:
+        print(f"Could not parse date for contract {contract_key}: {raised_date}")
+
+    return store.year_counts()
 
 def main():
     year_counts = count_contracts_per_year()
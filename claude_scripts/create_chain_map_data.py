@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
+import html
 import json
 
+from chain_maintenance import load_chains
+from depot_table import DepotTable
+
 def extract_chain_coordinates():
     """Extract coordinates for the longest chains for mapping."""
 
-    with open('extracted_data/2023_vms_victoria_with_chains.json', 'r') as f:
-        data = json.load(f)
+    data = load_chains()
 
     # Define the chains
     chains = {
@@ -88,11 +91,24 @@ def extract_chain_coordinates():
     print("- reports/chain_mapping_data.json (for web mapping)")
     print("- reports/chain_mapping_data.csv (for GIS tools)")
 
-    # Create simple HTML map example
-    create_simple_map_html(mapping_data)
-
-def create_simple_map_html(mapping_data):
-    """Create a simple HTML file with Leaflet map showing the chains."""
+    # Create simple HTML map example, with every depot the contracts are served from
+    create_simple_map_html(mapping_data, DepotTable.from_contracts(data))
+
+def html_escaped(value):
+    """
+    Copy of JSON-style data with every string HTML-escaped, so names from
+    the export show as text in popups and cannot close the page's script.
+    """
+    if isinstance(value, str):
+        return html.escape(value)
+    if isinstance(value, dict):
+        return {key: html_escaped(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [html_escaped(item) for item in value]
+    return value
+
+def create_simple_map_html(mapping_data, depots: DepotTable):
+    """Create a simple HTML file with Leaflet map showing the chains and depots."""
 
     html_content = """<!DOCTYPE html>
 <html>
@@ -142,7 +158,7 @@ def create_simple_map_html(mapping_data):
         };
 
         // Chain data
-        var chainData = """ + json.dumps(mapping_data, indent=8) + """;
+        var chainData = """ + json.dumps(html_escaped(mapping_data), indent=8) + """;
 
         // Add chains to map
         Object.keys(chainData).forEach(function(chainName) {
@@ -183,19 +199,24 @@ def create_simple_map_html(mapping_data):
             }
         });
 
-        // Add depot marker
-        var depot = L.marker([-37.6805, 145.0064], {
-            icon: L.icon({
-                iconUrl: 'https://raw.githubusercontent.com/pointhi/leaflet-color-markers/master/img/marker-icon-black.png',
-                shadowUrl: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet/0.7.7/images/marker-shadow.png',
-                iconSize: [25, 41],
-                iconAnchor: [12, 41],
-                popupAnchor: [1, -34],
-                shadowSize: [41, 41]
-            })
-        }).addTo(map);
-
-        depot.bindPopup('<strong>VIC ELECTRONICS DEPOT</strong><br>Main depot for equipment');
+        // Depot data
+        var depotData = """ + json.dumps(html_escaped(depots.to_records()), indent=8) + """;
+
+        // Add depot markers
+        depotData.forEach(function(depotInfo) {
+            var depot = L.marker([depotInfo.latitude, depotInfo.longitude], {
+                icon: L.icon({
+                    iconUrl: 'https://raw.githubusercontent.com/pointhi/leaflet-color-markers/master/img/marker-icon-black.png',
+                    shadowUrl: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet/0.7.7/images/marker-shadow.png',
+                    iconSize: [25, 41],
+                    iconAnchor: [12, 41],
+                    popupAnchor: [1, -34],
+                    shadowSize: [41, 41]
+                })
+            }).addTo(map);
+
+            depot.bindPopup('<strong>' + depotInfo.name + ' DEPOT</strong><br>Depot for ' + depotInfo.contracts + ' contracts');
+        });
 
     </script>
 </body>
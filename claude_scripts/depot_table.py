@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from distance_engine import DistanceEngine, DistanceProvider, np
+from site_table import shared_site_table
+
+# Used when no contract carries usable depot coordinates
+FALLBACK_DEPOT = {'id': None, 'name': 'Melbourne Depot', 'shortCode': '', 'latitude': -37.6805, 'longitude': 145.0064}
+
+class DepotTable:
+    """
+    The depots contracts are served from, one row per depot with usable
+    depot.address coordinates, in first-seen order.
+
+    assign() gives every site its baseline depot: the contract's own depot
+    when it is listed here, otherwise the nearest one. Distances come from
+    one vectorized pass per depot over all sites, so a run with a handful
+    of depots costs a handful of array operations.
+    """
+
+    def __init__(self):
+        self.ids: List[Any] = []
+        self.names: List[str] = []
+        self.short_codes: List[str] = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.contract_counts: List[int] = []
+        self.index: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, depot_id: Any, name: str, short_code: str, lat: float, lon: float) -> int:
+        position = self.index[depot_id] = len(self.ids)
+        self.ids.append(depot_id)
+        self.names.append(name)
+        self.short_codes.append(short_code)
+        self.latitudes.append(lat)
+        self.longitudes.append(lon)
+        self.contract_counts.append(0)
+        return position
+
+    @classmethod
+    def from_contracts(cls, data: Dict) -> 'DepotTable':
+        """Collect the depots with coordinates from a {contract_key: contract} export."""
+
+        depots = cls()
+
+        for contract in data.values():
+            depots.include(contract)
+
+        if not depots:
+            depots.add_record(FALLBACK_DEPOT)
+
+        return depots
+
+    def include(self, contract: Dict) -> int:
+        """
+        Count a contract against its depot, adding the depot when it is new
+        and has coordinates. Returns the depot's row, or -1 if it has none.
+        """
+
+        depot = contract.get('depot') or {}
+        depot_id = _depot_id(depot)
+        if depot_id is None:
+            return -1
+
+        position = self.index.get(depot_id)
+        if position is None:
+            address = depot.get('address') or {}
+            lat = address.get('latitude')
+            lon = address.get('longitude')
+            if not (lat and lon):
+                return -1
+            try:
+                position = self.add(depot_id, depot.get('name', 'Unknown'), depot.get('shortCode', ''), float(lat), float(lon))
+            except (ValueError, TypeError):
+                return -1
+
+        self.contract_counts[position] += 1
+        return position
+
+    @classmethod
+    def single(cls, lat: float, lon: float, name: str = 'Depot') -> 'DepotTable':
+        """A table holding just one fixed depot, for single-depot runs."""
+        depots = cls()
+        depots.add(None, name, '', lat, lon)
+        return depots
+
+    def position_of(self, contract: Dict) -> int:
+        """Row of a contract's own depot, or -1 if it is not in the table."""
+        depot_id = _depot_id(contract.get('depot') or {})
+        return self.index.get(depot_id, -1) if depot_id is not None else -1
+
+    def assign(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        own: Sequence[int],
+        provider: Optional[DistanceProvider] = None,
+        site_ids: Optional[Sequence[int]] = None
+    ) -> Tuple[array, array]:
+        """
+        Baseline depot for each site: own[k] when it is a depot row (>= 0),
+        else the nearest depot (the first listed on ties).
+        Distances come from provider (the flat plane by default), through
+        its pair cache when the sites' ids are given.
+        Returns (depot_positions, distances_km).
+        """
+
+        engine = DistanceEngine(latitudes, longitudes, provider, site_ids)
+        sites = shared_site_table()
+        columns = [
+            engine.distances_to_point(lat, lon, origin=sites.intern(name, lat, lon))
+            for name, lat, lon in zip(self.names, self.latitudes, self.longitudes)
+        ]
+
+        if not len(engine):
+            return array('i'), array('d')
+
+        if np is not None:
+            matrix = np.vstack(columns)
+            own_positions = np.asarray(own, dtype=np.intp)
+            positions = np.where(own_positions >= 0, own_positions, np.argmin(matrix, axis=0))
+            distances = matrix[positions, np.arange(len(engine))]
+            return array('i', positions.tolist()), array('d', distances.tolist())
+
+        positions = array('i')
+        distances = array('d')
+        for k, depot in enumerate(own):
+            if depot < 0:
+                depot = min(range(len(columns)), key=lambda d: columns[d][k])
+            positions.append(depot)
+            distances.append(columns[depot][k])
+        return positions, distances
+
+    def add_record(self, record: Dict) -> int:
+        position = self.add(record['id'], record['name'], record['shortCode'], record['latitude'], record['longitude'])
+        self.contract_counts[position] = record.get('contracts', 0)
+        return position
+
+    def to_records(self) -> List[Dict]:
+        return [
+            {
+                'id': self.ids[d],
+                'name': self.names[d],
+                'shortCode': self.short_codes[d],
+                'latitude': self.latitudes[d],
+                'longitude': self.longitudes[d],
+                'contracts': self.contract_counts[d]
+            }
+            for d in range(len(self))
+        ]
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'DepotTable':
+        depots = cls()
+        for record in records:
+            depots.add_record(record)
+        return depots
+
+def _depot_id(depot: Dict) -> Any:
+    """Identity of a contract's depot: its id, else its name."""
+    if not depot:
+        return None
+    depot_id = depot.get('id')
+    return depot_id if depot_id is not None else depot.get('name')
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pair_cache import PairCache
+from site_table import SiteTable, shared_site_table
+from snapshot_cache import file_hash
+from spatial_index import KM_PER_DEGREE_LAT, KM_PER_DEGREE_LON, euclidean_distance
+
+try:
+    import numpy as np
+except ImportError:  # Scalar fallback below keeps every analysis working
+    np = None
+
+EARTH_RADIUS_KM = 6371
+
+# Length of one degree of latitude on the haversine sphere
+KM_PER_DEGREE_ARC = EARTH_RADIUS_KM * math.pi / 180
+
+# Flat-plane distance that covers every site on the globe
+WHOLE_PLANE_KM = math.hypot(180 * KM_PER_DEGREE_LAT, 360 * KM_PER_DEGREE_LON)
+
+ROAD_MATRIX_PATH = 'data/road_distances.json'
+
+# Road matrix sites are matched on coordinates rounded to this many places
+ROAD_MATRIX_DIGITS = 5
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two points, as Index.html computes it."""
+    d_lat = math.radians(lat2 - lat1)
+    d_lon = math.radians(lon2 - lon1)
+    a = (0.5 - math.cos(d_lat) / 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * (1 - math.cos(d_lon)) / 2)
+    return EARTH_RADIUS_KM * 2 * math.asin(math.sqrt(a))
+
+class DistanceProvider:
+    """
+    A site-to-site distance backend.
+
+    Subclasses implement pairwise() for one origin against many
+    destinations (a NumPy array when NumPy is available, else a list).
+    distances() wraps it with a bounded cache keyed by site id pairs (ids
+    from the shared site table), so contracts at the same sites, repeated
+    analyses and parameter sweeps compute each pair once.
+    """
+
+    name = ''
+    cached = True
+
+    def __init__(self):
+        self.sites: SiteTable = shared_site_table()
+        self.cache = PairCache()
+        self.cache_path: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """Identifies the distances this provider returns, for cache and snapshot keys."""
+        return self.name
+
+    def pairwise(self, lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]):
+        raise NotImplementedError
+
+    def distances(
+        self,
+        lat: float,
+        lon: float,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        origin: Optional[int] = None,
+        destinations: Optional[Sequence[int]] = None
+    ):
+        """
+        Distances (km) from (lat, lon) to each destination, in order.
+        Pass the site ids of the origin and destinations to go through the
+        pair cache.
+        """
+        if not self.cached or origin is None or destinations is None:
+            return self.pairwise(lat, lon, lats, lons)
+
+        if np is not None:
+            lats, lons = np.asarray(lats).tolist(), np.asarray(lons).tolist()
+            destinations = np.asarray(destinations).tolist()
+
+        cache = self.cache
+        sites = self.sites
+        result = [cache.get(origin, destination, sites) for destination in destinations]
+
+        missing = [k for k, distance in enumerate(result) if distance is None]
+        if missing:
+            computed = self.pairwise(lat, lon, [lats[k] for k in missing], [lons[k] for k in missing])
+            for k, distance in zip(missing, computed):
+                result[k] = float(distance)
+                cache.put(origin, destinations[k], result[k])
+
+        return np.array(result, dtype=np.float64) if np is not None else result
+
+    def load_cache(self, path: str) -> int:
+        """Back the pair cache with a file from earlier runs; save_cache() writes it back."""
+        self.cache_path = path
+        return self.cache.load(path, self.key) if self.cached else 0
+
+    def save_cache(self) -> int:
+        """Persist the pair cache to the file given to load_cache(), if any."""
+        if self.cache_path is None or not self.cached:
+            return 0
+        return self.cache.save(self.cache_path, self.key, self.sites)
+
+    def grid_radius(self, radius_km: float, max_abs_lat: float) -> float:
+        """
+        Radius on the 111/85 km-per-degree plane that covers every site
+        within radius_km under this provider, for sites no further than
+        max_abs_lat from the equator.
+        """
+        return radius_km
+
+class FlatDistance(DistanceProvider):
+    """The 111/85 km-per-degree plane every analysis has used (rough outside Victoria)."""
+
+    name = 'flat'
+
+    def pairwise(self, lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]):
+        if np is not None:
+            lat_diff = (np.asarray(lats, dtype=np.float64) - lat) * KM_PER_DEGREE_LAT
+            lon_diff = (np.asarray(lons, dtype=np.float64) - lon) * KM_PER_DEGREE_LON
+            return np.sqrt(lat_diff**2 + lon_diff**2)
+
+        return [euclidean_distance(site_lat, site_lon, lat, lon) for site_lat, site_lon in zip(lats, lons)]
+
+class HaversineDistance(DistanceProvider):
+    """Great-circle distance on a 6371 km sphere, matching Index.html."""
+
+    name = 'haversine'
+
+    def pairwise(self, lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]):
+        if np is not None:
+            site_lats = np.asarray(lats, dtype=np.float64)
+            d_lat = np.radians(site_lats - lat)
+            d_lon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+            a = (0.5 - np.cos(d_lat) / 2
+                 + math.cos(math.radians(lat)) * np.cos(np.radians(site_lats)) * (1 - np.cos(d_lon)) / 2)
+            return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+        return [haversine_km(lat, lon, site_lat, site_lon) for site_lat, site_lon in zip(lats, lons)]
+
+    def grid_radius(self, radius_km: float, max_abs_lat: float) -> float:
+        # A great circle shorter than radius_km strays at most half that far
+        # poleward of its ends, and there a degree of longitude is at least
+        # cos(lat) * KM_PER_DEGREE_ARC long, so the plane's fixed 85 km can
+        # only overstate it by the ratio below (its 111 km latitude never does).
+        furthest_lat = max_abs_lat + radius_km / 2 / KM_PER_DEGREE_ARC
+        if furthest_lat >= 89.9:
+            return WHOLE_PLANE_KM
+
+        factor = KM_PER_DEGREE_LON / (KM_PER_DEGREE_ARC * math.cos(math.radians(furthest_lat)))
+        return radius_km * max(factor, 1.0)
+
+class RoadMatrixDistance(HaversineDistance):
+    """
+    Precomputed road distances from a local JSON file:
+    {"sites": [[lat, lon], ...], "distances_km": [[...], ...]} where
+    distances_km[a][b] is the road distance from site a to site b (null if
+    unknown). Sites are matched on coordinates rounded to ROAD_MATRIX_DIGITS
+    places. Pairs the matrix does not cover fall back to haversine, a lower
+    bound on road distance, and are counted in fallbacks.
+    """
+
+    name = 'road'
+
+    def __init__(self, path: str = ROAD_MATRIX_PATH):
+        super().__init__()
+        self.path = path
+        self.fallbacks = 0
+
+        with open(path, 'r') as f:
+            matrix = json.load(f)
+        self.matrix: List[List[Optional[float]]] = matrix['distances_km']
+        self.site_index = {self._site(lat, lon): k for k, (lat, lon) in enumerate(matrix['sites'])}
+        self.file_hash = file_hash(path)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.file_hash}"
+
+    @staticmethod
+    def _site(lat: float, lon: float) -> Tuple[float, float]:
+        return round(float(lat), ROAD_MATRIX_DIGITS), round(float(lon), ROAD_MATRIX_DIGITS)
+
+    def pairwise(self, lat: float, lon: float, lats: Sequence[float], lons: Sequence[float]):
+        origin = self.site_index.get(self._site(lat, lon))
+        row = self.matrix[origin] if origin is not None else None
+
+        result = []
+        for site_lat, site_lon in zip(lats, lons):
+            distance = None
+            if row is not None:
+                destination = self.site_index.get(self._site(site_lat, site_lon))
+                if destination is not None:
+                    distance = row[destination]
+
+            if distance is None:
+                self.fallbacks += 1
+                distance = haversine_km(lat, lon, site_lat, site_lon)
+            result.append(float(distance))
+
+        return np.array(result, dtype=np.float64) if np is not None else result
+
+PROVIDERS = {
+    'flat': FlatDistance,
+    'haversine': HaversineDistance,
+    'road': RoadMatrixDistance
+}
+
+# Providers already created in this process, so analyses share one pair cache
+_providers: Dict[Tuple[str, Optional[str]], DistanceProvider] = {}
+
+def get_provider(name: str = 'flat', road_matrix_path: str = ROAD_MATRIX_PATH, cache_path: Optional[str] = None) -> DistanceProvider:
+    """
+    The shared provider for a backend name: 'flat', 'haversine' or 'road'.
+    With cache_path, its pair cache is also backed by that file.
+    """
+
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown distance provider '{name}' (choose from {', '.join(PROVIDERS)})")
+
+    cache_key = (name, road_matrix_path if name == 'road' else None)
+    if cache_key not in _providers:
+        _providers[cache_key] = RoadMatrixDistance(road_matrix_path) if name == 'road' else PROVIDERS[name]()
+
+    provider = _providers[cache_key]
+    if cache_path is not None and provider.cache_path != cache_path:
+        provider.load_cache(cache_path)
+    return provider
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1 (e.g. --workers)."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def add_distance_arguments(parser: argparse.ArgumentParser, workers: bool = True) -> None:
+    """
+    Add the distance options shared by every site-to-site script:
+    --distance, --road-matrix, --pair-cache and (unless workers is False)
+    --workers for the candidate search's process count.
+    """
+    parser.add_argument('--distance', choices=list(PROVIDERS), default='flat',
+                        help='distance provider for the site-to-site analyses (default: flat)')
+    parser.add_argument('--road-matrix', default=ROAD_MATRIX_PATH,
+                        help=f'road distance matrix for --distance road (default: {ROAD_MATRIX_PATH})')
+    parser.add_argument('--pair-cache', default=None,
+                        help='file persisting site-pair distances between runs')
+    if workers:
+        parser.add_argument('--workers', type=positive_int, default=1,
+                            help='processes sharing the site-to-site candidate searches (default: 1)')
+
+def provider_from_arguments(args: argparse.Namespace) -> DistanceProvider:
+    """The shared provider selected by the options add_distance_arguments() added."""
+    return get_provider(args.distance, args.road_matrix, args.pair_cache or None)
+
+def parse_distance_arguments(description: str, workers: bool = True) -> Tuple[DistanceProvider, int]:
+    """
+    Parse a script's command line (just the add_distance_arguments()
+    options) and return its distance provider and worker count (1 when
+    workers is False).
+    """
+    parser = argparse.ArgumentParser(description=description)
+    add_distance_arguments(parser, workers)
+    args = parser.parse_args()
+    return provider_from_arguments(args), getattr(args, 'workers', 1)
+
+class DistanceEngine:
+    """
+    Batched site-to-site distances from a distance provider (the 111/85
+    km-per-degree plane by default).
+
+    Site coordinates are held in contiguous float64 arrays so a contract's
+    distances to all of its candidates (or a whole block of the distance
+    matrix) come from one vectorized NumPy call. Without NumPy the same
+    methods fall back to scalar distances and return lists. Given each
+    row's site id, lookups go through the provider's site-pair cache.
+    """
+
+    def __init__(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        provider: Optional[DistanceProvider] = None,
+        site_ids: Optional[Sequence[int]] = None
+    ):
+        self.provider = provider if provider is not None else get_provider()
+        self.site_ids = site_ids
+
+        if np is not None:
+            self.latitudes = np.ascontiguousarray(latitudes, dtype=np.float64)
+            self.longitudes = np.ascontiguousarray(longitudes, dtype=np.float64)
+        else:
+            self.latitudes = [float(lat) for lat in latitudes]
+            self.longitudes = [float(lon) for lon in longitudes]
+
+    @property
+    def vectorized(self) -> bool:
+        return np is not None
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    def distances_from(self, i: int, positions: Sequence[int]):
+        """Distances (km) from site i to each site in positions, in order."""
+        origin = self.site_ids[i] if self.site_ids is not None else None
+        return self.distances_to_point(self.latitudes[i], self.longitudes[i], positions, origin)
+
+    def distances_to_point(self, lat: float, lon: float, positions: Sequence[int] = None, origin: Optional[int] = None):
+        """
+        Distances (km) from (lat, lon) to the given sites, or to every site.
+        origin is the site id of (lat, lon), if it has one.
+        """
+        if positions is None:
+            lats, lons = self.latitudes, self.longitudes
+        elif np is not None:
+            index = np.asarray(positions, dtype=np.intp)
+            lats, lons = self.latitudes[index], self.longitudes[index]
+        else:
+            lats = [self.latitudes[j] for j in positions]
+            lons = [self.longitudes[j] for j in positions]
+
+        destinations = None
+        if origin is not None and self.site_ids is not None:
+            destinations = self.site_ids if positions is None else [self.site_ids[j] for j in positions]
+
+        return self.provider.distances(float(lat), float(lon), lats, lons, origin, destinations)
+
+    def distance_matrix(self, rows: Sequence[int], cols: Sequence[int]):
+        """Block of the distance matrix: result[r][c] is the distance rows[r] -> cols[c]."""
+        if np is not None and isinstance(self.provider, FlatDistance):
+            row_index = np.asarray(rows, dtype=np.intp)
+            col_index = np.asarray(cols, dtype=np.intp)
+
+            lat_diff = (self.latitudes[col_index][None, :] - self.latitudes[row_index][:, None]) * KM_PER_DEGREE_LAT
+            lon_diff = (self.longitudes[col_index][None, :] - self.longitudes[row_index][:, None]) * KM_PER_DEGREE_LON
+            return np.sqrt(lat_diff**2 + lon_diff**2)
+
+        if np is not None:
+            return np.vstack([self.distances_from(i, cols) for i in rows]) if len(rows) else np.empty((0, len(cols)))
+
+        return [self.distances_from(i, cols) for i in rows]
+
+def below_threshold(distances, positions: Sequence[int], threshold: float) -> List[tuple]:
+    """Pair up positions with their distances, keeping only those strictly below threshold."""
+    if np is not None and isinstance(distances, np.ndarray):
+        keep = np.flatnonzero(distances < threshold)
+        return [(positions[k], float(distances[k])) for k in keep]
+
+    return [
+        (position, distance)
+        for position, distance in zip(positions, distances)
+        if distance < threshold
+    ]
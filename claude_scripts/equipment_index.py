@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from snapshot_cache import load_json_cached, read_snapshot, source_fingerprint, write_snapshot
+
+# Bump when the index layout changes so old snapshots are rebuilt
+INDEX_FORMAT = 2
+
+# Posting dicts, each stored as its values (JSON) plus offsets and positions columns
+POSTINGS = ('groups', 'categories', 'stock_numbers')
+
+# Hire lines kept verbatim per index for quick inspection
+SAMPLE_LINES = 20
+
+# Indexes already built in this process: path -> ((size, mtime_ns) of the file, index)
+_loaded_indexes: Dict[str, Tuple[Tuple[int, int], 'EquipmentIndex']] = {}
+
+class EquipmentIndex:
+    """
+    Inverted index from hireContractLines to contracts.
+
+    Contracts are numbered in file order; each posting list holds the
+    ascending positions of the contracts with at least one hire line for
+    that equipment group, category code or stock number. Lookups return
+    contract keys in file order, so a filtered export keeps the original
+    ordering. Group line counts (one per hire line, as the group histogram
+    reports them) and the first few grouped lines are kept alongside.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.groups: Dict[str, array] = {}
+        self.categories: Dict[str, array] = {}
+        self.stock_numbers: Dict[str, array] = {}
+        self.group_line_counts: Dict[str, int] = {}
+        self.sample_lines: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_contracts(cls, data: Dict) -> 'EquipmentIndex':
+        """Build the index from a {contract_key: contract} export in one pass."""
+
+        index = cls()
+
+        def post(postings: Dict[str, array], value: str, position: int) -> None:
+            column = postings.get(value)
+            if column is None:
+                column = postings[value] = array('l')
+            if not column or column[-1] != position:
+                column.append(position)
+
+        for position, (contract_key, contract) in enumerate(data.items()):
+            index.keys.append(contract_key)
+
+            for line_index, line in enumerate(contract.get('hireContractLines') or []):
+                category = line.get('category') or {}
+
+                stock_no = line.get('stockNo')
+                if stock_no:
+                    post(index.stock_numbers, stock_no, position)
+
+                if not category:
+                    continue
+
+                if category.get('code'):
+                    post(index.categories, category['code'], position)
+
+                equipment_group = category.get('equipmentGroup')
+                if not equipment_group or not isinstance(equipment_group, dict) or not equipment_group.get('name'):
+                    continue
+
+                group_name = equipment_group['name']
+                post(index.groups, group_name, position)
+                index.group_line_counts[group_name] = index.group_line_counts.get(group_name, 0) + 1
+
+                if len(index.sample_lines) < SAMPLE_LINES:
+                    index.sample_lines.append({
+                        'contract': contract_key,
+                        'line_index': line_index,
+                        'equipment_group': group_name,
+                        'category_name': category.get('name', ''),
+                        'description': line.get('description', ''),
+                        'stock_no': line.get('stockNo', '')
+                    })
+
+        return index
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> Optional['EquipmentIndex']:
+        """Load the index from <path>.equipment.snapshot if it is fresh, else None."""
+
+        snapshot = read_snapshot(f"{path}.equipment.snapshot", path, _snapshot_params())
+        if snapshot is None:
+            return None
+
+        index = cls()
+        index.keys = snapshot['strings']['keys']
+        payload = snapshot['payload']
+        for name in POSTINGS:
+            offsets = snapshot['arrays'][f'{name}_offsets']
+            positions = snapshot['arrays'][f'{name}_positions']
+            setattr(index, name, {
+                value: positions[offsets[k]:offsets[k + 1]]
+                for k, value in enumerate(payload['posting_values'][name])
+            })
+        index.group_line_counts = payload['group_line_counts']
+        index.sample_lines = payload['sample_lines']
+        return index
+
+    def save_snapshot(self, path: str, fingerprint: Dict = None) -> bool:
+        """Write the index beside its source file as <path>.equipment.snapshot."""
+
+        # Each posting dict as one positions column cut at offsets, values in the same order
+        arrays = {}
+        for name in POSTINGS:
+            postings = getattr(self, name)
+            offsets = arrays[f'{name}_offsets'] = array('q', [0])
+            positions = arrays[f'{name}_positions'] = array('l')
+            for column in postings.values():
+                positions.extend(column)
+                offsets.append(len(positions))
+
+        return write_snapshot(
+            f"{path}.equipment.snapshot",
+            path,
+            _snapshot_params(),
+            arrays=arrays,
+            strings={'keys': self.keys},
+            payload={
+                'posting_values': {name: list(getattr(self, name)) for name in POSTINGS},
+                'group_line_counts': self.group_line_counts,
+                'sample_lines': self.sample_lines
+            },
+            fingerprint=fingerprint
+        )
+
+    def _keys_for(self, postings: Dict[str, array], value: str) -> List[str]:
+        return [self.keys[position] for position in postings.get(value, ())]
+
+    def contracts_with_group(self, group_name: str) -> List[str]:
+        return self._keys_for(self.groups, group_name)
+
+    def contracts_with_category(self, code: str) -> List[str]:
+        return self._keys_for(self.categories, code)
+
+    def contracts_with_stock_number(self, stock_no: str) -> List[str]:
+        return self._keys_for(self.stock_numbers, stock_no)
+
+def _snapshot_params() -> Dict:
+    return {'kind': 'equipment_index', 'format': INDEX_FORMAT}
+
+def load_equipment_index(path: str = 'extracted_data/contracts_2023.json') -> EquipmentIndex:
+    """
+    Return the equipment index for a dataset, building it at most once per
+    process (again if the file's size or mtime changes). A fresh
+    <path>.equipment.snapshot is used when present; otherwise the source is
+    scanned once and the snapshot (re)written.
+    """
+
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    loaded = _loaded_indexes.get(path)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+
+    index = EquipmentIndex.from_snapshot(path)
+    if index is None:
+        fingerprint = source_fingerprint(path)
+        index = EquipmentIndex.from_contracts(load_json_cached(path))
+        index.save_snapshot(path, fingerprint)
+
+    _loaded_indexes[path] = (version, index)
+    return index
+
+def main():
+    print("=== EQUIPMENT INDEX (2023 Contracts) ===\n")
+
+    index = load_equipment_index()
+
+    print(f"Contracts indexed: {len(index)}")
+    print(f"Equipment groups: {len(index.groups)}")
+    print(f"Category codes: {len(index.categories)}")
+    print(f"Stock numbers: {len(index.stock_numbers)}")
+
+    print(f"\n{'Equipment Group':<20} {'Contracts':<10} {'Hire lines'}")
+    print("-" * 45)
+    for group_name, postings in sorted(index.groups.items(), key=lambda item: len(item[1]), reverse=True):
+        print(f"{group_name:<20} {len(postings):<10} {index.group_line_counts[group_name]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import math
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from contract_table import MICROSECONDS_PER_DAY, format_timestamp, parse_timestamp
+from distance_engine import EARTH_RADIUS_KM, haversine_km
+
+# Booking timestamps as the JobRequest / RentalEquipment records write them
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Index.html's profitability assumptions
+TRANSPORT_COST_PER_HOUR = 75
+AVERAGE_SPEED_KMH = 45
+
+NO_MATCH_ERROR = 'No available equipment of this type found for the selected dates.'
+
+# The hard-coded demo data from Index.html
+DEMO_DEPOT = {'name': 'RPM Dandenong Depot', 'coords': [-38.0722, 145.2211]}
+DEMO_INVENTORY = [
+    {'equipment_id': 'VMS-012', 'equipment_type': 'C Size Amber VMS', 'current_location_gps': [-37.81, 145.22], 'daily_rate': 45,
+     'bookings': [{'start': '2025-10-20T00:00:00Z', 'end': '2025-11-05T00:00:00Z'}]},
+    {'equipment_id': 'VMS-015', 'equipment_type': 'C Size Amber VMS', 'current_location_gps': [-37.95, 145.25], 'daily_rate': 45,
+     'bookings': []},
+    {'equipment_id': 'LT-045', 'equipment_type': 'Directional LED Lighting Tower', 'current_location_gps': [-37.86, 144.97], 'daily_rate': 90,
+     'bookings': [{'start': '2025-11-10T00:00:00Z', 'end': '2025-11-20T00:00:00Z'}]},
+    {'equipment_id': 'LT-048', 'equipment_type': 'Directional LED Lighting Tower', 'current_location_gps': [-37.70, 144.88], 'daily_rate': 90,
+     'bookings': []},
+    {'equipment_id': 'WB-201', 'equipment_type': 'Armorzone Water Filled Barrier', 'current_location_gps': [-38.14, 145.12], 'daily_rate': 2.2,
+     'bookings': []},
+]
+
+def haversine_distance(coords1: Tuple[float, float], coords2: Tuple[float, float]) -> float:
+    """Great-circle distance in km between two (lat, lon) points, as Index.html computes it."""
+    return haversine_km(coords1[0], coords1[1], coords2[0], coords2[1])
+
+class BookingIndex:
+    """
+    One asset's bookings as intervals sorted by start, with a running
+    maximum of end times.
+
+    A request [start, end] collides with a booking when the booking starts
+    no later than the request ends and ends no earlier than it starts (the
+    same inclusive test Index.html applies). Only bookings starting by the
+    request end can collide, and the running maximum says whether any of
+    them reaches the request start, so the check is one bisect.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+        self.max_end: List[int] = []
+        self._rebuild_max_end(0)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _rebuild_max_end(self, position: int) -> None:
+        del self.max_end[position:]
+        running = self.max_end[-1] if self.max_end else None
+        for end in self.ends[position:]:
+            running = end if running is None else max(running, end)
+            self.max_end.append(running)
+
+    def is_free(self, start: int, end: int) -> bool:
+        count = bisect_right(self.starts, end)
+        return count == 0 or self.max_end[count - 1] < start
+
+    def add(self, start: int, end: int) -> None:
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self._rebuild_max_end(position)
+
+class AssetGrid:
+    """
+    Uniform latitude/longitude grid over the assets of one equipment type.
+
+    nearest() searches rings of cells outward from the query cell and stops
+    once no unvisited cell can hold anything closer than the k-th best
+    accepted asset. Cell and ring bounds are conservative lower bounds on
+    haversine distance (the latitude arc, or the chord across the smallest
+    parallel), so the result is exact. Longitudes are not wrapped at +-180.
+    """
+
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.locations: Dict[int, Tuple[float, float]] = {}
+        self.max_abs_lat = 0.0
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, position: int, lat: float, lon: float) -> None:
+        self.cells[self._cell(lat, lon)].append(position)
+        self.locations[position] = (lat, lon)
+        self.max_abs_lat = max(self.max_abs_lat, abs(lat))
+
+    def remove(self, position: int) -> None:
+        lat, lon = self.locations.pop(position)
+        cell = self._cell(lat, lon)
+        self.cells[cell].remove(position)
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def _lower_bound(self, d_lat: float, d_lon: float, max_abs_lat: float) -> float:
+        """Smallest haversine distance (km) given degree separations in lat and lon."""
+        lat_arc = EARTH_RADIUS_KM * math.radians(d_lat)
+        smallest_parallel = max(math.cos(math.radians(min(max_abs_lat, 90.0))), 0.0)
+        lon_chord = 2 * EARTH_RADIUS_KM * smallest_parallel * math.sin(math.radians(min(d_lon, 180.0)) / 2)
+        return max(lat_arc, lon_chord)
+
+    def _cell_lower_bound(self, cell: Tuple[int, int], lat: float, lon: float) -> float:
+        row, col = cell
+        south, north = row * self.cell_degrees, (row + 1) * self.cell_degrees
+        west, east = col * self.cell_degrees, (col + 1) * self.cell_degrees
+        d_lat = max(south - lat, 0.0, lat - north)
+        d_lon = max(west - lon, 0.0, lon - east)
+        return self._lower_bound(d_lat, d_lon, max(abs(lat), abs(south), abs(north)))
+
+    def _ring_lower_bound(self, ring: int, lat: float) -> float:
+        """Smallest distance to anything in ring `ring` or beyond."""
+        if ring <= 1:
+            return 0.0
+        separation = (ring - 1) * self.cell_degrees
+        max_abs_lat = max(abs(lat), self.max_abs_lat)
+        return min(self._lower_bound(separation, 0.0, max_abs_lat), self._lower_bound(0.0, separation, max_abs_lat))
+
+    def _ring_cells(self, row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        accept: Callable[[int], bool],
+        k: int = 1
+    ) -> List[Tuple[float, int]]:
+        """
+        Up to k (distance_km, position) pairs for the closest assets that
+        accept(position) approves, nearest first; ties go to the lower position.
+        """
+
+        if k <= 0 or not self.cells:
+            return []
+
+        row, col = self._cell(lat, lon)
+
+        # Max-heap of the k best as (-distance, -position)
+        best: List[Tuple[float, int]] = []
+
+        def kth_best() -> float:
+            return -best[0][0] if len(best) == k else math.inf
+
+        def visit(cell: Tuple[int, int]) -> None:
+            positions = self.cells.get(cell)
+            if not positions:
+                return
+            # Small tolerance so float rounding never skips an equally close asset
+            if len(best) == k and self._cell_lower_bound(cell, lat, lon) > -best[0][0] + 1e-6:
+                return
+            for position in positions:
+                distance = haversine_distance(self.locations[position], (lat, lon))
+                entry = (-distance, -position)
+                if len(best) < k:
+                    if accept(position):
+                        heapq.heappush(best, entry)
+                elif entry > best[0] and accept(position):
+                    heapq.heapreplace(best, entry)
+
+        ring = 0
+        while True:
+            if self._ring_lower_bound(ring, lat) > kth_best() + 1e-6:
+                break
+
+            # Once rings outgrow the occupied cells, finish over those directly,
+            # still ring by ring so the ring bound can stop the search
+            if (2 * ring + 1) ** 2 > len(self.cells):
+                remaining: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+                for cell in self.cells:
+                    cell_ring = max(abs(cell[0] - row), abs(cell[1] - col))
+                    if cell_ring >= ring:
+                        remaining[cell_ring].append(cell)
+
+                for cell_ring in sorted(remaining):
+                    if self._ring_lower_bound(cell_ring, lat) > kth_best() + 1e-6:
+                        break
+                    for cell in remaining[cell_ring]:
+                        visit(cell)
+                break
+
+            for cell in self._ring_cells(row, col, ring):
+                visit(cell)
+            ring += 1
+
+        return sorted((-distance, -position) for distance, position in best)
+
+def _copy_asset(asset: Dict) -> Dict:
+    """A RentalEquipment record copy whose bookings list can be appended to."""
+    copy = dict(asset)
+    if asset.get('bookings') is not None:
+        copy['bookings'] = list(asset['bookings'])
+    return copy
+
+class EquipmentInventory:
+    """
+    RentalEquipment records indexed for matching: a BookingIndex per asset
+    and an AssetGrid per equipment_type over current_location_gps.
+
+    Callers that query in nondecreasing start time (batch allocation) can
+    call advance_to(start) first: assets busy at that moment cannot take
+    any request starting then, so they are lifted out of the grids until
+    their booking ends. Saturated equipment types then cost no more to
+    search than the assets actually on hand.
+    """
+
+    def __init__(self, equipment: Iterable[Dict], cell_degrees: float = 0.1):
+        # Own copies of the records (and their bookings lists), so book()
+        # never changes the caller's data, e.g. DEMO_INVENTORY
+        self.equipment: List[Dict] = [_copy_asset(asset) for asset in equipment]
+        self.bookings: List[BookingIndex] = []
+        self.grids: Dict[str, AssetGrid] = {}
+
+        for position, asset in enumerate(self.equipment):
+            self.bookings.append(BookingIndex(
+                (parse_timestamp(booking['start']), parse_timestamp(booking['end']))
+                for booking in asset.get('bookings') or []
+            ))
+
+            grid = self.grids.get(asset['equipment_type'])
+            if grid is None:
+                grid = self.grids[asset['equipment_type']] = AssetGrid(cell_degrees)
+            lat, lon = asset['current_location_gps']
+            grid.add(position, lat, lon)
+
+        # Busy/free sweep, built on the first advance_to
+        self._events: Optional[List[Tuple[int, int, int]]] = None
+        self._busy: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.equipment)
+
+    def book(self, position: int, start: int, end: int, job_id: Optional[str] = None) -> None:
+        """Reserve an asset for [start, end], in the index and on its bookings list."""
+        self.bookings[position].add(start, end)
+        booking = {'start': format_timestamp(start, ISO_FORMAT), 'end': format_timestamp(end, ISO_FORMAT)}
+        if job_id is not None:
+            booking['booked_by_job_id'] = job_id
+        self.equipment[position].setdefault('bookings', []).append(booking)
+
+        if self._events is not None:
+            self._push_booking(position, start, end)
+
+    def _push_booking(self, position: int, start: int, end: int) -> None:
+        # Busy from start through end inclusive
+        heapq.heappush(self._events, (start, 1, position))
+        heapq.heappush(self._events, (end + 1, -1, position))
+
+    def advance_to(self, clock: int) -> None:
+        """Move the sweep to `clock`; later queries must not start before it."""
+        if self._events is None:
+            self._events = []
+            self._busy = [0] * len(self.equipment)
+            for position, index in enumerate(self.bookings):
+                for start, end in zip(index.starts, index.ends):
+                    self._push_booking(position, start, end)
+
+        while self._events and self._events[0][0] <= clock:
+            _, change, position = heapq.heappop(self._events)
+            asset = self.equipment[position]
+            grid = self.grids[asset['equipment_type']]
+
+            self._busy[position] += change
+            if change == 1 and self._busy[position] == 1:
+                grid.remove(position)
+            elif change == -1 and self._busy[position] == 0:
+                lat, lon = asset['current_location_gps']
+                grid.add(position, lat, lon)
+
+    def nearest_available(
+        self,
+        equipment_type: str,
+        location_gps: Tuple[float, float],
+        start: int,
+        end: int,
+        k: int = 1
+    ) -> List[Tuple[float, int]]:
+        """Up to k (distance_km, position) for the closest assets of a type free over [start, end]."""
+        grid = self.grids.get(equipment_type)
+        if grid is None:
+            return []
+        return grid.nearest(location_gps[0], location_gps[1], lambda position: self.bookings[position].is_free(start, end), k)
+
+def job_economics(distance: float, start: int, end: int, daily_rate: float) -> Dict[str, float]:
+    """Transport cost, hire revenue and profit the way Index.html estimates them."""
+    drive_time_hours = distance / AVERAGE_SPEED_KMH
+    transport_cost = drive_time_hours * TRANSPORT_COST_PER_HOUR
+    hire_duration_days = (end - start) / MICROSECONDS_PER_DAY
+    hire_revenue = hire_duration_days * daily_rate
+    return {
+        'transportCost': transport_cost,
+        'hireRevenue': hire_revenue,
+        'profit': hire_revenue - transport_cost
+    }
+
+def equipment_type_name(item) -> str:
+    """
+    The equipment_type an equipment_needed entry asks for: Index.html sends
+    plain type names, transformed_data.json sends category objects.
+    """
+    return item['name'] if isinstance(item, dict) else item
+
+def find_best_equipment_for_job(job_request: Dict, inventory: EquipmentInventory) -> Optional[Dict]:
+    """
+    Python counterpart of Index.html's findBestEquipmentForJob: the closest
+    asset of the first requested type with no booking overlapping the job.
+    Returns the same result shape, or None when nothing is available.
+    """
+
+    requested_type = equipment_type_name(job_request['equipment_needed'][0])
+    start = parse_timestamp(job_request['start_time'])
+    end = parse_timestamp(job_request['end_time_projected'])
+
+    matches = inventory.nearest_available(requested_type, job_request['location_gps'], start, end)
+    if not matches:
+        return None
+
+    distance, position = matches[0]
+    asset = inventory.equipment[position]
+    return {
+        'equipment': asset,
+        'distance': distance,
+        **job_economics(distance, start, end, asset['daily_rate'])
+    }
+
+def hire_lines(job_request: Dict) -> List[Dict]:
+    """
+    A request's hire lines grouped by category code, in first-seen order, as
+    {'code', 'equipment_type', 'quantity'}. Sales lines (isHire false, such
+    as _TRSP transport or _INS insurance) are not equipment and are dropped;
+    plain type names from Index.html are their own code.
+    """
+
+    lines: Dict[str, Dict] = {}
+    for item in job_request.get('equipment_needed') or []:
+        if isinstance(item, dict):
+            if not item.get('isHire', True):
+                continue
+            code = item.get('code') or item['name']
+        else:
+            code = item
+
+        line = lines.get(code)
+        if line is None:
+            line = lines[code] = {'code': code, 'equipment_type': equipment_type_name(item), 'quantity': 0}
+        line['quantity'] += 1
+
+    return list(lines.values())
+
+def match_hire_lines(
+    lines: List[Dict],
+    inventory: EquipmentInventory,
+    location_gps: Tuple[float, float],
+    start: int,
+    end: int
+) -> List[List[Tuple[float, int]]]:
+    """
+    Assets for every hire line at once, as one [(distance_km, position)]
+    list per line (shorter than the quantity when the type runs out).
+
+    Lines draw on disjoint per-type pools, so taking the nearest free
+    assets of each type minimizes total transport. Each type is searched
+    once for the whole request, and lines sharing a type split its
+    candidates in line order.
+    """
+
+    wanted: Dict[str, int] = {}
+    for line in lines:
+        wanted[line['equipment_type']] = wanted.get(line['equipment_type'], 0) + line['quantity']
+
+    candidates = {
+        equipment_type: inventory.nearest_available(equipment_type, location_gps, start, end, quantity)
+        for equipment_type, quantity in wanted.items()
+    }
+
+    taken: Dict[str, int] = {}
+    matches = []
+    for line in lines:
+        offset = taken.get(line['equipment_type'], 0)
+        matches.append(candidates[line['equipment_type']][offset:offset + line['quantity']])
+        taken[line['equipment_type']] = offset + line['quantity']
+
+    return matches
+
+def find_equipment_for_job(job_request: Dict, inventory: EquipmentInventory) -> Dict:
+    """
+    Match every hire line of a request. Returns {'lines': [...], 'complete',
+    'distance', 'transportCost', 'hireRevenue', 'profit'}, with totals over
+    the matched assets; each line lists its equipment and distances and
+    how many units are missing.
+    """
+
+    start = parse_timestamp(job_request['start_time'])
+    end = parse_timestamp(job_request['end_time_projected'])
+    lines = hire_lines(job_request)
+    matches = match_hire_lines(lines, inventory, job_request['location_gps'], start, end)
+
+    result = {'lines': [], 'complete': True, 'distance': 0.0, 'transportCost': 0.0, 'hireRevenue': 0.0, 'profit': 0.0}
+    for line, line_matches in zip(lines, matches):
+        result['lines'].append({
+            **line,
+            'equipment': [inventory.equipment[position] for _, position in line_matches],
+            'distances': [distance for distance, _ in line_matches],
+            'missing': line['quantity'] - len(line_matches)
+        })
+        if len(line_matches) < line['quantity']:
+            result['complete'] = False
+
+        for distance, position in line_matches:
+            result['distance'] += distance
+            for key, value in job_economics(distance, start, end, inventory.equipment[position]['daily_rate']).items():
+                result[key] += value
+
+    return result
+
+class MatchRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /match with a JobRequest body answers with the recommendation JSON
+    for its first item; POST /match_all matches every hire line.
+    """
+
+    def _send_json(self, status: int, body: Dict) -> None:
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        # Index.html is opened from disk, so allow any origin
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path not in ('/match', '/match_all'):
+            self._send_json(404, {'error': f'Unknown endpoint {self.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job_request = json.loads(self.rfile.read(length))
+            if self.path == '/match_all':
+                result = find_equipment_for_job(job_request, self.server.inventory)
+            else:
+                result = find_best_equipment_for_job(job_request, self.server.inventory)
+        except (ValueError, KeyError, TypeError, IndexError) as e:
+            self._send_json(400, {'error': f'Invalid job request: {e}'})
+            return
+
+        self._send_json(200, result if result is not None else {'error': NO_MATCH_ERROR})
+
+def serve(inventory: EquipmentInventory, host: str = '127.0.0.1', port: int = 8765) -> None:
+    """Run the local matching service until interrupted."""
+    server = ThreadingHTTPServer((host, port), MatchRequestHandler)
+    server.inventory = inventory
+    print(f"Matching {len(inventory)} assets on http://{host}:{port}/match")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    print("=== EQUIPMENT MATCHING ===\n")
+
+    inventory = EquipmentInventory(DEMO_INVENTORY)
+
+    # Index.html's default form values, once per equipment type it offers
+    requests = [
+        {
+            'job_id': f'JOB-DEMO-{i}',
+            'location_gps': [-37.814, 144.963],
+            'start_time': '2025-11-06T08:00:00Z',
+            'end_time_projected': '2025-11-09T17:00:00Z',
+            'equipment_needed': [equipment_type]
+        }
+        for i, equipment_type in enumerate(inventory.grids, 1)
+    ]
+
+    print(f"{'Equipment type':<32} {'Asset':<9} {'Distance':<10} {'Transport':<10} {'Revenue':<10} {'Profit'}")
+    print("-" * 85)
+    for job_request in requests:
+        result = find_best_equipment_for_job(job_request, inventory)
+        equipment_type = job_request['equipment_needed'][0]
+        if result is None:
+            print(f"{equipment_type:<32} {NO_MATCH_ERROR}")
+            continue
+        print(f"{equipment_type:<32} {result['equipment']['equipment_id']:<9} "
+              f"{result['distance']:<10.2f} ${result['transportCost']:<9.2f} "
+              f"${result['hireRevenue']:<9.2f} ${result['profit']:.2f}")
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        print()
+        serve(inventory)
+
+if __name__ == "__main__":
+    main()
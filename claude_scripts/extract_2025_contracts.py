@@ -1,27 +1,11 @@
 #!/usr/bin/env python3
 import json
-from datetime import datetime
+
+from partitioned_store import extract_contracts_for_year
 
 def extract_2025_contracts():
     """Extract all contracts from 2025 based on raisedDate."""
-
-    with open('data/out.json', 'r') as f:
-        data = json.load(f)
-
-    contracts_2025 = {}
-
-    for contract_key, contract in data.items():
-        raised_date = contract.get('raisedDate')
-        if raised_date:
-            try:
-                # Parse ISO datetime format
-                year = datetime.fromisoformat(raised_date.replace('Z', '+00:00')).year
-                if year == 2025:
-                    contracts_2025[contract_key] = contract
-            except Exception as e:
-                print(f"Could not parse date for contract {contract_key}: {raised_date} - {e}")
-
-    return contracts_2025
+    return extract_contracts_for_year(2025)
 
 def main():
     print("Extracting 2025 contracts...")
@@ -1,36 +1,20 @@
 #!/usr/bin/env python3
 import json
 
+from equipment_index import load_equipment_index
+from snapshot_cache import load_json_cached
+
 def extract_contracts_by_equipment_group(equipment_group_name, output_filename):
     """Extract contracts that contain specific equipment group."""
 
-    with open('extracted_data/contracts_2023.json', 'r') as f:
-        data = json.load(f)
-
-    filtered_contracts = {}
-
-    for contract_key, contract in data.items():
-        hire_lines = contract.get('hireContractLines', [])
-
-        if not hire_lines:
-            continue
-
-        # Check if any hire line has the specified equipment group
-        has_equipment = False
-        for line in hire_lines:
-            category = line.get('category', {})
-            if not category:
-                continue
-
-            equipment_group = category.get('equipmentGroup')
-            if equipment_group and isinstance(equipment_group, dict):
-                group_name = equipment_group.get('name')
-                if group_name == equipment_group_name:
-                    has_equipment = True
-                    break
+    # Matching contracts come from the equipment index, so no per-group scan
+    index = load_equipment_index('extracted_data/contracts_2023.json')
+    data = load_json_cached('extracted_data/contracts_2023.json')
 
-        if has_equipment:
-            filtered_contracts[contract_key] = contract
+    filtered_contracts = {
+        contract_key: data[contract_key]
+        for contract_key in index.contracts_with_group(equipment_group_name)
+    }
 
     # Save filtered contracts
     with open(f'extracted_data/{output_filename}.json', 'w') as f:
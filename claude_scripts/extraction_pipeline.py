@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from equipment_optimization import is_in_victoria
+from stream_contracts import iter_contracts
+
+class Sink:
+    """
+    One output file of the extraction pipeline.
+
+    A contract is written to the sink when it matches every criterion that
+    is set: raisedDate year, an equipment group on any hire line, and a site
+    inside a bounds check such as is_in_victoria. Contracts are streamed
+    straight to disk in the same indent=2 layout json.dump produces.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        output_path: str,
+        year: Optional[int] = None,
+        equipment_group: Optional[str] = None,
+        bounds=None
+    ):
+        self.name = name
+        self.output_path = output_path
+        self.year = year
+        self.equipment_group = equipment_group
+        self.bounds = bounds
+        self.count = 0
+        self._file = None
+        self._path = None
+
+    def matches(self, year: Optional[int], groups: Set[str], site: Optional[Tuple[float, float]]) -> bool:
+        if self.year is not None and year != self.year:
+            return False
+        if self.equipment_group is not None and self.equipment_group not in groups:
+            return False
+        if self.bounds is not None and (site is None or not self.bounds(*site)):
+            return False
+        return True
+
+    def open(self, path: Optional[str] = None) -> None:
+        """Start writing, to output_path unless another path (e.g. a temp file) is given."""
+        self._path = path or self.output_path
+        self._file = open(self._path, 'w')
+        self._file.write('{')
+
+    def write(self, contract_key: str, contract: Dict) -> None:
+        # Same bytes as json.dump(..., indent=2): nested lines shift right by 2
+        value = json.dumps(contract, indent=2).replace('\n', '\n  ')
+        separator = ',\n  ' if self.count else '\n  '
+        self._file.write(f"{separator}{json.dumps(contract_key)}: {value}")
+        self.count += 1
+
+    def close(self) -> None:
+        self._file.write('\n}' if self.count else '}')
+        self._file.close()
+        self._file = None
+
+    def commit(self) -> None:
+        """Move a file written to another path into place at output_path."""
+        if self._path != self.output_path:
+            os.replace(self._path, self.output_path)
+            self._path = self.output_path
+
+    def discard(self) -> None:
+        """Abandon a partly written file: close it if open and delete it."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None and os.path.exists(self._path):
+            os.remove(self._path)
+
+def default_sinks() -> List[Sink]:
+    """The extracted_data files the per-stage scripts used to produce."""
+    return [
+        Sink('contracts_2023', 'extracted_data/contracts_2023.json', year=2023),
+        Sink('contracts_2025', 'extracted_data/contracts_2025.json', year=2025),
+        Sink('2023_vms', 'extracted_data/2023_vms.json', year=2023, equipment_group='VMS'),
+        Sink('2023_light_towers', 'extracted_data/2023_light_towers.json', year=2023, equipment_group='Light Towers'),
+        Sink('2023_vms_victoria', 'extracted_data/2023_vms_victoria.json',
+             year=2023, equipment_group='VMS', bounds=is_in_victoria),
+    ]
+
+def contract_features(contract_key: str, contract: Dict) -> Tuple[Optional[int], Set[str], Optional[Tuple[float, float]]]:
+    """Parse the fields the sinks filter on, once per contract."""
+
+    year = None
+    raised_date = contract.get('raisedDate')
+    if raised_date:
+        try:
+            year = datetime.fromisoformat(raised_date.replace('Z', '+00:00')).year
+        except Exception as e:
+            print(f"Could not parse date for contract {contract_key}: {raised_date} - {e}")
+
+    groups = set()
+    for line in contract.get('hireContractLines') or []:
+        category = line.get('category') or {}
+        equipment_group = category.get('equipmentGroup')
+        if equipment_group and isinstance(equipment_group, dict) and equipment_group.get('name'):
+            groups.add(equipment_group['name'])
+
+    site = None
+    site_address = contract.get('siteAddress')
+    if site_address:
+        latitude = site_address.get('latitude')
+        longitude = site_address.get('longitude')
+        if latitude is not None and longitude is not None:
+            try:
+                site = (float(latitude), float(longitude))
+            except (ValueError, TypeError):
+                pass
+
+    return year, groups, site
+
+def run_pipeline(source_path: str = 'data/out.json', sinks: List[Sink] = None) -> List[Sink]:
+    """
+    Read the raw export once and fan each contract out to every matching sink.
+    Adding a year, equipment group or region is another Sink, not another pass.
+
+    Sinks are written to temp files that replace their outputs only after
+    the whole export has been read; if the pass fails, the temp files are
+    deleted and every existing output is left as it was.
+    """
+
+    if sinks is None:
+        sinks = default_sinks()
+
+    try:
+        for sink in sinks:
+            sink.open(f"{sink.output_path}.tmp{os.getpid()}")
+
+        for contract_key, contract in iter_contracts(source_path):
+            features = contract_features(contract_key, contract)
+
+            for sink in sinks:
+                if sink.matches(*features):
+                    sink.write(contract_key, contract)
+
+        for sink in sinks:
+            sink.close()
+    except BaseException:
+        for sink in sinks:
+            sink.discard()
+        raise
+
+    for sink in sinks:
+        sink.commit()
+
+    return sinks
+
+def main():
+    print("=== SINGLE-PASS EXTRACTION PIPELINE ===\n")
+
+    sinks = run_pipeline()
+
+    print(f"{'Sink':<20} {'Contracts':<10} {'Output'}")
+    print("-" * 70)
+    for sink in sinks:
+        print(f"{sink.name:<20} {sink.count:<10} {sink.output_path}")
+
+if __name__ == "__main__":
+    main()
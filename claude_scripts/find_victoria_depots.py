@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
-import json
 from collections import defaultdict
 
+from snapshot_cache import load_json_cached
+
 def find_all_depots():
     """Find all unique depots in the Victoria VMS dataset."""
 
-    with open('extracted_data/2023_vms_victoria.json', 'r') as f:
-        data = json.load(f)
+    data = load_json_cached('extracted_data/2023_vms_victoria.json')
 
     depots = defaultdict(list)
 
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import math
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from contract_table import MICROSECONDS_PER_DAY, ContractTable, load_contract_table
+from distance_engine import DistanceProvider, parse_distance_arguments
+from site_table import SiteTable
+from snapshot_cache import load_json_cached
+from spatial_index import KM_PER_DEGREE_LAT, KM_PER_DEGREE_LON
+
+# Event kinds, in the order they are handled at the same instant: a unit
+# whose site window closes is sent home first, then units coming off hire
+# join the idle pools, and only then are hire starts dispatched
+RETURN, OFF_HIRE, HIRE_START = 0, 1, 2
+
+def line_quantity(line: Dict) -> int:
+    """
+    Whole units on a hire line: 1 when its quantity is missing, else the
+    quantity as an int (2, 2.0 and "2" alike, fractions truncated). 0 for
+    quantities that do not parse or are not positive.
+    """
+
+    quantity = line.get('quantity')
+    if quantity is None or quantity == '':
+        return 1
+
+    try:
+        units = int(float(quantity))
+    except (ValueError, TypeError, OverflowError):
+        return 0
+    return max(units, 0)
+
+def hire_quantities(contract: Dict) -> Dict[Tuple[str, str, str], int]:
+    """
+    Units needed per (category code, name, equipment group) over a
+    contract's hire lines. Lines with no usable quantity are skipped.
+    """
+
+    quantities: Dict[Tuple[str, str, str], int] = {}
+    for line in contract.get('hireContractLines') or []:
+        category = line.get('category') or {}
+        if not category.get('isHire', True) or not category.get('code'):
+            continue
+
+        units = line_quantity(line)
+        if not units:
+            continue
+
+        group = category.get('equipmentGroup')
+        group_name = group.get('name') if isinstance(group, dict) and group.get('name') else 'Other'
+        key = (category['code'], category.get('name', ''), group_name)
+        quantities[key] = quantities.get(key, 0) + units
+
+    return quantities
+
+class IdleSiteGrid:
+    """
+    Sites holding idle units of one category, in cells of the 111/85
+    km-per-degree plane (as SiteGrid), with each site's units in arrival
+    order.
+
+    closest() searches rings of cells outward from the hire site and stops
+    once no unvisited cell can hold a site closer than the units already
+    found. Rings are bounded on the flat plane and scaled by the
+    provider's grid_radius() so the bound also holds for haversine and road
+    distances.
+    """
+
+    def __init__(self, sites: SiteTable, cell_km: float = 10.0):
+        self.sites = sites
+        self.cell_km = cell_km
+        self.units: Dict[int, List[int]] = {}
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def _cell(self, site: int) -> Tuple[int, int]:
+        return (
+            math.floor(self.sites.latitudes[site] * KM_PER_DEGREE_LAT / self.cell_km),
+            math.floor(self.sites.longitudes[site] * KM_PER_DEGREE_LON / self.cell_km)
+        )
+
+    def add(self, site: int, unit: int) -> None:
+        units = self.units.get(site)
+        if units is None:
+            units = self.units[site] = []
+            self.cells[self._cell(site)].append(site)
+        units.append(unit)
+
+    def remove(self, site: int, unit: int) -> None:
+        units = self.units[site]
+        units.remove(unit)
+        if not units:
+            del self.units[site]
+            cell = self._cell(site)
+            self.cells[cell].remove(site)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def _ring_cells(self, row: int, col: int, ring: int) -> Iterable[Tuple[int, int]]:
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    def _rings(self, row: int, col: int, max_ring: int) -> Iterable[Tuple[int, Iterable[Tuple[int, int]]]]:
+        """
+        (ring, cells) outward to max_ring: each ring's cells are generated
+        while a ring is smaller than the occupied cells, after which the
+        occupied cells still further out are bucketed by ring instead.
+        """
+
+        for ring in range(max_ring + 1):
+            if 8 * ring > len(self.cells):
+                break
+            yield ring, self._ring_cells(row, col, ring)
+        else:
+            return
+
+        buckets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for cell in self.cells:
+            cell_ring = max(abs(cell[0] - row), abs(cell[1] - col))
+            if ring <= cell_ring <= max_ring:
+                buckets[cell_ring].append(cell)
+        for cell_ring in sorted(buckets):
+            yield cell_ring, buckets[cell_ring]
+
+    def closest(
+        self,
+        site: int,
+        radius_km: float,
+        quantity: int,
+        provider: DistanceProvider,
+        max_abs_lat: float
+    ) -> List[Tuple[float, int, int]]:
+        """
+        Up to quantity (distance_km, site, unit) idle units strictly within
+        radius_km of a site, closest first (ties to the lower site id, then
+        arrival order).
+        """
+
+        if quantity <= 0 or not self.units or radius_km <= 0:
+            return []
+
+        sites = self.sites
+        lat, lon = sites.latitudes[site], sites.longitudes[site]
+        row, col = self._cell(site)
+
+        # Flat-plane distance overstates the provider's by at most this much within the radius
+        factor = provider.grid_radius(radius_km, max_abs_lat) / radius_km
+        max_ring = math.ceil(radius_km * factor / self.cell_km) + 1
+
+        found: List[Tuple[float, int]] = []
+        for ring, cells in self._rings(row, col, max_ring):
+            ring_sites = [candidate for cell in cells for candidate in self.cells.get(cell, ())]
+            if ring_sites:
+                distances = provider.distances(
+                    lat, lon,
+                    [sites.latitudes[candidate] for candidate in ring_sites],
+                    [sites.longitudes[candidate] for candidate in ring_sites],
+                    site, ring_sites
+                )
+                found.extend(
+                    (float(distance), candidate)
+                    for distance, candidate in zip(distances, ring_sites)
+                    if distance < radius_km
+                )
+
+            # Sites beyond this ring are at least ring * cell_km away on the plane
+            bound = ring * self.cell_km / factor
+            found.sort()
+            settled = 0
+            for distance, candidate in found:
+                if distance >= bound:
+                    break
+                settled += len(self.units[candidate])
+            if settled >= quantity:
+                break
+
+        chosen = []
+        for distance, candidate in sorted(found):
+            for unit in self.units[candidate]:
+                chosen.append((distance, candidate, unit))
+                if len(chosen) == quantity:
+                    return chosen
+        return chosen
+
+class FleetSimulator:
+    """
+    Event-driven replay of a contract table that tracks individual units.
+
+    Hire starts, off-hires and returns to depot go through one heapq event
+    loop in time order. Each contract needs its hire lines' quantity of
+    units per equipment category. Units coming off hire wait at their site
+    for up to date_range_allowance whole days; a hire start takes the
+    closest such units that are nearer than its baseline depot (the
+    site-to-site rule of the chain analysis), then makes up the rest from
+    that depot. Units still on site when the window closes are trucked back
+    to the depot of the contract they came off. A depot with no idle unit
+    of a category gets a new one, so the simulated fleet is what the
+    bookings actually require.
+
+    Distances come from the table's provider and its site-pair cache.
+    """
+
+    def __init__(self, table: ContractTable, contracts: Dict[str, Dict], date_range_allowance: int = 10):
+        self.table = table
+        self.provider = table.provider
+        self.window = (date_range_allowance + 1) * MICROSECONDS_PER_DAY
+
+        # Unit categories interned to ids
+        self.category_index: Dict[str, int] = {}
+        self.category_codes: List[str] = []
+        self.category_names: List[str] = []
+        self.category_groups: List[str] = []
+
+        # Per row: [(category id, quantity)]
+        self.needs: List[List[Tuple[int, int]]] = []
+        for contract_key in table.keys:
+            row_needs = []
+            for (code, name, group_name), quantity in hire_quantities(contracts[contract_key]).items():
+                category = self.category_index.get(code)
+                if category is None:
+                    category = self.category_index[code] = len(self.category_codes)
+                    self.category_codes.append(code)
+                    self.category_names.append(name)
+                    self.category_groups.append(group_name)
+                row_needs.append((category, quantity))
+            self.needs.append(row_needs)
+
+        # Per unit: category, depot it belongs to, the row it last worked on,
+        # and a version bumped on every move so stale RETURN events are skipped
+        self.unit_category: List[int] = []
+        self.unit_depot: List[int] = []
+        self.unit_row: List[int] = []
+        self.unit_version: List[int] = []
+
+        # Idle pools: (depot, category) -> units, and per category the sites with idle units
+        self.depot_idle: Dict[Tuple[int, int], List[int]] = {}
+        self.site_idle: List[IdleSiteGrid] = [IdleSiteGrid(table.sites) for _ in self.category_codes]
+        self.max_abs_lat = max((abs(lat) for lat in table.latitudes), default=0.0)
+
+        # Units on hire per row, released at off-hire
+        self.on_hire: Dict[int, List[int]] = {}
+
+    def _new_unit(self, category: int, depot: int) -> int:
+        unit = len(self.unit_category)
+        self.unit_category.append(category)
+        self.unit_depot.append(depot)
+        self.unit_row.append(-1)
+        self.unit_version.append(0)
+        return unit
+
+    def run(self) -> Dict:
+        """
+        Replay every contract. Returns {'categories': [per-category stats],
+        'group_peaks': {equipment group: most units of the group on hire at
+        once}, 'span_days': days from the first hire start to the last
+        off-hire}.
+        """
+
+        table = self.table
+        events: List[Tuple[int, int, int, int]] = [
+            (table.start_times[i], HIRE_START, i, 0)
+            for i in range(len(table))
+            if self.needs[i]
+        ]
+        heapq.heapify(events)
+
+        stats = [
+            {
+                'units_on_hire': 0,
+                'peak_on_hire': 0,
+                'hire_unit_days': 0.0,
+                'units_dispatched': 0,
+                'from_site': 0,
+                'from_depot': 0,
+                'delivery_km': 0.0,
+                'site_to_site_km': 0.0,
+                'return_km': 0.0,
+                'baseline_km': 0.0
+            }
+            for _ in self.category_codes
+        ]
+
+        # Units on hire per equipment group, so its peak is simultaneous across its categories
+        group_on_hire = {group: 0 for group in self.category_groups}
+        group_peaks = dict(group_on_hire)
+
+        first_start = last_off_hire = None
+
+        while events:
+            now, kind, subject, version = heapq.heappop(events)
+
+            if kind == HIRE_START:
+                i = subject
+                if first_start is None:
+                    first_start = now
+                end = max(table.end_times[i], now)
+                depot = table.depot_positions[i]
+                depot_distance = table.distance_to_depot[i]
+                units = []
+
+                for category, quantity in self.needs[i]:
+                    category_stats = stats[category]
+
+                    # Idle units on nearby sites first, closest first
+                    idle_sites = self.site_idle[category]
+                    from_site = idle_sites.closest(table.site_ids[i], depot_distance, quantity, self.provider, self.max_abs_lat)
+                    for distance, site, unit in from_site:
+                        idle_sites.remove(site, unit)
+                        self.unit_version[unit] += 1
+                        category_stats['site_to_site_km'] += distance
+                        units.append(unit)
+
+                    # The rest from the baseline depot, adding units when it runs dry
+                    pool = self.depot_idle.setdefault((depot, category), [])
+                    for _ in range(quantity - len(from_site)):
+                        units.append(pool.pop() if pool else self._new_unit(category, depot))
+                        category_stats['delivery_km'] += depot_distance
+
+                    category_stats['from_site'] += len(from_site)
+                    category_stats['from_depot'] += quantity - len(from_site)
+                    category_stats['units_dispatched'] += quantity
+                    category_stats['baseline_km'] += 2 * depot_distance * quantity
+                    category_stats['units_on_hire'] += quantity
+                    category_stats['peak_on_hire'] = max(category_stats['peak_on_hire'], category_stats['units_on_hire'])
+                    group = self.category_groups[category]
+                    group_on_hire[group] += quantity
+                    group_peaks[group] = max(group_peaks[group], group_on_hire[group])
+                    category_stats['hire_unit_days'] += quantity * (end - now) / MICROSECONDS_PER_DAY
+
+                self.on_hire[i] = units
+                heapq.heappush(events, (end, OFF_HIRE, i, 0))
+
+            elif kind == OFF_HIRE:
+                i = subject
+                last_off_hire = now
+                site = table.site_ids[i]
+
+                # Units wait on site for a nearby hire until the window closes
+                for unit in self.on_hire.pop(i):
+                    category = self.unit_category[unit]
+                    stats[category]['units_on_hire'] -= 1
+                    group_on_hire[self.category_groups[category]] -= 1
+                    self.unit_row[unit] = i
+                    self.unit_depot[unit] = table.depot_positions[i]
+                    self.unit_version[unit] += 1
+                    self.site_idle[category].add(site, unit)
+                    heapq.heappush(events, (now + self.window, RETURN, unit, self.unit_version[unit]))
+
+            else:
+                unit = subject
+                if version != self.unit_version[unit]:
+                    continue  # Dispatched to another site in the meantime
+
+                category = self.unit_category[unit]
+                row = self.unit_row[unit]
+                self.site_idle[category].remove(table.site_ids[row], unit)
+                self.unit_version[unit] += 1
+                stats[category]['return_km'] += table.distance_to_depot[row]
+                self.depot_idle.setdefault((self.unit_depot[unit], category), []).append(unit)
+
+        fleet = [0] * len(self.category_codes)
+        for category in self.unit_category:
+            fleet[category] += 1
+        for category, category_stats in enumerate(stats):
+            category_stats['fleet_size'] = fleet[category]
+            del category_stats['units_on_hire']
+
+        span = (last_off_hire - first_start) / MICROSECONDS_PER_DAY if first_start is not None else 0.0
+        return {'categories': stats, 'group_peaks': group_peaks, 'span_days': span}
+
+def summarize_by_group(simulator: FleetSimulator, result: Dict) -> Dict[str, Dict]:
+    """
+    Per equipment group totals, with utilisation = unit-days on hire /
+    (fleet x span). The peak is the group's own simultaneous peak, not the
+    sum of its categories' peaks.
+    """
+
+    groups: Dict[str, Dict] = {}
+    for category, category_stats in enumerate(result['categories']):
+        group = groups.setdefault(simulator.category_groups[category], {key: 0 for key in category_stats})
+        for key, value in category_stats.items():
+            group[key] += value
+
+    for name, group in groups.items():
+        group['peak_on_hire'] = result['group_peaks'][name]
+        available_days = group['fleet_size'] * result['span_days']
+        group['utilisation'] = group['hire_unit_days'] / available_days if available_days else 0.0
+        group['transport_km'] = group['delivery_km'] + group['site_to_site_km'] + group['return_km']
+
+    return groups
+
+def simulate_fleet(
+    path: str = 'extracted_data/2023_vms_victoria.json',
+    date_range_allowance: int = 10,
+    provider: Optional[DistanceProvider] = None
+) -> Tuple[FleetSimulator, Dict]:
+    """Replay a contract export through the fleet simulator."""
+
+    table = load_contract_table(path, provider=provider)
+    simulator = FleetSimulator(table, load_json_cached(path), date_range_allowance)
+    return simulator, simulator.run()
+
+def main(provider: Optional[DistanceProvider] = None):
+    if provider is None:
+        # Command line: --distance, --road-matrix and --pair-cache
+        provider, _ = parse_distance_arguments('Replay 2023 Victorian VMS contracts through a fleet of individual units.', workers=False)
+
+    print("=== FLEET SIMULATION (2023 Victoria VMS Contracts) ===\n")
+
+    started = time.perf_counter()
+    simulator, result = simulate_fleet(provider=provider)
+    elapsed = time.perf_counter() - started
+    provider.save_cache()
+
+    groups = summarize_by_group(simulator, result)
+
+    print(f"Simulated {result['span_days']:.0f} days, {len(simulator.category_codes)} equipment categories in {elapsed:.2f}s\n")
+
+    print(f"{'Equipment Group':<16} {'Fleet':<6} {'Peak':<6} {'Dispatched':<11} {'From site':<10} {'Utilisation':<12} {'Transport km':<13} {'Baseline km'}")
+    print("-" * 95)
+    for name, group in sorted(groups.items(), key=lambda item: item[1]['units_dispatched'], reverse=True):
+        utilisation = f"{group['utilisation'] * 100:.1f}%"
+        print(f"{name:<16} {group['fleet_size']:<6} {group['peak_on_hire']:<6} {group['units_dispatched']:<11} "
+              f"{group['from_site']:<10} {utilisation:<12} {group['transport_km']:<13.1f} {group['baseline_km']:.1f}")
+
+    transport = sum(group['transport_km'] for group in groups.values())
+    baseline = sum(group['baseline_km'] for group in groups.values())
+    print(f"\nTransport distance: {transport:.1f} km (depot-only baseline {baseline:.1f} km)")
+    if baseline > 0:
+        print(f"Saved by site-to-site moves: {baseline - transport:.1f} km ({(baseline - transport) / baseline * 100:.1f}%)")
+
+    report = {
+        'span_days': result['span_days'],
+        'groups': groups,
+        'categories': {
+            simulator.category_codes[category]: dict(category_stats, name=simulator.category_names[category], equipment_group=simulator.category_groups[category])
+            for category, category_stats in enumerate(result['categories'])
+        }
+    }
+    with open('reports/fleet_simulation.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print("\nPer-category results written to reports/fleet_simulation.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+import math
+import os
+from array import array
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from contract_table import parse_timestamp
+from snapshot_cache import load_json_cached, read_snapshot, source_fingerprint, write_snapshot
+
+# Bump when the table's columns or normalization change so old snapshots are rebuilt
+TABLE_FORMAT = 2
+
+# Stand-ins for a missing start/end time and for one present but unparseable
+MISSING_TIME = -2**63
+INVALID_TIME = -2**63 + 1
+
+NUMERIC_COLUMNS = ('start_times', 'end_times', 'latitudes', 'longitudes', 'need_offsets', 'need_categories', 'need_counts')
+STRING_COLUMNS = ('address_strings', 'start_strings', 'end_strings')
+
+# Tables already built in this process: path -> ((size, mtime_ns) of the file, table)
+_loaded_tables: Dict[str, Tuple[Tuple[int, int], 'JobRequestTable']] = {}
+
+class CategoryTable:
+    """
+    The distinct equipment categories of a request file, interned to small
+    integer ids. The original category objects are kept once each in
+    categories; codes, names, group ids and the hire flag are columns so
+    filters compare integers instead of walking nested dicts.
+    """
+
+    def __init__(self):
+        self.categories: List[Dict] = []
+        self.index: Dict[Tuple, int] = {}
+        self.codes: List[str] = []
+        self.names: List[str] = []
+        self.group_ids = array('i')
+        self.is_hire = array('b')
+
+        # Equipment group names, interned the same way (-1 means no group)
+        self.groups: List[str] = []
+        self.group_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def intern(self, item) -> int:
+        """
+        Id of an equipment_needed entry: a category object from
+        transformed_data.json or a plain type name from Index.html.
+        """
+
+        if isinstance(item, dict):
+            key = (item.get('id'), item.get('code'), item.get('name'))
+        else:
+            key = (None, item, item)
+
+        category_id = self.index.get(key)
+        if category_id is not None:
+            return category_id
+
+        category = item if isinstance(item, dict) else {'code': item, 'name': item, 'isHire': True}
+        category_id = self.index[key] = len(self.categories)
+        self.categories.append(category)
+        self.codes.append(category.get('code') or category.get('name') or '')
+        self.names.append(category.get('name') or '')
+        self.is_hire.append(1 if category.get('isHire', True) else 0)
+
+        group = category.get('equipmentGroup')
+        group_name = group.get('name') if isinstance(group, dict) else None
+        if group_name and group_name not in self.group_index:
+            self.group_index[group_name] = len(self.groups)
+            self.groups.append(group_name)
+        self.group_ids.append(self.group_index[group_name] if group_name else -1)
+
+        return category_id
+
+    def group_id(self, group_name: str) -> int:
+        return self.group_index.get(group_name, -1)
+
+    def ids_in_group(self, group_name: str) -> Set[int]:
+        group_id = self.group_id(group_name)
+        if group_id == -1:
+            return set()
+        return {i for i, category_group in enumerate(self.group_ids) if category_group == group_id}
+
+class JobRequestTable:
+    """
+    Column-oriented JobRequest store for large request files.
+
+    One row per request, in file order:
+    - job_ids: job_id values as given (None when absent)
+    - address_strings: strings
+    - start_strings, end_strings: start_time / end_time_projected as given
+      ('' when absent or unparseable), so reports can echo them
+    - start_times, end_times: int64 epoch microseconds (MISSING_TIME if
+      absent, INVALID_TIME if unparseable)
+    - latitudes, longitudes: float64 location_gps (NaN if absent or unusable)
+
+    equipment_needed becomes (category id, count) pairs, one per distinct
+    category in first-seen order, stored CSR-style: request i owns
+    need_categories / need_counts[need_offsets[i]:need_offsets[i + 1]].
+    """
+
+    def __init__(self):
+        self.categories = CategoryTable()
+        self.job_ids: List[Any] = []
+        self.address_strings: List[str] = []
+        self.start_strings: List[str] = []
+        self.end_strings: List[str] = []
+        self.start_times = array('q')
+        self.end_times = array('q')
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.need_offsets = array('q', [0])
+        self.need_categories = array('i')
+        self.need_counts = array('i')
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    @classmethod
+    def from_requests(cls, job_requests: List[Dict]) -> 'JobRequestTable':
+        """Build the table from a list of JobRequest records."""
+
+        table = cls()
+        intern = table.categories.intern
+
+        for job_request in job_requests:
+            table.job_ids.append(job_request.get('job_id'))
+            table.address_strings.append(job_request.get('address_string') or '')
+
+            for times, strings, field in (
+                (table.start_times, table.start_strings, 'start_time'),
+                (table.end_times, table.end_strings, 'end_time_projected')
+            ):
+                value = job_request.get(field)
+                if not value:
+                    times.append(MISSING_TIME)
+                    strings.append('')
+                    continue
+                try:
+                    times.append(parse_timestamp(value))
+                    strings.append(value)
+                except (ValueError, TypeError, AttributeError):
+                    times.append(INVALID_TIME)
+                    strings.append('')
+
+            # Absent, short or null coordinates ([null, null]) all mean no location
+            location = job_request.get('location_gps')
+            try:
+                latitude, longitude = float(location[0]), float(location[1])
+            except (TypeError, ValueError, IndexError, KeyError):
+                latitude = longitude = math.nan
+            table.latitudes.append(latitude)
+            table.longitudes.append(longitude)
+
+            counts: Dict[int, int] = {}
+            for item in job_request.get('equipment_needed') or []:
+                category_id = intern(item)
+                counts[category_id] = counts.get(category_id, 0) + 1
+            table.need_categories.extend(counts.keys())
+            table.need_counts.extend(counts.values())
+            table.need_offsets.append(len(table.need_categories))
+
+        return table
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> Optional['JobRequestTable']:
+        """Load the table from <path>.table.snapshot if it is fresh, else None."""
+
+        snapshot = read_snapshot(f"{path}.table.snapshot", path, _snapshot_params())
+        if snapshot is None:
+            return None
+
+        table = cls()
+        for name in NUMERIC_COLUMNS:
+            setattr(table, name, snapshot['arrays'][name])
+        for name in STRING_COLUMNS:
+            setattr(table, name, snapshot['strings'][name])
+        table.job_ids = snapshot['payload']['job_ids']
+
+        # A few dozen categories: re-intern them in their original order
+        for category in snapshot['payload']['categories']:
+            table.categories.intern(category)
+
+        return table
+
+    def save_snapshot(self, path: str, fingerprint: Dict = None) -> bool:
+        """Write the table beside its source file as <path>.table.snapshot."""
+        return write_snapshot(
+            f"{path}.table.snapshot",
+            path,
+            _snapshot_params(),
+            arrays={name: getattr(self, name) for name in NUMERIC_COLUMNS},
+            strings={name: getattr(self, name) for name in STRING_COLUMNS},
+            payload={'categories': self.categories.categories, 'job_ids': self.job_ids},
+            fingerprint=fingerprint
+        )
+
+    def has_location(self, i: int) -> bool:
+        return not math.isnan(self.latitudes[i])
+
+    def has_dates(self, i: int) -> bool:
+        """Both dates present and parseable."""
+        return self.start_times[i] not in (MISSING_TIME, INVALID_TIME) and self.end_times[i] not in (MISSING_TIME, INVALID_TIME)
+
+    def missing_dates(self, i: int) -> bool:
+        """Start or end date absent (rather than unparseable)."""
+        return self.start_times[i] == MISSING_TIME or self.end_times[i] == MISSING_TIME
+
+    def location(self, i: int) -> Tuple[float, float]:
+        return self.latitudes[i], self.longitudes[i]
+
+    def needs(self, i: int) -> List[Tuple[int, int]]:
+        """(category id, count) pairs for request i."""
+        start, end = self.need_offsets[i], self.need_offsets[i + 1]
+        return list(zip(self.need_categories[start:end], self.need_counts[start:end]))
+
+    def hire_lines(self, i: int) -> List[Dict]:
+        """Same as equipment_matching.hire_lines, from the interned needs."""
+
+        categories = self.categories
+        lines: Dict[str, Dict] = {}
+        for category_id, count in self.needs(i):
+            if not categories.is_hire[category_id]:
+                continue
+            code = categories.codes[category_id]
+            line = lines.get(code)
+            if line is None:
+                line = lines[code] = {'code': code, 'equipment_type': categories.names[category_id], 'quantity': 0}
+            line['quantity'] += count
+
+        return list(lines.values())
+
+    def requests_with_group(self, group_name: str) -> List[int]:
+        """Rows needing at least one category of an equipment group (e.g. 'VMS')."""
+
+        group_id = self.categories.group_id(group_name)
+        if group_id == -1:
+            return []
+
+        group_ids = self.categories.group_ids
+        offsets = self.need_offsets
+        need_categories = self.need_categories
+
+        return [
+            i for i in range(len(self.job_ids))
+            if any(group_ids[need_categories[k]] == group_id for k in range(offsets[i], offsets[i + 1]))
+        ]
+
+    def group_counts(self) -> Dict[str, int]:
+        """Requests per equipment group."""
+
+        counts = [0] * len(self.categories.groups)
+        group_ids = self.categories.group_ids
+        offsets = self.need_offsets
+        for i in range(len(self.job_ids)):
+            seen = {group_ids[self.need_categories[k]] for k in range(offsets[i], offsets[i + 1])}
+            for group_id in seen:
+                if group_id != -1:
+                    counts[group_id] += 1
+
+        return dict(zip(self.categories.groups, counts))
+
+def _snapshot_params() -> Dict:
+    return {'kind': 'job_request_table', 'format': TABLE_FORMAT}
+
+def load_job_request_table(path: str = 'transformed_data.json') -> JobRequestTable:
+    """
+    Return the request table for a file, building it at most once per
+    process (again if the file's size or mtime changes). A fresh
+    <path>.table.snapshot is used when present; otherwise the source is
+    parsed and the snapshot (re)written.
+    """
+
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    loaded = _loaded_tables.get(path)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+
+    table = JobRequestTable.from_snapshot(path)
+    if table is None:
+        fingerprint = source_fingerprint(path)
+        table = JobRequestTable.from_requests(load_json_cached(path))
+        table.save_snapshot(path, fingerprint)
+
+    _loaded_tables[path] = (version, table)
+    return table
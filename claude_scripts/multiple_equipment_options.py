@@ -1,152 +1,138 @@
 #!/usr/bin/env python3
-import json
-import math
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Optional
 from collections import defaultdict
 
-def euclidean_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate Euclidean distance between two points in kilometers."""
-    lat_diff = (lat2 - lat1) * 111  # ~111 km per degree latitude
-    lon_diff = (lon2 - lon1) * 85   # ~85 km per degree longitude in Victoria
-    return math.sqrt(lat_diff**2 + lon_diff**2)
-
-def find_multiple_equipment_options(date_range_allowance: int = 10) -> Dict:
+from contract_table import ContractTable, load_contract_table
+from distance_engine import DistanceProvider, parse_distance_arguments
+from opportunities import Opportunity, iter_contract_opportunities
+from ranking import TopK
+
+def option_record(table: ContractTable, opportunity: Opportunity) -> Dict:
+    """One equipment option: taking the previous contract's equipment instead of the depot's."""
+    j = opportunity.previous
+
+    return {
+        'previous_contract': table.keys[j],
+        'previous_site': table.site_names[j],
+        'previous_end': table.end_date(j),
+        'days_gap': opportunity.days_gap,
+        'site_to_site_km': round(opportunity.site_to_site_km, 1),
+        'potential_savings_km': round(opportunity.savings_km, 1),
+        'savings_percentage': round(opportunity.savings_percentage, 1)
+    }
+
+def contract_options(table: ContractTable, i: int, opportunities: List[Opportunity]) -> Dict:
+    """Contract i with all its equipment options, best savings first."""
+
+    # Sort options by potential savings (as rounded for the report), then format them
+    ranked = sorted(opportunities, key=lambda opportunity: round(opportunity.savings_km, 1), reverse=True)
+    available_options = [option_record(table, opportunity) for opportunity in ranked]
+
+    return {
+        'current_contract': table.keys[i],
+        'current_site': table.site_names[i],
+        'current_start': table.start_date(i),
+        'depot': table.depot_name(i),
+        'depot_distance_km': round(table.distance_to_depot[i], 1),
+        'num_options': len(available_options),
+        'options': available_options
+    }
+
+def find_multiple_equipment_options(
+    date_range_allowance: int = 10,
+    provider: Optional[DistanceProvider] = None,
+    workers: int = 1
+) -> Dict:
     """
     Find contracts that have multiple VMS equipment options available
     from recently completed contracts instead of depot.
+    Distances come from provider (the flat 111/85 plane by default); with
+    workers > 1 the candidate search is shared across that many processes.
+    See summarize_multiple_options for the totals and the contracts with
+    the most options without holding every contract's options.
     """
 
-    with open('extracted_data/2023_vms_victoria.json', 'r') as f:
-        data = json.load(f)
-
-    # Get depot location
-    depot_lat, depot_lon = -37.6805, 145.0064
-
-    contracts_list = []
+    # Columnar contract data, parsed once per dataset and shared between analyses;
+    # each contract's baseline is its own depot (or the nearest one)
+    table = load_contract_table('extracted_data/2023_vms_victoria.json', provider=provider)
+
+    # Only include contracts with multiple options (2 or more)
+    return {
+        table.keys[i]: contract_options(table, i, opportunities)
+        for i, opportunities in iter_contract_opportunities(table, date_range_allowance, workers)
+        if len(opportunities) >= 2
+    }
+
+def summarize_multiple_options(
+    date_range_allowance: int = 10,
+    provider: Optional[DistanceProvider] = None,
+    workers: int = 1,
+    top: int = 15
+) -> Dict:
+    """
+    Running totals over the contracts with 2 or more equipment options and
+    the top ones by option count (ties in start date order), streamed so
+    memory stays flat. Returns {'contracts', 'total_options',
+    'max_options', 'option_counts' ({options: contracts}), 'top'}, with
+    top as contract_options records.
+    """
 
-    # Prepare contract data
-    for contract_key, contract in data.items():
-        site_address = contract.get('siteAddress', {})
-        lat = site_address.get('latitude')
-        lon = site_address.get('longitude')
+    table = load_contract_table('extracted_data/2023_vms_victoria.json', provider=provider)
 
-        start_date_str = contract.get('startDate')
-        end_date_str = contract.get('actualEndDate') or contract.get('plannedEndDate')
+    best = TopK(top)
+    contracts = total_options = max_options = 0
+    option_counts: Dict[int, int] = defaultdict(int)
 
-        if not all([lat, lon, start_date_str, end_date_str]):
+    for i, opportunities in iter_contract_opportunities(table, date_range_allowance, workers):
+        num_options = len(opportunities)
+        if num_options < 2:
             continue
 
-        try:
-            site_lat = float(lat)
-            site_lon = float(lon)
-            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-
-            distance_to_depot = euclidean_distance(site_lat, site_lon, depot_lat, depot_lon)
-
-            contracts_list.append({
-                'contract_key': contract_key,
-                'site_name': site_address.get('name', ''),
-                'latitude': site_lat,
-                'longitude': site_lon,
-                'start_date': start_date,
-                'end_date': end_date,
-                'distance_to_depot': distance_to_depot
-            })
-
-        except (ValueError, TypeError):
-            continue
+        contracts += 1
+        total_options += num_options
+        max_options = max(max_options, num_options)
+        option_counts[num_options] += 1
+        best.push(num_options, (i, opportunities))
+
+    return {
+        'contracts': contracts,
+        'total_options': total_options,
+        'max_options': max_options,
+        'option_counts': dict(option_counts),
+        'top': [contract_options(table, i, opportunities) for i, opportunities in best.items()]
+    }
+
+def main(provider: Optional[DistanceProvider] = None, workers: int = 1):
+    if provider is None:
+        # Command line: --distance, --road-matrix, --pair-cache and --workers
+        provider, workers = parse_distance_arguments('Find 2023 Victorian VMS contracts with several site-to-site equipment options.')
 
-    # Sort contracts by start date
-    contracts_list.sort(key=lambda x: x['start_date'])
-
-    # Find contracts with multiple equipment options
-    multiple_options = {}
-
-    for i, current_contract in enumerate(contracts_list):
-        current_start = current_contract['start_date']
-        current_lat = current_contract['latitude']
-        current_lon = current_contract['longitude']
-        current_depot_distance = current_contract['distance_to_depot']
-
-        # Find all available equipment options for this contract
-        available_options = []
-
-        for j, previous_contract in enumerate(contracts_list):
-            if i == j:
-                continue
-
-            prev_end = previous_contract['end_date']
-            days_difference = (current_start - prev_end).days
-
-            # Check if previous contract ended within allowable range
-            if 0 <= days_difference <= date_range_allowance:
-                prev_lat = previous_contract['latitude']
-                prev_lon = previous_contract['longitude']
-
-                site_to_site_distance = euclidean_distance(
-                    prev_lat, prev_lon, current_lat, current_lon
-                )
-
-                # Check if site-to-site is closer than depot-to-site
-                if site_to_site_distance < current_depot_distance:
-                    potential_savings = current_depot_distance - site_to_site_distance
-
-                    available_options.append({
-                        'previous_contract': previous_contract['contract_key'],
-                        'previous_site': previous_contract['site_name'],
-                        'previous_end': prev_end.strftime('%Y-%m-%d'),
-                        'days_gap': days_difference,
-                        'site_to_site_km': round(site_to_site_distance, 1),
-                        'potential_savings_km': round(potential_savings, 1),
-                        'savings_percentage': round((potential_savings / current_depot_distance) * 100, 1)
-                    })
-
-        # Only include contracts with multiple options (2 or more)
-        if len(available_options) >= 2:
-            # Sort options by potential savings
-            available_options.sort(key=lambda x: x['potential_savings_km'], reverse=True)
-
-            multiple_options[current_contract['contract_key']] = {
-                'current_contract': current_contract['contract_key'],
-                'current_site': current_contract['site_name'],
-                'current_start': current_start.strftime('%Y-%m-%d'),
-                'depot_distance_km': round(current_depot_distance, 1),
-                'num_options': len(available_options),
-                'options': available_options
-            }
-
-    return multiple_options
-
-def main():
     print("=== MULTIPLE VMS EQUIPMENT OPTIONS ANALYSIS ===\n")
 
-    multiple_options = find_multiple_equipment_options()
-
-    print(f"Found {len(multiple_options)} contracts with multiple equipment options\n")
+    summary = summarize_multiple_options(provider=provider, workers=workers)
+    provider.save_cache()
 
-    if multiple_options:
-        # Sort by number of options
-        sorted_contracts = sorted(multiple_options.items(),
-                                key=lambda x: x[1]['num_options'], reverse=True)
+    print(f"Found {summary['contracts']} contracts with multiple equipment options\n")
 
+    if summary['contracts']:
+        # The 15 with the most options
         print("=== CONTRACTS WITH MOST OPTIONS ===")
         print(f"{'Contract':<12} {'Site':<25} {'Start Date':<12} {'Options':<8} {'Best Savings'}")
         print("-" * 80)
 
-        for contract_key, data in sorted_contracts[:15]:
+        for data in summary['top']:
             best_savings = data['options'][0]['potential_savings_km']
-            print(f"{contract_key:<12} {data['current_site'][:24]:<25} {data['current_start']:<12} "
+            print(f"{data['current_contract']:<12} {data['current_site'][:24]:<25} {data['current_start']:<12} "
                   f"{data['num_options']:<8} {best_savings} km")
 
         # Show detailed example
-        print(f"\n=== DETAILED EXAMPLE: {sorted_contracts[0][0]} ===")
-        example = sorted_contracts[0][1]
+        example = summary['top'][0]
+        print(f"\n=== DETAILED EXAMPLE: {example['current_contract']} ===")
 
         print(f"Contract: {example['current_contract']}")
         print(f"Site: {example['current_site']}")
         print(f"Start Date: {example['current_start']}")
+        print(f"Depot: {example['depot']}")
         print(f"Depot Distance: {example['depot_distance_km']} km")
         print(f"Available Options: {example['num_options']}")
         print()
@@ -162,11 +148,11 @@ def main():
 
         # Summary statistics
         print(f"\n=== SUMMARY STATISTICS ===")
-        total_contracts_with_options = len(multiple_options)
-        total_options = sum(data['num_options'] for data in multiple_options.values())
+        total_contracts_with_options = summary['contracts']
+        total_options = summary['total_options']
         avg_options = total_options / total_contracts_with_options if total_contracts_with_options > 0 else 0
 
-        max_options = max(data['num_options'] for data in multiple_options.values())
+        max_options = summary['max_options']
 
         print(f"Contracts with multiple options: {total_contracts_with_options}")
         print(f"Total equipment options available: {total_options}")
@@ -174,9 +160,7 @@ def main():
         print(f"Maximum options for single contract: {max_options}")
 
         # Distribution of option counts
-        option_counts = defaultdict(int)
-        for data in multiple_options.values():
-            option_counts[data['num_options']] += 1
+        option_counts = summary['option_counts']
 
         print(f"\nOption Count Distribution:")
         for count in sorted(option_counts.keys()):
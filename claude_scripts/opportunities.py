@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import csv
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from candidate_search import iter_predecessor_candidates
+from contract_table import ContractTable
+
+# Columns of a formatted opportunity, in report and CSV order
+OPPORTUNITY_FIELDS = (
+    'current_contract',
+    'current_site',
+    'current_start',
+    'previous_contract',
+    'previous_site',
+    'previous_end',
+    'days_gap',
+    'site_to_site_km',
+    'depot',
+    'depot_to_site_km',
+    'potential_savings_km',
+    'savings_percentage'
+)
+
+class Opportunity:
+    """
+    One site-to-site move: equipment leaving previous's site (a contract
+    table row) for current's instead of coming from the depot. Only raw
+    numbers are held; opportunity_record() formats them for reports.
+    """
+
+    __slots__ = ('current', 'previous', 'days_gap', 'site_to_site_km', 'depot_to_site_km')
+
+    def __init__(self, current: int, previous: int, days_gap: int, site_to_site_km: float, depot_to_site_km: float):
+        self.current = current
+        self.previous = previous
+        self.days_gap = days_gap
+        self.site_to_site_km = site_to_site_km
+        self.depot_to_site_km = depot_to_site_km
+
+    @property
+    def savings_km(self) -> float:
+        return self.depot_to_site_km - self.site_to_site_km
+
+    @property
+    def savings_percentage(self) -> float:
+        return self.savings_km / self.depot_to_site_km * 100
+
+def iter_contract_opportunities(
+    table: ContractTable,
+    date_range_allowance: int = 10,
+    workers: int = 1,
+    max_distance_from_depot: Optional[float] = None
+) -> Iterator[Tuple[int, List[Opportunity]]]:
+    """
+    Yield (i, opportunities) for every row of the contract table, in start
+    date order: one Opportunity per recently ended contract closer to
+    contract i's site than its depot (see iter_predecessor_candidates).
+    Contracts further than max_distance_from_depot from their depot (if
+    given) have none.
+    """
+    for i, candidates in iter_predecessor_candidates(table, date_range_allowance, workers):
+        depot_distance = table.distance_to_depot[i]
+        if max_distance_from_depot is not None and depot_distance > max_distance_from_depot:
+            yield i, []
+            continue
+
+        yield i, [
+            Opportunity(i, j, days_difference, site_to_site_distance, depot_distance)
+            for j, days_difference, site_to_site_distance in candidates
+        ]
+
+def iter_opportunities(
+    table: ContractTable,
+    date_range_allowance: int = 10,
+    workers: int = 1,
+    max_distance_from_depot: Optional[float] = None
+) -> Iterator[Opportunity]:
+    """Stream every contract's opportunities, contract by contract in start date order."""
+    for _, opportunities in iter_contract_opportunities(table, date_range_allowance, workers, max_distance_from_depot):
+        yield from opportunities
+
+def opportunity_record(table: ContractTable, opportunity: Opportunity) -> Dict:
+    """An opportunity as the report lists it (OPPORTUNITY_FIELDS), dates formatted and km rounded."""
+    i, j = opportunity.current, opportunity.previous
+
+    return {
+        'current_contract': table.keys[i],
+        'current_site': table.site_names[i],
+        'current_start': table.start_date(i),
+        'previous_contract': table.keys[j],
+        'previous_site': table.site_names[j],
+        'previous_end': table.end_date(j),
+        'days_gap': opportunity.days_gap,
+        'site_to_site_km': round(opportunity.site_to_site_km, 1),
+        'depot': table.depot_name(i),
+        'depot_to_site_km': round(opportunity.depot_to_site_km, 1),
+        'potential_savings_km': round(opportunity.savings_km, 1),
+        'savings_percentage': round(opportunity.savings_percentage, 1)
+    }
+
+def export_opportunities_csv(f: TextIO, table: ContractTable, opportunities: Iterable[Opportunity]) -> Iterator[Opportunity]:
+    """
+    Write each opportunity to the open CSV file f as it streams past, then
+    pass it on, so a summary can be taken in the same pass. Only the row
+    being written is ever formatted.
+    """
+
+    writer = csv.writer(f)
+    writer.writerow(OPPORTUNITY_FIELDS)
+
+    for opportunity in opportunities:
+        record = opportunity_record(table, opportunity)
+        writer.writerow([record[field] for field in OPPORTUNITY_FIELDS])
+        yield opportunity
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import json
+import os
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from site_table import SiteTable
+
+# Bump when the persisted layout changes so old cache files are ignored
+CACHE_FORMAT = 2
+
+# Site pairs kept in memory per provider before the least recently used are dropped
+DEFAULT_MAX_PAIRS = 1_000_000
+
+# Doubles per persisted pair: origin lat, lon, destination lat, lon, km
+PAIR_WIDTH = 5
+
+class PairCache:
+    """
+    Size-bounded LRU of distances between site ids (see site_table).
+
+    Keys pack (origin, destination) into one int. When more than
+    max_entries pairs are held, the least recently used are evicted.
+
+    Optionally backed by a file: load() reads distances saved by an
+    earlier run, keyed by coordinates since site ids are only stable
+    within a process, and save() writes them back with everything
+    computed since. Persisted distances are consulted on an LRU miss and
+    are bounded by max_entries too: save() keeps the most recently used.
+
+    The file is a one-line JSON header followed by the raw doubles of an
+    array('d'), PAIR_WIDTH per pair, so loading one cannot run code.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_PAIRS):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[int, float]' = OrderedDict()
+        self.persisted: 'OrderedDict[Tuple[float, float, float, float], float]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, origin: int, destination: int, sites: SiteTable) -> Optional[float]:
+        key = (origin << 32) | destination
+        distance = self.entries.get(key)
+        if distance is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return distance
+
+        if self.persisted:
+            coordinates = (*sites.location(origin), *sites.location(destination))
+            distance = self.persisted.get(coordinates)
+            if distance is not None:
+                self.persisted.move_to_end(coordinates)
+                self.put(origin, destination, distance)
+                self.hits += 1
+                return distance
+
+        self.misses += 1
+        return None
+
+    def put(self, origin: int, destination: int, distance: float) -> None:
+        entries = self.entries
+        entries[(origin << 32) | destination] = distance
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def load(self, path: str, provider_key: str) -> int:
+        """Read distances persisted for the same provider; returns how many were loaded."""
+
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if (header.get('format') != CACHE_FORMAT
+                        or header.get('byteorder') != sys.byteorder
+                        or header.get('provider') != provider_key):
+                    return 0
+
+                pairs = array('d')
+                pairs.fromfile(f, header['pairs'] * PAIR_WIDTH)
+        except (OSError, EOFError, ValueError, KeyError, TypeError, AttributeError):
+            return 0
+
+        # Pairs are saved least recently used first; keep the newest that fit
+        start = max(len(pairs) - self.max_entries * PAIR_WIDTH, 0)
+        for k in range(start, len(pairs), PAIR_WIDTH):
+            self.persisted[(pairs[k], pairs[k + 1], pairs[k + 2], pairs[k + 3])] = pairs[k + 4]
+        return (len(pairs) - start) // PAIR_WIDTH
+
+    def save(self, path: str, provider_key: str, sites: SiteTable) -> int:
+        """
+        Write the most recently used max_entries distances, persisted or
+        computed this run, to path (atomically); returns how many were written.
+        """
+
+        persisted = self.persisted
+        mask = (1 << 32) - 1
+        for key, distance in self.entries.items():
+            coordinates = (*sites.location(key >> 32), *sites.location(key & mask))
+            persisted[coordinates] = distance
+            persisted.move_to_end(coordinates)
+
+        while len(persisted) > self.max_entries:
+            persisted.popitem(last=False)
+
+        pairs = array('d')
+        for coordinates, distance in persisted.items():
+            pairs.extend(coordinates)
+            pairs.append(distance)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        header = {
+            'format': CACHE_FORMAT,
+            'byteorder': sys.byteorder,
+            'provider': provider_key,
+            'pairs': len(persisted)
+        }
+
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            pairs.tofile(f)
+        os.replace(temp_path, path)
+
+        return len(persisted)
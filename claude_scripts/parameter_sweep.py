@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from candidate_search import iter_predecessor_candidates
+from contract_table import ContractTable, load_contract_table
+
+def collect_candidate_pairs(table: ContractTable, max_allowance: int) -> List[Tuple[int, int, int, float]]:
+    """
+    Run the candidate search once at the largest allowance and keep every
+    (current, previous, days_gap, savings_km) pair. Every smaller allowance
+    and radius is a filter over this list.
+    """
+
+    pairs = []
+    for i, candidates in iter_predecessor_candidates(table, max_allowance):
+        depot_distance = table.distance_to_depot[i]
+        for j, days_gap, site_to_site_distance in candidates:
+            pairs.append((i, j, days_gap, depot_distance - site_to_site_distance))
+
+    return pairs
+
+def summarize_chains(best_prev: Dict[int, Tuple[float, int]], count: int) -> Dict:
+    """
+    Resolve next links the way build_contract_chains does (the first
+    claimant in start order takes a predecessor) and measure the chains.
+    """
+
+    next_of: Dict[int, int] = {}
+    for i in range(count):
+        if i in best_prev:
+            prev = best_prev[i][1]
+            if prev not in next_of:
+                next_of[prev] = i
+
+    chain_lengths = []
+    for i in range(count):
+        if i not in best_prev and i in next_of:
+            length, node = 1, i
+            while node in next_of:
+                node = next_of[node]
+                length += 1
+            chain_lengths.append(length)
+
+    return {
+        'chains': len(chain_lengths),
+        'longest_chain': max(chain_lengths, default=0),
+        'chained_contracts': len(best_prev),
+        'chain_savings_km': sum(round(savings, 1) for savings, _ in best_prev.values())
+    }
+
+def sweep_parameters(
+    allowances: Iterable[int] = range(0, 31),
+    radii: Iterable[Optional[float]] = (25, 50, 100, 200, None),
+    table: ContractTable = None
+) -> List[Dict]:
+    """
+    Savings curves for every (date_range_allowance, max_distance_from_depot)
+    setting from a single candidate search at the largest allowance.
+
+    A radius limits the analysis to contracts whose site is at most that far
+    from the depot; None means no limit. Each result has the opportunity
+    count and total savings equipment_site_to_site_optimization reports and
+    a summary of the chains build_contract_chains builds, called with the
+    same date_range_allowance and max_distance_from_depot.
+    """
+
+    if table is None:
+        table = load_contract_table()
+
+    allowances = sorted(set(allowances))
+    radii = list(radii)
+    pairs = collect_candidate_pairs(table, allowances[-1])
+
+    # Walk pairs by increasing day gap so each allowance extends the last one
+    pairs.sort(key=lambda pair: pair[2])
+
+    results = []
+    for radius in radii:
+        in_radius = [
+            pair for pair in pairs
+            if radius is None or table.distance_to_depot[pair[0]] <= radius
+        ]
+
+        opportunities = 0
+        total_savings = 0.0
+        best_prev: Dict[int, Tuple[float, int]] = {}
+        position = 0
+
+        for allowance in allowances:
+            while position < len(in_radius) and in_radius[position][2] <= allowance:
+                i, j, days_gap, savings = in_radius[position]
+                opportunities += 1
+                total_savings += round(savings, 1)
+
+                # Highest saving wins; ties go to the earliest-starting predecessor
+                best = best_prev.get(i)
+                if best is None or savings > best[0] or (savings == best[0] and j < best[1]):
+                    best_prev[i] = (savings, j)
+
+                position += 1
+
+            results.append({
+                'date_range_allowance': allowance,
+                'max_distance_from_depot': radius,
+                'opportunities': opportunities,
+                'total_savings_km': total_savings,
+                **summarize_chains(best_prev, len(table))
+            })
+
+    return results
+
+def main():
+    print("=== PARAMETER SWEEP: DATE ALLOWANCE x DEPOT RADIUS ===\n")
+
+    results = sweep_parameters()
+    radii = []
+    for result in results:
+        if result['max_distance_from_depot'] not in radii:
+            radii.append(result['max_distance_from_depot'])
+
+    by_setting = {
+        (result['date_range_allowance'], result['max_distance_from_depot']): result
+        for result in results
+    }
+    allowances = sorted({result['date_range_allowance'] for result in results})
+    radius_labels = [f"{radius}km" if radius is not None else "all" for radius in radii]
+
+    print("=== TOTAL SAVINGS (km) ===")
+    print(f"{'Days':<6}" + "".join(f"{label:>12}" for label in radius_labels))
+    print("-" * (6 + 12 * len(radii)))
+    for allowance in allowances:
+        row = "".join(f"{by_setting[(allowance, radius)]['total_savings_km']:>12.1f}" for radius in radii)
+        print(f"{allowance:<6}{row}")
+
+    print(f"\n=== OPPORTUNITIES ===")
+    print(f"{'Days':<6}" + "".join(f"{label:>12}" for label in radius_labels))
+    print("-" * (6 + 12 * len(radii)))
+    for allowance in allowances:
+        row = "".join(f"{by_setting[(allowance, radius)]['opportunities']:>12}" for radius in radii)
+        print(f"{allowance:<6}{row}")
+
+    print(f"\n=== CHAINS (radius: {radius_labels[-1]}) ===")
+    print(f"{'Days':<6} {'Chains':<8} {'Longest':<8} {'Chained':<8} {'Chain savings'}")
+    print("-" * 50)
+    for allowance in allowances:
+        result = by_setting[(allowance, radii[-1])]
+        print(f"{allowance:<6} {result['chains']:<8} {result['longest_chain']:<8} "
+              f"{result['chained_contracts']:<8} {result['chain_savings_km']:.1f} km")
+
+if __name__ == "__main__":
+    main()
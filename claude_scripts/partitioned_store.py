@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import os
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from extraction_pipeline import Sink
+from snapshot_cache import is_fresh, source_fingerprint
+from stream_contracts import iter_contracts
+
+# Bump when the partition layout changes so old stores are rebuilt
+STORE_FORMAT = 2
+
+# Partition for contracts with no usable raisedDate
+UNDATED = 'undated'
+
+# Subdirectory keeping each appended batch, replayed when the store is rebuilt
+APPENDED_DIR = 'appended'
+
+def parse_raised_date(raised_date: str) -> datetime:
+    """Parse a raisedDate the way the per-year scripts always have."""
+    return datetime.fromisoformat(raised_date.replace('Z', '+00:00'))
+
+class PartitionedStore:
+    """
+    Contracts partitioned by raisedDate year and month.
+
+    Each partition is a {contract_key: contract} JSON file under
+    store_dir/<year>/<year>-<month>.json, with a <year>-<month>.positions
+    sidecar holding each contract's position in the source (raw int64s) so
+    reads across partitions come back in source order. manifest.json
+    records for each partition only its contract count, min/max raisedDate
+    and min/max startDate, so it stays small however many contracts the
+    store holds. Contracts without a raisedDate
+    go to the 'undated' partition; ones whose raisedDate does not parse are
+    also listed under 'unparsed' with the error.
+
+    Per-year counts are manifest lookups, a time range only opens the
+    partitions it overlaps, and new data is appended to its own months.
+    Each appended batch is also kept under store_dir/appended/ and listed
+    in the manifest, so rebuilding from a changed source replays it.
+    """
+
+    def __init__(self, store_dir: str = 'data/partitions'):
+        self.store_dir = store_dir
+        self.manifest: Dict[str, Any] = {
+            'format': STORE_FORMAT,
+            'source': None,
+            'count': 0,
+            'partitions': {},
+            'unparsed': [],
+            'appended': []
+        }
+
+        manifest_path = os.path.join(store_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+
+    def __len__(self) -> int:
+        return self.manifest['count']
+
+    @property
+    def partitions(self) -> Dict[str, Dict]:
+        return self.manifest['partitions']
+
+    def _partition_path(self, name: str, extension: str = '.json') -> str:
+        if name == UNDATED:
+            return os.path.join(self.store_dir, f"{UNDATED}{extension}")
+        return os.path.join(self.store_dir, name[:4], f"{name}{extension}")
+
+    def _positions_path(self, name: str) -> str:
+        return self._partition_path(name, '.positions')
+
+    def _read_positions(self, name: str) -> array:
+        """Source positions of a partition's contracts, in file order."""
+        positions = array('q')
+        with open(self._positions_path(name), 'rb') as f:
+            positions.frombytes(f.read())
+        return positions
+
+    def _save_manifest(self) -> None:
+        temp_path = os.path.join(self.store_dir, f"manifest.json.tmp{os.getpid()}")
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(temp_path, os.path.join(self.store_dir, 'manifest.json'))
+
+    @classmethod
+    def build(cls, source_path: str = 'data/out.json', store_dir: str = 'data/partitions') -> 'PartitionedStore':
+        """
+        Partition a full export in one streaming pass, replacing any
+        existing store. Batches appended to the old store are replayed
+        after the source, and partition files the new store no longer
+        lists are removed.
+        """
+
+        appended = PartitionedStore(store_dir).manifest.get('appended', [])
+
+        store = cls.__new__(cls)
+        store.store_dir = store_dir
+        store.manifest = {
+            'format': STORE_FORMAT,
+            'source': source_fingerprint(source_path),
+            'count': 0,
+            'partitions': {},
+            'unparsed': [],
+            'appended': []
+        }
+
+        store._write(iter_contracts(source_path))
+        for batch in appended:
+            store._write(iter_contracts(store._batch_path(batch)), batch)
+
+        store._remove_unlisted_partitions()
+        return store
+
+    def append(self, contracts: Iterable[Tuple[str, Dict]]) -> None:
+        """
+        Add contracts after the existing ones. Months not yet in the store
+        become new partition files; months already present are rewritten
+        with the new contracts at the end. The batch itself is kept so a
+        rebuild can replay it.
+        """
+
+        appended = self.manifest.setdefault('appended', [])
+        batch = f"batch-{len(appended) + 1:04d}.json"
+        batch_path = self._batch_path(batch)
+        os.makedirs(os.path.dirname(batch_path), exist_ok=True)
+
+        sink = Sink(batch, f"{batch_path}.tmp{os.getpid()}")
+        sink.open()
+        try:
+            for contract_key, contract in contracts:
+                sink.write(contract_key, contract)
+        except BaseException:
+            sink.close()
+            os.remove(sink.output_path)
+            raise
+        sink.close()
+        os.replace(sink.output_path, batch_path)
+
+        try:
+            self._write(iter_contracts(batch_path), batch)
+        except BaseException:
+            os.remove(batch_path)
+            raise
+
+    def _batch_path(self, batch: str) -> str:
+        return os.path.join(self.store_dir, APPENDED_DIR, batch)
+
+    def _remove_unlisted_partitions(self) -> None:
+        """Delete partition files (and emptied year directories) the manifest does not list."""
+
+        listed = {
+            os.path.normpath(path)
+            for name in self.partitions
+            for path in (self._partition_path(name), self._positions_path(name))
+        }
+        for root, dirs, files in os.walk(self.store_dir, topdown=False):
+            if os.path.normpath(root) == os.path.normpath(os.path.join(self.store_dir, APPENDED_DIR)):
+                continue
+            for file_name in files:
+                path = os.path.normpath(os.path.join(root, file_name))
+                if file_name.endswith(('.json', '.positions')) and file_name != 'manifest.json' and path not in listed:
+                    os.remove(path)
+            if os.path.normpath(root) != os.path.normpath(self.store_dir) and not os.listdir(root):
+                os.rmdir(root)
+
+    def _write(self, contracts: Iterable[Tuple[str, Dict]], batch: Optional[str] = None) -> None:
+        os.makedirs(self.store_dir, exist_ok=True)
+
+        # Restored if writing fails, so the manifest keeps describing the files on disk
+        saved_manifest = json.loads(json.dumps(self.manifest))
+
+        partitions = self.partitions
+        sinks: Dict[str, Sink] = {}
+        positions: Dict[str, array] = {}
+        position = self.manifest['count']
+
+        def sink_for(name: str) -> Sink:
+            sink = sinks.get(name)
+            if sink is not None:
+                return sink
+
+            path = self._partition_path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            sink = sinks[name] = Sink(name, f"{path}.tmp{os.getpid()}")
+            sink.open()
+
+            # Carry an existing partition's contracts over before the new ones
+            if name in partitions:
+                for contract_key, contract in iter_contracts(path):
+                    sink.write(contract_key, contract)
+                positions[name] = self._read_positions(name)
+            else:
+                positions[name] = array('q')
+                partitions[name] = {
+                    'count': 0,
+                    'min_raised_date': None,
+                    'max_raised_date': None,
+                    'min_start_date': None,
+                    'max_start_date': None
+                }
+            return sink
+
+        try:
+            for contract_key, contract in contracts:
+                raised_date = contract.get('raisedDate')
+                name = UNDATED
+                if raised_date:
+                    try:
+                        raised = parse_raised_date(raised_date)
+                        name = f"{raised.year:04d}-{raised.month:02d}"
+                    except Exception as e:
+                        self.manifest['unparsed'].append([contract_key, raised_date, str(e)])
+
+                sink_for(name).write(contract_key, contract)
+
+                partition = partitions[name]
+                partition['count'] += 1
+                positions[name].append(position)
+                position += 1
+
+                if name != UNDATED:
+                    _widen(partition, 'raised_date', raised_date)
+                if contract.get('startDate'):
+                    _widen(partition, 'start_date', contract['startDate'])
+        except BaseException:
+            # Leave the existing partitions and manifest untouched
+            for sink in sinks.values():
+                sink.close()
+                os.remove(sink.output_path)
+            self.manifest = saved_manifest
+            raise
+
+        for name, sink in sinks.items():
+            sink.close()
+            positions_temp = f"{self._positions_path(name)}.tmp{os.getpid()}"
+            with open(positions_temp, 'wb') as f:
+                positions[name].tofile(f)
+            os.replace(sink.output_path, self._partition_path(name))
+            os.replace(positions_temp, self._positions_path(name))
+
+        self.manifest['count'] = position
+        if batch is not None:
+            self.manifest.setdefault('appended', []).append(batch)
+        self._save_manifest()
+
+    def year_counts(self) -> Counter:
+        """Contracts per raisedDate year, from the manifest alone."""
+        counts = Counter()
+        for name, partition in self.partitions.items():
+            if name != UNDATED:
+                counts[int(name[:4])] += partition['count']
+        return counts
+
+    def partitions_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """Partitions whose raisedDate span overlaps [start, end)."""
+
+        names = []
+        for name, partition in sorted(self.partitions.items()):
+            if name == UNDATED or not partition['count']:
+                continue
+            if start is not None and parse_raised_date(partition['max_raised_date']) < start:
+                continue
+            if end is not None and parse_raised_date(partition['min_raised_date']) >= end:
+                continue
+            names.append(name)
+        return names
+
+    def _merged(self, names: Iterable[str]) -> Iterator[Tuple[str, str, Dict]]:
+        """(partition, contract_key, contract) across partitions, in source order."""
+
+        def stream(name: str) -> Iterator[Tuple[int, str, str, Dict]]:
+            positions = self._read_positions(name)
+            for position, (contract_key, contract) in zip(positions, iter_contracts(self._partition_path(name))):
+                yield position, name, contract_key, contract
+
+        for _, name, contract_key, contract in heapq.merge(*(stream(name) for name in names), key=lambda entry: entry[0]):
+            yield name, contract_key, contract
+
+    def iter_partitions(self, names: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """Stream (contract_key, contract) from the given partitions in source order."""
+        for _, contract_key, contract in self._merged(names):
+            yield contract_key, contract
+
+    def iter_year(self, year: int) -> Iterator[Tuple[str, Dict]]:
+        """Contracts raised in a year, opening only that year's partitions."""
+        return self.iter_partitions(name for name in sorted(self.partitions) if name.startswith(f"{year:04d}-"))
+
+    def iter_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[Tuple[str, Dict]]:
+        """Contracts raised in [start, end) (timezone-aware bounds), in source order."""
+
+        names = self.partitions_between(start, end)
+
+        # Only partitions straddling a bound need their contracts checked
+        straddling = set()
+        for name in names:
+            partition = self.partitions[name]
+            if ((start is not None and parse_raised_date(partition['min_raised_date']) < start)
+                    or (end is not None and parse_raised_date(partition['max_raised_date']) >= end)):
+                straddling.add(name)
+
+        for name, contract_key, contract in self._merged(names):
+            if name in straddling:
+                raised = parse_raised_date(contract['raisedDate'])
+                if (start is not None and raised < start) or (end is not None and raised >= end):
+                    continue
+            yield contract_key, contract
+
+def _widen(partition: Dict, field: str, value: str) -> None:
+    """Extend a partition's min/max for a date field (compared as instants)."""
+    lowest, highest = partition[f"min_{field}"], partition[f"max_{field}"]
+    try:
+        moment = parse_raised_date(value)
+        if lowest is None or moment < parse_raised_date(lowest):
+            partition[f"min_{field}"] = value
+        if highest is None or moment > parse_raised_date(highest):
+            partition[f"max_{field}"] = value
+    except (ValueError, TypeError):
+        pass
+
+def extract_contracts_for_year(year: int, store: Optional[PartitionedStore] = None) -> Dict[str, Dict]:
+    """All contracts raised in a year, in source order, read from that year's partitions only."""
+
+    if store is None:
+        store = load_partitioned_store()
+
+    for contract_key, raised_date, error in store.manifest['unparsed']:
+        print(f"Could not parse date for contract {contract_key}: {raised_date} - {error}")
+
+    return dict(store.iter_year(year))
+
+def load_partitioned_store(source_path: str = 'data/out.json', store_dir: str = 'data/partitions') -> PartitionedStore:
+    """
+    Open the store for a source export, (re)building it in one pass when it
+    is missing, from an older layout, or built from a different version of
+    the source file.
+    """
+
+    store = PartitionedStore(store_dir)
+    source = store.manifest.get('source')
+    if store.manifest.get('format') != STORE_FORMAT or not source or not is_fresh(source, source_path):
+        store = PartitionedStore.build(source_path, store_dir)
+    return store
+
+def main():
+    print("=== DATE-PARTITIONED CONTRACT STORE ===\n")
+
+    store = load_partitioned_store()
+
+    print(f"Contracts: {len(store)} in {len(store.partitions)} partitions ({store.store_dir})")
+    print(f"\n{'Partition':<10} {'Count':<8} {'First raised':<22} {'Last raised'}")
+    print("-" * 60)
+    for name, partition in sorted(store.partitions.items()):
+        print(f"{name:<10} {partition['count']:<8} {partition['min_raised_date'] or '-':<22} {partition['max_raised_date'] or '-'}")
+
+    if store.manifest['unparsed']:
+        print(f"\nUnparseable raisedDate values: {len(store.manifest['unparsed'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import heapq
+from typing import Any, List, Tuple
+
+class TopK:
+    """
+    The k items with the largest keys among everything pushed, in O(k)
+    memory: a min-heap whose root is the weakest item kept.
+
+    Equal keys rank by push order (earliest first), so items() matches a
+    stable sort on the key, descending, cut to k.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.heap: List[Tuple[Any, int, Any]] = []
+        self.pushed = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, key: Any, item: Any) -> None:
+        # -pushed makes a later item with an equal key compare as weaker
+        entry = (key, -self.pushed, item)
+        self.pushed += 1
+
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif self.k and entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self) -> List[Any]:
+        """Items kept, largest key first."""
+        return [item for _, _, item in sorted(self.heap, key=lambda entry: entry[:2], reverse=True)]
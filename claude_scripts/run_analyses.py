@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import analyze_coordinates
+import analyze_equipment_groups
+import analyze_postcodes
+import analyze_site_address_states
+import contract_chains
+import contracts_per_year
+import equipment_optimization
+import find_victoria_depots
+import fleet_simulation
+import multiple_equipment_options
+from distance_engine import DistanceProvider, add_distance_arguments, provider_from_arguments
+from snapshot_cache import loaded_sources
+
+# Analyses in the order they run, whatever order they are asked for in:
+# later ones read files written by earlier ones (opportunities writes the
+# Victoria VMS extract that depots, options and chains read). Each is
+# called with the shared distance provider and the candidate search's
+# worker process count.
+ANALYSES: List[Tuple[str, str, Callable[[Optional[DistanceProvider], int], None]]] = [
+    ('years', 'Contracts per raisedDate year', lambda provider, workers: contracts_per_year.main()),
+    ('coords', 'Coordinate coverage of 2023 contracts', lambda provider, workers: analyze_coordinates.main()),
+    ('postcodes', 'Site postcodes of 2023 contracts', lambda provider, workers: analyze_postcodes.main()),
+    ('states', 'Site address states of 2023 contracts', lambda provider, workers: analyze_site_address_states.main()),
+    ('groups', 'Equipment groups of 2023 contracts', lambda provider, workers: analyze_equipment_groups.main()),
+    ('opportunities', 'Site-to-site optimization opportunities', equipment_optimization.main),
+    ('depots', 'Depots serving Victorian VMS contracts', lambda provider, workers: find_victoria_depots.main()),
+    ('options', 'Contracts with several equipment options', multiple_equipment_options.main),
+    ('chains', 'Contract chains', contract_chains.main),
+    ('fleet', 'Fleet simulation of individual units', lambda provider, workers: fleet_simulation.main(provider))
+]
+
+def run_analyses(names: List[str], provider: Optional[DistanceProvider] = None, workers: int = 1) -> List[Dict]:
+    """
+    Run the named analyses in one process, so each dataset is parsed once
+    (load_json_cached and load_contract_table share what they load) and
+    the distance-based analyses share one provider and pair cache.
+    workers > 1 shares their candidate searches across processes.
+
+    Returns one {'name', 'seconds', 'error'} record per stage; a failing
+    stage is reported and the remaining ones still run.
+    """
+
+    stages = []
+    for name, title, run in ANALYSES:
+        if name not in names:
+            continue
+
+        print(f"\n##### {name}: {title} #####\n")
+        started = time.perf_counter()
+        error = None
+        try:
+            run(provider, workers)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"\n{name} failed - {error}")
+        stages.append({'name': name, 'seconds': time.perf_counter() - started, 'error': error})
+
+    if provider is not None:
+        provider.save_cache()
+
+    return stages
+
+def main():
+    names = [name for name, _, _ in ANALYSES]
+
+    parser = argparse.ArgumentParser(
+        description='Run several contract analyses in one process, loading each dataset once.',
+        epilog='Analyses: ' + ', '.join(f"{name} ({title.lower()})" for name, title, _ in ANALYSES)
+    )
+    parser.add_argument('analyses', nargs='+', choices=names + ['all'], metavar='analysis',
+                        help="analyses to run, or 'all'")
+    add_distance_arguments(parser)
+    args = parser.parse_args()
+
+    selected = names if 'all' in args.analyses else args.analyses
+    provider = provider_from_arguments(args)
+
+    started = time.perf_counter()
+    stages = run_analyses(selected, provider, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print("\n=== STAGE TIMINGS ===")
+    print(f"{'Analysis':<15} {'Seconds':<10} {'Status'}")
+    print("-" * 40)
+    for stage in stages:
+        print(f"{stage['name']:<15} {stage['seconds']:<10.2f} {'failed' if stage['error'] else 'ok'}")
+    print(f"{'Total':<15} {elapsed:.2f}")
+
+    print(f"\nDatasets loaded (once each): {', '.join(loaded_sources()) or 'none'}")
+
+    if any(stage['error'] for stage in stages):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
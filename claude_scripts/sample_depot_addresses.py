@@ -1,15 +1,14 @@
 #!/usr/bin/env python3
 import json
 
-def get_depot_address_samples():
-    with open('data/out.json', 'r') as f:
-        data = json.load(f)
+from stream_contracts import iter_contracts
 
+def get_depot_address_samples():
     depot_addresses = []
     contract_keys = []
 
     # Get first 3 contracts that have depot addresses
-    for contract_key, contract in data.items():
+    for contract_key, contract in iter_contracts('data/out.json'):
         if 'depot' in contract and contract['depot'] and 'address' in contract['depot']:
             depot_addresses.append(contract['depot']['address'])
             contract_keys.append(contract_key)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+class SiteTable:
+    """
+    Distinct sites interned to small integer ids.
+
+    A site is a siteAddress name plus its coordinates; every contract at
+    the same site shares one id, so per-site work (such as site-pair
+    distances) is keyed by the id instead of being repeated per contract.
+    Ids are handed out in first-seen order and never reused.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.latitudes = array('d')
+        self.longitudes = array('d')
+        self.index: Dict[Tuple[str, float, float], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str, lat: float, lon: float) -> int:
+        key = (name, lat, lon)
+        site_id = self.index.get(key)
+        if site_id is None:
+            site_id = self.index[key] = len(self.names)
+            self.names.append(name)
+            self.latitudes.append(lat)
+            self.longitudes.append(lon)
+        return site_id
+
+    def intern_columns(self, names: Sequence[str], latitudes: Sequence[float], longitudes: Sequence[float]) -> array:
+        """Site id of every row of parallel name/latitude/longitude columns."""
+        intern = self.intern
+        return array('i', (intern(name, lat, lon) for name, lat, lon in zip(names, latitudes, longitudes)))
+
+    def location(self, site_id: int) -> Tuple[float, float]:
+        return self.latitudes[site_id], self.longitudes[site_id]
+
+# One table per process, so site ids (and the distance caches keyed by
+# them) agree across every dataset and analysis loaded in it
+_shared_sites = SiteTable()
+
+def shared_site_table() -> SiteTable:
+    return _shared_sites
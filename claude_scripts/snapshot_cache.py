@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+SNAPSHOT_MAGIC = b'FEITSNAP'
+SNAPSHOT_VERSION = 2
+
+# Sources already loaded in this process: path -> ((size, mtime_ns), data)
+_loaded_json: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+def file_hash(path: str) -> str:
+    """BLAKE2 digest of a file's contents, read in 1 MB chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(path: str) -> Dict[str, Any]:
+    """Size, mtime and content hash identifying one version of a source file."""
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': file_hash(path)
+    }
+
+def is_fresh(fingerprint: Dict[str, Any], path: str) -> bool:
+    """
+    Check whether a stored fingerprint still describes the source file.
+    Size and mtime are checked first; the hash is only recomputed when the
+    size matches but the mtime moved (e.g. the file was touched or copied).
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+
+    if stat.st_size != fingerprint.get('size'):
+        return False
+    if stat.st_mtime_ns == fingerprint.get('mtime_ns'):
+        return True
+    return file_hash(path) == fingerprint.get('hash')
+
+def write_snapshot(
+    snapshot_path: str,
+    source_path: str,
+    params: Dict[str, Any],
+    arrays: Dict[str, array] = None,
+    strings: Dict[str, List[str]] = None,
+    payload: Any = None,
+    fingerprint: Dict[str, Any] = None
+) -> bool:
+    """
+    Write a binary snapshot next to its source file.
+
+    Layout: magic, 8-byte header length, JSON header (source fingerprint,
+    params and section offsets), then the raw sections. Numeric columns are
+    stored as native array bytes, string columns as NUL-separated UTF-8 and
+    an optional JSON-serializable payload as compact JSON (never a pickle,
+    so reading a snapshot cannot run code).
+
+    Pass the fingerprint taken before reading the source so a file that
+    changes mid-load is never recorded as fresh.
+
+    Returns False if the snapshot could not be written (e.g. read-only
+    directory, or values a snapshot cannot hold such as a None in a string
+    column); callers simply carry on without a cache.
+    """
+
+    sections: List[bytes] = []
+    header: Dict[str, Any] = {
+        'version': SNAPSHOT_VERSION,
+        'byteorder': sys.byteorder,
+        'source': fingerprint or source_fingerprint(source_path),
+        'params': params,
+        'arrays': {},
+        'strings': {},
+        'payload': None
+    }
+    offset = 0
+
+    def add_section(data: bytes) -> Tuple[int, int]:
+        nonlocal offset
+        sections.append(data)
+        start = offset
+        offset += len(data)
+        return start, len(data)
+
+    temp_path = f"{snapshot_path}.tmp{os.getpid()}"
+
+    try:
+        for name, column in (arrays or {}).items():
+            header['arrays'][name] = [column.typecode, *add_section(column.tobytes())]
+
+        for name, values in (strings or {}).items():
+            blob = '\0'.join(values)
+            if blob.count('\0') != max(len(values) - 1, 0):
+                raise ValueError(f"string column {name} contains NUL characters")
+            header['strings'][name] = [len(values), *add_section(blob.encode('utf-8'))]
+
+        if payload is not None:
+            header['payload'] = list(add_section(json.dumps(payload, separators=(',', ':')).encode('utf-8')))
+
+        header_bytes = json.dumps(header).encode('utf-8')
+
+        with open(temp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack('<Q', len(header_bytes)))
+            f.write(header_bytes)
+            for data in sections:
+                f.write(data)
+        os.replace(temp_path, snapshot_path)
+    except (OSError, TypeError, ValueError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+    return True
+
+def read_snapshot(snapshot_path: str, source_path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Memory-map a snapshot and return its sections if it is fresh for the
+    source file and was built with the same params, otherwise None.
+
+    The result has 'arrays' (name -> array), 'strings' (name -> list of str)
+    and 'payload' (decoded JSON or None).
+    """
+
+    try:
+        with open(snapshot_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+
+            header_start = len(SNAPSHOT_MAGIC) + 8
+            (header_length,) = struct.unpack('<Q', mm[len(SNAPSHOT_MAGIC):header_start])
+            header = json.loads(mm[header_start:header_start + header_length])
+
+            if (header.get('version') != SNAPSHOT_VERSION
+                    or header.get('byteorder') != sys.byteorder
+                    or header.get('params') != params
+                    or not is_fresh(header.get('source', {}), source_path)):
+                return None
+
+            base = header_start + header_length
+            result: Dict[str, Any] = {'arrays': {}, 'strings': {}, 'payload': None}
+
+            for name, (typecode, start, length) in header['arrays'].items():
+                column = array(typecode)
+                column.frombytes(mm[base + start:base + start + length])
+                result['arrays'][name] = column
+
+            for name, (count, start, length) in header['strings'].items():
+                blob = mm[base + start:base + start + length].decode('utf-8')
+                values = blob.split('\0') if count else []
+                if len(values) != count:
+                    return None
+                result['strings'][name] = values
+
+            if header['payload'] is not None:
+                start, length = header['payload']
+                result['payload'] = json.loads(mm[base + start:base + start + length])
+
+            return result
+
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+def load_json_cached(path: str) -> Any:
+    """
+    json.load a source file once per process: the same object is returned
+    to every caller (treat it as read-only) until the file's size or mtime
+    changes.
+
+    Sources are not snapshotted themselves; the columns analyses actually
+    read are (see ContractTable, EquipmentIndex and JobRequestTable).
+    """
+
+    stat = os.stat(path)
+    version = (stat.st_size, stat.st_mtime_ns)
+    loaded = _loaded_json.get(path)
+    if loaded is not None and loaded[0] == version:
+        return loaded[1]
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    _loaded_json[path] = (version, data)
+    return data
+
+def loaded_sources() -> List[str]:
+    """Paths load_json_cached has loaded in this process, in load order."""
+    return list(_loaded_json)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from contract_index import EndDateIndex
+
+# Flat-plane projection used by every site-to-site analysis (rough for Victoria)
+KM_PER_DEGREE_LAT = 111
+KM_PER_DEGREE_LON = 85
+
+def euclidean_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate Euclidean distance between two points in kilometers."""
+    lat_diff = (lat2 - lat1) * KM_PER_DEGREE_LAT
+    lon_diff = (lon2 - lon1) * KM_PER_DEGREE_LON
+    return math.sqrt(lat_diff**2 + lon_diff**2)
+
+class SiteGrid:
+    """
+    Uniform grid over site coordinates on the 111/85 km-per-degree plane.
+
+    Each occupied cell keeps an EndDateIndex of its contracts, so a query
+    for "contracts within r km that ended inside this window" only touches
+    cells that overlap the search circle and only the contracts in those
+    cells whose end date falls in the window.
+
+    add() and remove() keep the grid current as contracts arrive or change.
+    """
+
+    def __init__(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        end_dates: Sequence[Any],
+        cell_km: float = 10.0
+    ):
+        self.cell_km = cell_km
+
+        members: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for position, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+            members[self._cell(lat, lon)].append(position)
+
+        # cell -> (positions in the cell, end-date index over those positions)
+        self.cells: Dict[Tuple[int, int], Tuple[List[int], EndDateIndex]] = {}
+        for cell, positions in members.items():
+            cell_ends = [end_dates[position] for position in positions]
+            self.cells[cell] = (positions, EndDateIndex(cell_ends))
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (
+            math.floor(lat * KM_PER_DEGREE_LAT / self.cell_km),
+            math.floor(lon * KM_PER_DEGREE_LON / self.cell_km)
+        )
+
+    def add(self, position: int, lat: float, lon: float, end_date: Any) -> None:
+        cell = self._cell(lat, lon)
+        if cell not in self.cells:
+            self.cells[cell] = ([], EndDateIndex([]))
+
+        positions, end_index = self.cells[cell]
+        positions.append(position)
+        end_index.insert(len(positions) - 1, end_date)
+
+    def remove(self, position: int, lat: float, lon: float, end_date: Any) -> bool:
+        """
+        Drop a position added with these coordinates and end date; False if
+        it is not in the grid. Its slot in the cell is left unindexed rather
+        than shifting the cell's other entries.
+        """
+        cell = self.cells.get(self._cell(lat, lon))
+        if cell is None:
+            return False
+
+        positions, end_index = cell
+        return any(end_index.remove(k, end_date) for k, member in enumerate(positions) if member == position)
+
+    def _cell_min_distance(self, cell: Tuple[int, int], y: float, x: float) -> float:
+        """Smallest possible distance (km) from point (y, x) to anything in a cell."""
+        row, col = cell
+        dy = max(row * self.cell_km - y, 0.0, y - (row + 1) * self.cell_km)
+        dx = max(col * self.cell_km - x, 0.0, x - (col + 1) * self.cell_km)
+        return math.sqrt(dy**2 + dx**2)
+
+    def query(self, lat: float, lon: float, radius_km: float, after: Any, until: Any) -> List[int]:
+        """
+        Return positions of sites that may lie within radius_km of (lat, lon)
+        and whose end date satisfies after < end_date <= until.
+
+        The result is a superset of the sites strictly inside the radius
+        (whole cells are returned), in ascending position order.
+        """
+        y = lat * KM_PER_DEGREE_LAT
+        x = lon * KM_PER_DEGREE_LON
+        row, col = self._cell(lat, lon)
+        reach = int(math.ceil(radius_km / self.cell_km))
+
+        # Walk whichever is smaller: the cells covering the circle or the occupied cells
+        box_cells = (2 * reach + 1) ** 2
+        if box_cells <= len(self.cells):
+            candidate_cells = [
+                (r, c)
+                for r in range(row - reach, row + reach + 1)
+                for c in range(col - reach, col + reach + 1)
+                if (r, c) in self.cells
+            ]
+        else:
+            candidate_cells = [
+                cell for cell in self.cells
+                if abs(cell[0] - row) <= reach and abs(cell[1] - col) <= reach
+            ]
+
+        found = []
+        for cell in candidate_cells:
+            # Small tolerance so float rounding never drops a site on the boundary
+            if self._cell_min_distance(cell, y, x) > radius_km + 1e-6:
+                continue
+
+            positions, end_index = self.cells[cell]
+            found.extend(positions[k] for k in end_index.ended_between(after, until))
+
+        found.sort()
+        return found
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+import json
+import re
+from typing import Any, Iterator, Tuple
+
+WHITESPACE = re.compile(r'\s*')
+
+# Characters that can continue a JSON number (fraction, exponent and their signs)
+NUMBER_TAIL = re.compile(r'[0-9+\-.eE]*')
+
+class _Buffer:
+    """Sliding text window over a file, refilled in fixed-size chunks."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Drop consumed text and append the next chunk. False at end of file."""
+        if self.eof:
+            return False
+
+        chunk = self.f.read(self.chunk_size)
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+        return bool(chunk)
+
+    def skip_whitespace(self) -> None:
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.text[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {self.peek()!r}")
+        self.pos += 1
+
+    def decode(self, decoder: json.JSONDecoder) -> Any:
+        """
+        Decode the next complete JSON value, pulling in more chunks until it
+        fits. A value that ends exactly at the buffer edge is re-read after
+        the next chunk, and so is a number followed only by characters that
+        could continue it (a chunk ending after "-1." or "12e" decodes as a
+        shorter number), so numbers and literals are never cut short.
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+                if self.eof or (end < len(self.text) and not self._number_may_continue(value, end)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            self.fill()
+
+    def _number_may_continue(self, value: Any, end: int) -> bool:
+        """Whether a decoded number could extend past the buffered text after it."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return NUMBER_TAIL.match(self.text, end).end() == len(self.text)
+
+def iter_contracts(path: str = 'data/out.json', chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream (contract_key, contract) pairs from a top-level JSON object
+    without loading the whole document.
+
+    Only one contract (plus one read chunk) is held in memory at a time, so
+    consumers that stop early (e.g. after a few samples) only read as much
+    of the file as they actually need.
+    """
+
+    decoder = json.JSONDecoder()
+
+    with open(path, 'r') as f:
+        buffer = _Buffer(f, chunk_size)
+        buffer.expect('{')
+
+        if buffer.peek() == '}':
+            return
+
+        while True:
+            key = buffer.decode(decoder)
+            buffer.expect(':')
+            yield key, buffer.decode(decoder)
+
+            separator = buffer.peek()
+            buffer.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' in JSON stream, found {separator!r}")
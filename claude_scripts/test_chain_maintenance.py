@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import copy
+import json
+import logging
+import random
+
+import pytest
+
+from chain_maintenance import ChainMaintainer, load_chains, repair_log_tail
+from conftest import VICTORIA_PATH, synthetic_contracts, write_export
+from contract_chains import CHAIN_LOG_PATH, CHAINS_PATH, build_contract_chains, create_modified_json
+from contract_table import MICROSECONDS_PER_DAY, format_timestamp, parse_timestamp
+
+def build_chains_file(contracts):
+    """Write contracts as the Victoria export and chain them with a full build."""
+    write_export(VICTORIA_PATH, contracts)
+    contract_chains = build_contract_chains()
+    create_modified_json(contract_chains)
+    return contract_chains
+
+def shifted(date: str, rng: random.Random, days: int) -> str:
+    moment = parse_timestamp(date) + rng.randint(-days, days) * MICROSECONDS_PER_DAY + rng.randint(0, MICROSECONDS_PER_DAY)
+    return format_timestamp(moment, '%Y-%m-%dT%H:%M:%SZ')
+
+def apply_random_changes(maintainer, contracts, held, rng, count):
+    """Add the held contracts and make count random amendments, mirroring each in contracts."""
+
+    for key in held:
+        maintainer.add_contract(key, held[key])
+        contracts[key] = held[key]
+
+    keys = list(contracts)
+    for _ in range(count):
+        key = rng.choice(keys)
+        contract = copy.deepcopy(contracts[key])
+        roll = rng.random()
+
+        if roll < 0.3:
+            end_date = shifted(contract['plannedEndDate'], rng, 5)
+            maintainer.close_contract(key, end_date)
+            contract['actualEndDate'] = end_date
+        elif roll < 0.6:
+            contract['startDate'] = shifted(contract['startDate'], rng, 3)
+            maintainer.amend_contract(key, contract)
+        elif roll < 0.85:
+            contract['siteAddress'] = dict(contracts[rng.choice(keys)]['siteAddress'])
+            maintainer.amend_contract(key, contract)
+        else:
+            contract['siteAddress'] = dict(contract['siteAddress'], latitude=None)
+            maintainer.amend_contract(key, contract)
+
+        contracts[key] = contract
+
+@pytest.mark.parametrize('seed', range(6))
+def test_incremental_chains_match_a_full_rebuild(workdir, seed):
+    rng = random.Random(seed)
+    contracts = synthetic_contracts(seed, count=300)
+    held = {key: contracts.pop(key) for key in rng.sample(list(contracts), 30)}
+    build_chains_file(contracts)
+
+    maintainer = ChainMaintainer.load()
+    apply_random_changes(maintainer, contracts, held, rng, count=60)
+    replayed = load_chains()
+
+    # The same contracts in the maintainer's export order, chained from scratch
+    final = {key: contracts[key] for key in sorted(contracts, key=maintainer.export_order.__getitem__)}
+    expected = build_chains_file(final)
+
+    assert maintainer.contracts_list() == expected
+    with open(CHAINS_PATH) as f:
+        assert replayed == json.load(f)
+
+def test_repair_log_tail(tmp_path):
+    log_path = str(tmp_path / 'deltas.jsonl')
+    complete = b'{"contract_key": "A", "removed": true}\n{"contract_key": "B", "removed": true}\n'
+
+    repair_log_tail(log_path)  # No log yet: nothing to do
+
+    with open(log_path, 'wb') as f:
+        f.write(complete + b'{"contract_key": "C", "prev_con')
+    repair_log_tail(log_path)
+    with open(log_path, 'rb') as f:
+        assert f.read() == complete
+
+    # A last line that parses only lost its newline, and was already replayed
+    with open(log_path, 'wb') as f:
+        f.write(complete[:-1])
+    repair_log_tail(log_path)
+    with open(log_path, 'rb') as f:
+        assert f.read() == complete
+
+    repair_log_tail(log_path)
+    with open(log_path, 'rb') as f:
+        assert f.read() == complete
+
+def test_a_torn_log_replays_up_to_the_tear_and_recovers(workdir, caplog):
+    rng = random.Random(22)
+    contracts = synthetic_contracts(22, count=200)
+    held = {key: contracts.pop(key) for key in rng.sample(list(contracts), 20)}
+    build_chains_file(contracts)
+
+    maintainer = ChainMaintainer.load()
+    first = dict(list(held.items())[:10])
+    apply_random_changes(maintainer, contracts, first, rng, count=0)
+    before_crash = copy.deepcopy(load_chains())
+
+    # A crash mid-append leaves half a delta line
+    with open(CHAIN_LOG_PATH, 'a') as f:
+        f.write('{"contract_key": "C9999", "prev_con')
+
+    with caplog.at_level(logging.WARNING, logger='chain_maintenance'):
+        assert load_chains() == before_crash
+    assert 'unreadable line' in caplog.text
+
+    maintainer = ChainMaintainer.load()
+    rest = dict(list(held.items())[10:])
+    apply_random_changes(maintainer, contracts, rest, rng, count=20)
+
+    with open(CHAIN_LOG_PATH) as f:
+        assert all(json.loads(line) for line in f)
+
+    replayed = load_chains()
+    assert set(replayed) == set(maintainer.records)
+    for key, record in maintainer.records.items():
+        assert replayed[key]['prev_contract'] == record['prev_contract']
+        assert replayed[key]['next_contract'] == record['next_contract']
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import random
+
+import pytest
+
+from chain_matching import auction_assignment, sparse_assignment
+
+optimize = pytest.importorskip('scipy.optimize')
+np = pytest.importorskip('numpy')
+
+def random_instances(count: int, seed: int = 9):
+    """(edges, num_objects) with small integer weights, so ties are common."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        num_people, num_objects = rng.randint(1, 25), rng.randint(1, 25)
+        max_weight = rng.choice([3, 50, 100000])
+        edges = [
+            [(k, rng.randint(1, max_weight)) for k in rng.sample(range(num_objects), rng.randint(0, min(num_objects, 6)))]
+            for _ in range(num_people)
+        ]
+        yield edges, num_objects
+
+def optimum(edges, num_objects: int) -> int:
+    """Best total weight by a dense assignment with a zero-weight depot column per person."""
+    num_people = len(edges)
+    weights = np.full((num_people, num_objects + num_people), -1e12)
+    for i, person_edges in enumerate(edges):
+        weights[i, num_objects + i] = 0
+        for k, weight in person_edges:
+            weights[i, k] = weight
+    rows, cols = optimize.linear_sum_assignment(weights, maximize=True)
+    return int(round(weights[rows, cols].sum()))
+
+def matched_total(edges, assignment) -> int:
+    """Total weight of an assignment, checking every pick is an edge and no object is taken twice."""
+    assert len(assignment) == len(edges)
+    taken = [k for k in assignment if k != -1]
+    assert len(taken) == len(set(taken))
+    return sum(dict(edges[i])[k] for i, k in enumerate(assignment) if k != -1)
+
+@pytest.mark.parametrize('solve', [auction_assignment, sparse_assignment])
+def test_assignments_are_optimal(solve):
+    for edges, num_objects in random_instances(300):
+        assert matched_total(edges, solve(edges, num_objects)) == optimum(edges, num_objects), edges
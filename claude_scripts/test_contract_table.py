@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+from conftest import VICTORIA_PATH, synthetic_contracts, write_export
+from contract_table import ContractTable, load_contract_table
+
+def test_null_site_names_survive_the_snapshot(workdir):
+    contracts = synthetic_contracts(seed=5, count=40)
+    for key in ('C0003', 'C0017'):
+        contracts[key]['siteAddress']['name'] = None
+    contracts['C0021']['siteAddress']['name'] = ''
+    write_export(VICTORIA_PATH, contracts)
+
+    built = load_contract_table(VICTORIA_PATH)
+    names = dict(zip(built.keys, built.site_names))
+    assert names['C0003'] is None and names['C0017'] is None
+    assert names['C0021'] == ''
+
+    loaded = ContractTable.from_snapshot(VICTORIA_PATH)
+    assert loaded is not None
+    assert loaded.keys == built.keys
+    assert loaded.site_names == built.site_names
+    assert list(loaded.site_ids) == list(built.site_ids)
+
+def test_tables_follow_the_data_they_are_given(workdir):
+    first, second = synthetic_contracts(seed=1, count=30), synthetic_contracts(seed=2, count=20)
+
+    assert load_contract_table(VICTORIA_PATH, data=first).keys == ContractTable.from_contracts(first).keys
+    assert len(load_contract_table(VICTORIA_PATH, data=second)) == 20
+
+    write_export(VICTORIA_PATH, first)
+    assert len(load_contract_table(VICTORIA_PATH)) == 30
+    assert load_contract_table(VICTORIA_PATH) is load_contract_table(VICTORIA_PATH)
+
+def test_a_changed_source_is_reloaded(workdir):
+    write_export(VICTORIA_PATH, synthetic_contracts(seed=1, count=30))
+    assert len(load_contract_table(VICTORIA_PATH)) == 30
+
+    write_export(VICTORIA_PATH, synthetic_contracts(seed=1, count=45))
+    assert len(load_contract_table(VICTORIA_PATH)) == 45
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+import random
+
+from conftest import VICTORIA_PATH, synthetic_contracts, write_export
+from fleet_simulation import hire_quantities, simulate_fleet
+
+def hire_line(code: str, quantity) -> dict:
+    line = {'category': {'code': code, 'name': code, 'isHire': True, 'equipmentGroup': {'id': 1, 'name': 'VMS'}}}
+    if quantity is not ...:
+        line['quantity'] = quantity
+    return line
+
+def test_quantities_are_whole_units():
+    contract = {'hireContractLines': [
+        hire_line('A', 2), hire_line('A', 2.0), hire_line('A', '3'), hire_line('A', ' 1.0 '),
+        hire_line('B', ...), hire_line('B', None),
+        hire_line('C', 0), hire_line('C', -2), hire_line('C', 'two'), hire_line('C', float('nan'))
+    ]}
+
+    assert hire_quantities(contract) == {('A', 'A', 'VMS'): 8, ('B', 'B', 'VMS'): 2}
+
+def test_simulation_accepts_float_and_string_quantities(workdir):
+    rng = random.Random(21)
+    contracts = synthetic_contracts(seed=21, count=120)
+    for contract in contracts.values():
+        contract['hireContractLines'] = [hire_line(rng.choice('ABC'), rng.choice([1, 2.0, '3', '2.0', None, 0]))]
+    write_export(VICTORIA_PATH, contracts)
+
+    simulator, result = simulate_fleet(VICTORIA_PATH)
+
+    dispatched = sum(stats['units_dispatched'] for stats in result['categories'])
+    assert dispatched == sum(sum(hire_quantities(contracts[key]).values()) for key in simulator.table.keys)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+from pair_cache import PairCache
+from site_table import SiteTable
+
+def make_sites(count: int) -> SiteTable:
+    sites = SiteTable()
+    for k in range(count):
+        sites.intern(f"site {k}", -37.0 - k / 100, 145.0 + k / 100)
+    return sites
+
+def test_saved_distances_reload_for_the_same_provider(tmp_path):
+    path = str(tmp_path / 'pairs.bin')
+    sites = make_sites(3)
+
+    cache = PairCache()
+    cache.put(0, 1, 12.5)
+    cache.put(2, 0, 3.25)
+    assert cache.save(path, 'flat', sites) == 2
+
+    reloaded = PairCache()
+    assert reloaded.load(path, 'flat') == 2
+    assert reloaded.get(0, 1, sites) == 12.5
+    assert reloaded.get(2, 0, sites) == 3.25
+    assert reloaded.get(1, 2, sites) is None
+
+    assert PairCache().load(path, 'haversine') == 0
+
+def test_unreadable_files_are_ignored(tmp_path):
+    path = tmp_path / 'pairs.bin'
+
+    for content in (b'', b'not json\n', b'{"format": 2}\n', b'\x80\x04\x95 pickle'):
+        path.write_bytes(content)
+        assert PairCache().load(str(path), 'flat') == 0
+
+def test_persisted_pairs_stay_within_max_entries(tmp_path):
+    path = str(tmp_path / 'pairs.bin')
+    sites = make_sites(10)
+
+    for origin in range(9):
+        cache = PairCache(max_entries=4)
+        cache.load(path, 'flat')
+        cache.put(origin, origin + 1, float(origin))
+        assert cache.save(path, 'flat', sites) == min(origin + 1, 4)
+        assert len(cache.persisted) <= 4
+
+    # The most recently saved pairs are the ones kept
+    cache = PairCache(max_entries=4)
+    assert cache.load(path, 'flat') == 4
+    assert [cache.get(origin, origin + 1, sites) for origin in range(9)] == [None] * 5 + [5.0, 6.0, 7.0, 8.0]
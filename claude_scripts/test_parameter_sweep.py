@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+import contextlib
+import io
+
+from conftest import VICTORIA_PATH, synthetic_contracts, write_export
+from contract_chains import build_contract_chains, find_chain_lengths
+from equipment_optimization import equipment_site_to_site_optimization
+from parameter_sweep import sweep_parameters
+
+def test_sweep_matches_direct_runs_with_the_same_settings(workdir):
+    write_export(VICTORIA_PATH, synthetic_contracts(seed=8))
+
+    for result in sweep_parameters(allowances=[0, 3, 10], radii=(25, 60, None)):
+        allowance, radius = result['date_range_allowance'], result['max_distance_from_depot']
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            opportunities = equipment_site_to_site_optimization(allowance, radius)
+        assert result['opportunities'] == len(opportunities)
+        assert round(result['total_savings_km'], 1) == round(sum(o['potential_savings_km'] for o in opportunities), 1)
+
+        chains = build_contract_chains(allowance, max_distance_from_depot=radius)
+        lengths = [len(chain) for chain in find_chain_lengths(chains)]
+        linked = [chain['prev_contract'] for chain in chains if chain['prev_contract']]
+        assert result['chains'] == len(lengths)
+        assert result['longest_chain'] == max(lengths, default=0)
+        assert result['chained_contracts'] == len(linked)
+        assert round(result['chain_savings_km'], 1) == round(sum(prev['savings_km'] for prev in linked), 1)
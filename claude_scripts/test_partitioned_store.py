@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import json
+import os
+import random
+
+from partitioned_store import load_partitioned_store
+
+def make_export(seed: int, count: int, first_id: int = 0):
+    """{contract_key: contract} with raisedDates over 2022-2024, some missing or unparseable."""
+    rng = random.Random(seed)
+    contracts = {}
+    for k in range(first_id, first_id + count):
+        roll = rng.random()
+        if roll < 0.05:
+            raised = None
+        elif roll < 0.08:
+            raised = 'not a date'
+        else:
+            raised = f"{rng.randint(2022, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T08:00:00Z"
+        contracts[f"K{k:05d}"] = {'id': k, 'raisedDate': raised, 'startDate': raised}
+    return contracts
+
+def test_reads_follow_source_order_across_appends_and_rebuilds(tmp_path):
+    source_path = str(tmp_path / 'out.json')
+    store_dir = str(tmp_path / 'partitions')
+    source = make_export(seed=16, count=400)
+    with open(source_path, 'w') as f:
+        json.dump(source, f)
+
+    store = load_partitioned_store(source_path, store_dir)
+    expected_2023 = [(key, contract) for key, contract in source.items()
+                     if (contract['raisedDate'] or '').startswith('2023-')]
+    assert list(store.iter_year(2023)) == expected_2023
+
+    batch = make_export(seed=17, count=60, first_id=400)
+    store.append(batch.items())
+    combined = {**source, **batch}
+    assert len(store) == len(combined)
+    assert list(store.iter_year(2024)) == [
+        (key, contract) for key, contract in combined.items()
+        if (contract['raisedDate'] or '').startswith('2024-')
+    ]
+
+    # Counts come from the manifest, which holds no per-contract data
+    with open(os.path.join(store_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    assert all(set(partition) == {'count', 'min_raised_date', 'max_raised_date', 'min_start_date', 'max_start_date'}
+               for partition in manifest['partitions'].values())
+    assert sum(store.year_counts().values()) == sum(
+        1 for contract in combined.values()
+        if contract['raisedDate'] and contract['raisedDate'][:4].isdigit()
+    )
+
+    # A changed source is rebuilt with the appended batch replayed after it
+    del source['K00007']
+    with open(source_path, 'w') as f:
+        json.dump(source, f)
+    rebuilt = load_partitioned_store(source_path, store_dir)
+    combined = {**source, **batch}
+    assert len(rebuilt) == len(combined)
+    assert list(rebuilt.iter_year(2022)) == [
+        (key, contract) for key, contract in combined.items()
+        if (contract['raisedDate'] or '').startswith('2022-')
+    ]
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+import json
+
+from stream_contracts import iter_contracts
+
+# Top-level numbers in every shape a chunk edge can cut short ("-1." or "12e" decode as shorter numbers)
+DOCUMENT = {
+    'a': -1.5,
+    'b': 12e3,
+    'c': 1.25E-2,
+    'd': -0.0,
+    'e': 0,
+    'f': 123456789,
+    'g': [1, 2.5],
+    'h': True,
+    'i': None,
+    'j': {'x': -7e-3},
+    'k': 'text',
+    'l': 42
+}
+
+def test_every_chunk_size_streams_the_same_pairs(tmp_path):
+    path = tmp_path / 'contracts.json'
+    text = json.dumps(DOCUMENT)
+    path.write_text(text)
+
+    for chunk_size in range(1, len(text) + 2):
+        assert list(iter_contracts(str(path), chunk_size)) == list(DOCUMENT.items()), chunk_size